@@ -1,4 +1,3 @@
-import weaviate
 import json
 import sys
 import os
@@ -9,7 +8,9 @@ from sentence_transformers import SentenceTransformer
 
 # Add the project root to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
 from backend.port_utils import get_weaviate_config
+from weaviate_client import close_weaviate_connections, get_weaviate_connection
 
 # Function to generate embedding
 def generate_embedding(text, model):
@@ -19,14 +20,8 @@ def generate_embedding(text, model):
 config = get_weaviate_config()
 print(f"Connecting to Weaviate at {config['host']}:{config['port']} (gRPC: {config['grpc_port']})")
 
-# Connect to Weaviate
-client = weaviate.WeaviateClient(
-    connection_params=weaviate.connect.ConnectionParams.from_url(
-        url=f"http://{config['host']}:{config['port']}",
-        grpc_port=config['grpc_port']
-    )
-)
-client.connect()
+# Borrow the shared Weaviate connection
+client = get_weaviate_connection(config['host'], config['port'], config['grpc_port']).client
 
 try:
     # Initialize embedding model
@@ -66,4 +61,4 @@ try:
 except Exception as e:
     print(f"Error: {e}")
 finally:
-    client.close() 
\ No newline at end of file
+    close_weaviate_connections() 
\ No newline at end of file
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import counter, gauge, histogram
+
+queue_wait_histogram = histogram(
+    "admission_queue_wait_seconds", "Time LLM requests waited for admission", ("request_type",)
+)
+generation_histogram = histogram(
+    "admission_generation_seconds", "Time LLM requests held an admission slot", ("request_type",)
+)
+rejected_counter = counter("admission_rejected_total", "LLM requests rejected by admission control", ("reason",))
+queue_depth_gauge = gauge("admission_queue_depth", "LLM requests waiting for admission")
+in_flight_gauge = gauge("admission_in_flight", "LLM requests holding an admission slot")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted.
+
+    Attributes:
+        status: HTTP status to answer with (429 per-client cap, 503 server full)
+        retry_after: Seconds the client should wait before retrying
+    """
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """An admitted request. Release it exactly once, when the LLM work ends."""
+
+    def __init__(self, controller: "AdmissionController", request_type: str, client_id: Optional[str]):
+        self.controller = controller
+        self.request_type = request_type
+        self.client_id = client_id
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        generation_histogram.observe(time.monotonic() - self.admitted_at, request_type=self.request_type)
+        self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AdmissionController:
+    """Bounded, prioritized admission in front of the LLM.
+
+    At most ``max_concurrent`` requests run at once; the rest wait in a
+    priority queue (lower number first, FIFO within a priority) of at most
+    ``max_queue`` entries. Each client may have at most
+    ``per_client_limit`` requests running or waiting. Requests over the
+    client cap get 429, requests that find the queue full or wait longer
+    than ``queue_timeout`` get 503, both with Retry-After, instead of piling
+    up on llama.cpp until it times out.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 32, per_client_limit: int = 4,
+                 queue_timeout: float = 30, retry_after: int = 2,
+                 priorities: Optional[Dict[str, int]] = None, default_priority: int = 1):
+        """Create a controller.
+
+        Args:
+            max_concurrent: Requests allowed to run at once
+            max_queue: Requests allowed to wait
+            per_client_limit: Running plus waiting requests per client (0 = unlimited)
+            queue_timeout: Seconds a request may wait before it is rejected
+            retry_after: Seconds advertised in Retry-After
+            priorities: Request type to priority (lower runs first)
+            default_priority: Priority of request types not in priorities
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.per_client_limit = max(0, int(per_client_limit))
+        self.queue_timeout = float(queue_timeout)
+        self.retry_after = int(retry_after)
+        self.priorities = dict(priorities or {})
+        self.default_priority = int(default_priority)
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting: list = []
+        self._sequence = itertools.count()
+        self._per_client: Dict[str, int] = {}
+
+        queue_depth_gauge.set_function(lambda: len(self._waiting))
+        in_flight_gauge.set_function(lambda: self._running)
+
+    def priority(self, request_type: str) -> int:
+        return int(self.priorities.get(request_type, self.default_priority))
+
+    def _reject(self, message: str, status: int, reason: str) -> AdmissionRejected:
+        rejected_counter.inc(reason=reason)
+        return AdmissionRejected(message, status, self.retry_after)
+
+    def admit(self, request_type: str, client_id: Optional[str]) -> AdmissionTicket:
+        """Wait for an LLM slot.
+
+        Args:
+            request_type: Request type, for its priority
+            client_id: Client the per-client cap applies to (None = exempt)
+
+        Returns:
+            A ticket to release when the request's LLM work is done
+
+        Raises:
+            AdmissionRejected: If the client is over its cap, the queue is
+                full, or the wait exceeded queue_timeout
+        """
+        arrived = time.monotonic()
+        with self._cond:
+            if (self.per_client_limit and client_id is not None
+                    and self._per_client.get(client_id, 0) >= self.per_client_limit):
+                raise self._reject(
+                    f"Too many concurrent requests from this client (limit {self.per_client_limit})",
+                    429, "client_limit"
+                )
+
+            if self._running < self.max_concurrent and not self._waiting:
+                return self._grant(request_type, client_id, arrived)
+
+            if len(self._waiting) >= self.max_queue:
+                raise self._reject("Server is busy, LLM request queue is full", 503, "queue_full")
+
+            entry = (self.priority(request_type), next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            self._increment_client(client_id)
+            deadline = arrived + self.queue_timeout
+            try:
+                while not (self._waiting[0] == entry and self._running < self.max_concurrent):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("Timed out waiting for an LLM slot", 503, "queue_timeout")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._decrement_client(client_id)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._waiting)
+            self._decrement_client(client_id)
+            ticket = self._grant(request_type, client_id, arrived)
+            # The next waiter may also fit
+            self._cond.notify_all()
+            return ticket
+
+    def _grant(self, request_type: str, client_id: str, arrived: float) -> AdmissionTicket:
+        self._running += 1
+        self._increment_client(client_id)
+        queue_wait_histogram.observe(time.monotonic() - arrived, request_type=request_type)
+        return AdmissionTicket(self, request_type, client_id)
+
+    def _increment_client(self, client_id: Optional[str]):
+        if client_id is not None:
+            self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+
+    def _decrement_client(self, client_id: Optional[str]):
+        if client_id is None:
+            return
+        count = self._per_client.get(client_id, 0) - 1
+        if count > 0:
+            self._per_client[client_id] = count
+        else:
+            self._per_client.pop(client_id, None)
+
+    def _release(self, ticket: AdmissionTicket):
+        with self._cond:
+            self._running -= 1
+            self._decrement_client(ticket.client_id)
+            self._cond.notify_all()
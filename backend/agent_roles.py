@@ -1,19 +1,28 @@
 import os
 import json
-from datetime import datetime, timedelta
-from sentence_transformers import SentenceTransformer
-import weaviate
-from weaviate.collections import Collection
-from weaviate.util import generate_uuid5
-from weaviate.classes import query
-from weaviate.collections.classes.config import DataType, VectorDistances
+import threading
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from uuid import uuid4
 import numpy as np
 from enum import Enum
 from typing import Optional, List, Dict, Union
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 
+from embeddings import DEFAULT_EMBEDDING_MODEL, encode_cached, encode_many_cached, get_embedding_model, rerank_scores
+from memory_store import create_memory_store
+from metrics import histogram
+from port_utils import get_memory_config
+from structured_logging import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+search_histogram = histogram("memory_search_seconds", "Time for one memory store search", ("mode",))
+rerank_histogram = histogram("memory_rerank_seconds", "Time to rerank memory search candidates")
+add_histogram = histogram("memory_add_seconds", "Time to embed and insert one memory")
+
 class Status(Enum):
     ACTIVE = "active"
     PENDING = "pending"
@@ -51,7 +60,7 @@ def get_config():
                     config['weaviate']['grpc_port'] = port_info['weaviate_grpc_port']
                 return config
     except Exception as e:
-        print(f"Warning: Could not read port info from {port_info_path}: {e}")
+        logger.warning("Could not read port info from %s: %s", port_info_path, e)
     
     # If not found, try loading from config.yml
     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yml')
@@ -61,7 +70,7 @@ def get_config():
             if yaml_config and 'weaviate' in yaml_config:
                 config['weaviate'].update(yaml_config['weaviate'])
     except Exception as e:
-        print(f"Warning: Could not load config.yml: {e}")
+        logger.warning("Could not load config.yml: %s", e)
     
     return config
 
@@ -70,75 +79,66 @@ class Agent:
     def __init__(self, agent_id, role):
         self.agent_id = agent_id
         self.role = role
-        self.model_name = "all-MiniLM-L6-v2"  # Default embedding model
+        self.model_name = DEFAULT_EMBEDDING_MODEL  # Default embedding model
         load_dotenv()
         
-        # Initialize embedding model
-        self.model = SentenceTransformer(self.model_name)
-        print(f"Initializing {role} agent...")
+        # The embedding model is shared across agents and loaded on first use
+        logger.info("Initializing %s agent...", role)
         
-        # Get configuration
-        config = get_config()
-        weaviate_host = config['weaviate']['host']
-        weaviate_port = config['weaviate']['port']
-        weaviate_grpc_port = config['weaviate']['grpc_port']
-        
-        print(f"Connecting to Weaviate at {weaviate_host}:{weaviate_port} (gRPC: {weaviate_grpc_port})")
-        
-        # Connect to Weaviate
-        self.client = weaviate.WeaviateClient(
-            connection_params=weaviate.connect.ConnectionParams.from_url(
-                url=f"http://{weaviate_host}:{weaviate_port}",
-                grpc_port=int(weaviate_grpc_port)
-            )
-        )
-        self.client.connect()
-        
-        # Get collection
-        try:
-            self.collection = self.client.collections.get("AgentMemory")
-            print(f"Connected to AgentMemory collection")
-        except Exception as e:
-            print(f"Error connecting to AgentMemory collection: {e}")
-            print("Please run create_schema.py first to set up the Weaviate schema.")
-            raise
+        # The memory store (Weaviate or the local in-process index) is opened on first use
+        self._store = None
+        self._store_lock = threading.Lock()
+        self.retrieval_config = get_memory_config()['retrieval']
 
+    @property
+    def model(self):
+        """The shared embedding model for this agent's model name."""
+        return get_embedding_model(self.model_name)
+    
+    @property
+    def store(self):
+        """The memory store, opened on first use."""
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    config = get_config()
+                    self._store = create_memory_store(config['weaviate'])
+        return self._store
+    
     def __del__(self):
         # Clean up resources
-        if hasattr(self, 'client'):
-            self.client.close()
+        if getattr(self, '_store', None) is not None:
+            self._store.close()
     
     def _generate_embedding(self, text):
-        """Generate an embedding vector for the text"""
-        return self.model.encode(text)
+        """Generate an embedding vector for the text (cached by content hash)"""
+        with span("Agent._generate_embedding", **{"embedding.model": self.model_name, "embedding.text_chars": len(text)}):
+            return encode_cached(text, self.model_name)
     
-    def add_memory(self, text, tag=None, priority=Priority.MEDIUM, status=Status.ACTIVE, 
-                  related_agents=None, context_id=None, metadata=None, 
-                  expiry_days=None, source=None):
-        """Add a memory to the agent's memory store"""
+    def _build_properties(self, text, tag=None, priority=Priority.MEDIUM, status=Status.ACTIVE,
+                          related_agents=None, context_id=None, metadata=None,
+                          expiry_days=None, source=None):
+        """Build the stored properties for a memory"""
         if tag and not isinstance(tag, list):
             tag = [tag]
         
         if related_agents and not isinstance(related_agents, list):
             related_agents = [related_agents]
             
-        # Format timestamp in RFC3339 format
-        timestamp = datetime.now().isoformat() + "Z"
+        # Format timestamp in RFC3339 format, in UTC like the dates Weaviate returns
+        now = datetime.now(timezone.utc)
+        timestamp = now.isoformat().replace("+00:00", "Z")
         
         # Calculate expiry date if provided
         expiry_date = None
         if expiry_days:
-            expiry_date = (datetime.now() + timedelta(days=expiry_days)).isoformat() + "Z"
+            expiry_date = (now + timedelta(days=expiry_days)).isoformat().replace("+00:00", "Z")
             
         # Convert metadata to string if it's a dict
         if metadata and isinstance(metadata, dict):
             metadata = json.dumps(metadata)
             
-        # Generate embedding
-        embedding = self._generate_embedding(text)
-            
-        # Create the object in Weaviate
-        properties = {
+        return {
             "text": text,
             "role": self.role,
             "tag": tag,
@@ -152,83 +152,204 @@ class Agent:
             "expiryDate": expiry_date,
             "source": source
         }
-        
-        obj_uuid = self.collection.data.insert(
-            properties=properties,
-            vector=embedding
+    
+    def add_memory(self, text, tag=None, priority=Priority.MEDIUM, status=Status.ACTIVE, 
+                  related_agents=None, context_id=None, metadata=None, 
+                  expiry_days=None, source=None):
+        """Add a memory to the agent's memory store"""
+        properties = self._build_properties(
+            text, tag=tag, priority=priority, status=status, related_agents=related_agents,
+            context_id=context_id, metadata=metadata, expiry_days=expiry_days, source=source
         )
         
-        print(f"Added memory with UUID: {obj_uuid}")
+        with add_histogram.time(), span("Agent.add_memory", **{"agent.role": self.role, "memory.text_chars": len(text)}):
+            # Generate embedding
+            embedding = self._generate_embedding(text)
+            
+            # Create the object in the memory store
+            obj_uuid = self.store.insert(properties, embedding)
+        
+        logger.debug("Added memory with UUID: %s", obj_uuid, extra={"agent_id": self.agent_id})
         return obj_uuid, context_id or str(uuid4())
     
-    def search_memory(self, query_text, limit=5, filter_obj=None):
+    def add_memories_bulk(self, memories, batch_size=None, concurrency=None):
         """
-        Search memories based on semantic similarity
-        filter_obj: Optional filter dictionary with supported operators like "where_text_contains" 
+        Add many memories at once.
+        
+        All texts are embedded in one vectorized pass and written to the
+        store in chunks of batch_size (Weaviate's gRPC batch path for the
+        weaviate backend), with up to concurrency chunks in flight.
+        
+        memories: List of dicts with the add_memory keyword arguments
+                  ("text" is required). An optional "uuid" is used as the object ID.
+        Returns a list with one {"uuid", "context_id", "error"} dict per input, in order.
         """
+        memory_config = get_memory_config()
+        batch_size = int(batch_size or memory_config['bulk_batch_size'])
+        concurrency = int(concurrency or memory_config['bulk_concurrency'])
+        
+        results = [{"uuid": None, "context_id": None, "error": None} for _ in memories]
+        objects = []
+        for i, memory in enumerate(memories):
+            memory = dict(memory)
+            text = memory.pop("text", None)
+            obj_uuid = memory.pop("uuid", None) or str(uuid4())
+            if not text:
+                results[i]["error"] = "Missing text"
+                continue
+            try:
+                properties = self._build_properties(text, **memory)
+            except TypeError as e:
+                results[i]["error"] = str(e)
+                continue
+            results[i]["context_id"] = memory.get("context_id") or str(uuid4())
+            objects.append((i, str(obj_uuid), text, properties))
+        
+        if not objects:
+            return results
+        
+        embeddings = encode_many_cached([text for _, _, text, _ in objects], self.model_name)
+        
+        def insert_chunk(chunk):
+            try:
+                uuids, errors = self.store.insert_many([
+                    (obj_uuid, properties, embeddings[offset])
+                    for offset, (_, obj_uuid, _, properties) in chunk
+                ])
+            except Exception as e:
+                for _, (index, _, _, _) in chunk:
+                    results[index]["error"] = str(e)
+                return
+            for position, (_, (index, _, _, _)) in enumerate(chunk):
+                if position in errors:
+                    results[index]["error"] = errors[position]
+                else:
+                    results[index]["uuid"] = uuids[position]
+        
+        numbered = list(enumerate(objects))
+        chunks = [numbered[start:start + batch_size] for start in range(0, len(numbered), batch_size)]
+        if len(chunks) == 1 or concurrency <= 1:
+            # Inline, which also works from atexit (the write-behind flush on
+            # shutdown), where executors can no longer start threads
+            for chunk in chunks:
+                insert_chunk(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as executor:
+                list(executor.map(insert_chunk, chunks))
+        
+        failed = sum(1 for result in results if result["error"])
+        logger.info("Bulk added %d memories (%d failed)", len(memories) - failed, failed, extra={"agent_id": self.agent_id})
+        return results
+    
+    def search_memory(self, query_text, limit=5, filter_obj=None, mode=None, alpha=None, rerank=None):
+        """
+        Search memories by relevance to query_text
+        filter_obj: Optional filter dictionary on status, priority, agent_id and context_id
+        mode: "hybrid" (BM25 keyword + vector, finds exact identifiers) or "vector";
+              defaults to memory.retrieval.mode in config.yml
+        alpha: Hybrid blend, 1.0 pure vector and 0.0 pure keyword
+        rerank: Rerank candidates with the cross-encoder before cutting to limit
+        
+        Candidates are boosted by priority and recency before the top limit
+        are returned, best first, each with its "score".
+        """
+        retrieval = self.retrieval_config
+        mode = mode or retrieval['mode']
+        alpha = retrieval['alpha'] if alpha is None else alpha
+        rerank = retrieval['rerank'] if rerank is None else rerank
+        
+        with span("Agent.search_memory", **{"agent.role": self.role, "memory.mode": mode, "memory.limit": limit,
+                                            "memory.rerank": bool(rerank)}) as search_span:
+            return self._search_memory(query_text, limit, filter_obj, mode, alpha, rerank, search_span)
+    
+    def _search_memory(self, query_text, limit, filter_obj, mode, alpha, rerank, search_span):
+        retrieval = self.retrieval_config
         embedding = self._generate_embedding(query_text)
         
-        # Build the query
-        if filter_obj:
-            filters = None
-            if 'status' in filter_obj:
-                status_val = filter_obj['status'].value if isinstance(filter_obj['status'], Status) else filter_obj['status']
-                filters = query.Filter.by_property("status").equal(status_val)
-                
-            if 'priority' in filter_obj:
-                priority_val = filter_obj['priority'].value if isinstance(filter_obj['priority'], Priority) else filter_obj['priority']
-                priority_filter = query.Filter.by_property("priority").equal(priority_val)
-                filters = priority_filter if filters is None else filters & priority_filter
-                
-            if 'agent_id' in filter_obj:
-                agent_filter = query.Filter.by_property("agentId").equal(filter_obj['agent_id'])
-                filters = agent_filter if filters is None else filters & agent_filter
-                
-            if 'context_id' in filter_obj:
-                context_filter = query.Filter.by_property("contextId").equal(filter_obj['context_id'])
-                filters = context_filter if filters is None else filters & context_filter
-                
-            result = self.collection.query.near_vector(
-                near_vector=embedding,
-                limit=limit,
-                filters=filters
-            )
-        else:
-            result = self.collection.query.near_vector(
-                near_vector=embedding,
-                limit=limit
+        # Over-fetch so boosting and reranking can change which memories make the cut
+        candidates = max(limit, int(retrieval['candidates']))
+        with search_histogram.time(mode=mode), span("MemoryStore.search", kind="client", **{
+            "memory.store": type(self.store).__name__, "memory.candidates_requested": candidates
+        }):
+            results = self.store.search(
+                embedding,
+                limit=candidates,
+                filters=self._store_filters(filter_obj),
+                query_text=query_text if mode == "hybrid" else None,
+                alpha=alpha if mode == "hybrid" else 1.0
             )
-        
-        # Return formatted results
-        return [obj.properties for obj in result.objects]
+        search_span.set_attribute("memory.candidates", len(results))
+        logger.debug("Memory search found %d candidates", len(results), extra={"agent_id": self.agent_id, "mode": mode})
+        
+        if rerank and query_text and results:
+            with rerank_histogram.time():
+                scores = rerank_scores(query_text, [r.get("text") or "" for r in results], retrieval['rerank_model'])
+            for result, score in zip(results, scores):
+                result["score"] = float(score)
+        
+        for result in results:
+            result["score"] = result.get("score", 0.0) + self._boost(result)
+        results.sort(key=lambda r: r["score"], reverse=True)
+        
+        search_span.set_attribute("memory.results", min(limit, len(results)))
+        # Return formatted results, with the object UUID as "id"
+        return results[:limit]
+    
+    def _boost(self, memory):
+        """Score bonus for a memory's priority and recency"""
+        retrieval = self.retrieval_config
+        boost = 0.0
+        
+        priority = memory.get("priority")
+        if isinstance(priority, (int, float)):
+            boost += retrieval['priority_weight'] * (priority - Priority.LOW.value) / (Priority.CRITICAL.value - Priority.LOW.value)
+        
+        timestamp = memory.get("timestamp")
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            except ValueError:
+                timestamp = None
+        if isinstance(timestamp, datetime):
+            # Timestamps are stored in UTC; one without an offset is taken as UTC too
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            age_days = max(0.0, (datetime.now(timezone.utc) - timestamp).total_seconds() / 86400)
+            boost += retrieval['recency_weight'] * 0.5 ** (age_days / retrieval['recency_half_life_days'])
+        
+        return boost
+    
+    def _store_filters(self, filter_obj):
+        """Translate a filter_obj into property filters for the memory store"""
+        if not filter_obj:
+            return None
+        
+        filters = {}
+        if 'status' in filter_obj:
+            filters["status"] = filter_obj['status'].value if isinstance(filter_obj['status'], Status) else filter_obj['status']
+        if 'priority' in filter_obj:
+            filters["priority"] = filter_obj['priority'].value if isinstance(filter_obj['priority'], Priority) else filter_obj['priority']
+        if 'agent_id' in filter_obj:
+            filters["agentId"] = filter_obj['agent_id']
+        if 'context_id' in filter_obj:
+            filters["contextId"] = filter_obj['context_id']
+        return filters or None
     
     def update_memory_status(self, memory_id, new_status):
         """Update the status of a memory"""
         status_val = new_status.value if isinstance(new_status, Status) else new_status
         
-        self.collection.data.update(
-            uuid=memory_id,
-            properties={
-                "status": status_val
-            }
-        )
-        print(f"Updated memory {memory_id} status to {status_val}")
+        self.store.update(memory_id, {"status": status_val})
+        logger.info("Updated memory %s status to %s", memory_id, status_val)
     
     def delete_memory(self, memory_id):
         """Delete a memory from the store"""
-        self.collection.data.delete_by_id(uuid=memory_id)
-        print(f"Deleted memory {memory_id}")
+        self.store.delete(memory_id)
+        logger.info("Deleted memory %s", memory_id)
     
     def get_context_memories(self, context_id):
         """Get all memories related to a specific context"""
-        context_filter = query.Filter.by_property("contextId").equal(context_id)
-        
-        result = self.collection.query.fetch_objects(
-            limit=50,
-            filters=context_filter
-        )
-        
-        return [obj.properties for obj in result.objects]
+        return self.store.fetch({"contextId": context_id}, limit=50)
 
 # Define specialized agent classes
 class FrontendAgent(Agent):
@@ -268,22 +389,24 @@ class FrontendAgent(Agent):
         if dependencies:
             self._check_backend_dependencies(dependencies, context_id)
         
-        print(f"Started building UI component: {component_name}")
+        logger.info("Started building UI component: %s", component_name)
         return context_id
     
     def _check_backend_dependencies(self, dependencies, context_id):
         """Check if backend dependencies are available"""
-        for dep in dependencies:
-            # Add a memory about requiring this dependency
-            self.add_memory(
-                text=f"Checking backend dependency: {dep}",
-                tag=["dependency", "backend"],
-                status=Status.PENDING,
-                related_agents=["backend"],
-                context_id=context_id,
-                priority=Priority.HIGH,
-                source="dependency_check"
-            )
+        # Add a memory about requiring each dependency
+        self.add_memories_bulk([
+            {
+                "text": f"Checking backend dependency: {dep}",
+                "tag": ["dependency", "backend"],
+                "status": Status.PENDING,
+                "related_agents": ["backend"],
+                "context_id": context_id,
+                "priority": Priority.HIGH,
+                "source": "dependency_check"
+            }
+            for dep in dependencies
+        ])
     
     def update_component_status(self, component_name, new_status):
         """Update the status of a component"""
@@ -291,9 +414,9 @@ class FrontendAgent(Agent):
             memory_id = self.component_history[component_name]["memory_id"]
             self.update_memory_status(memory_id, new_status)
             self.component_history[component_name]["status"] = new_status
-            print(f"Updated component {component_name} status to {new_status.value}")
+            logger.info("Updated component %s status to %s", component_name, new_status.value)
         else:
-            print(f"Component {component_name} not found in history")
+            logger.warning("Component %s not found in history", component_name)
 
 class BackendAgent(Agent):
     def __init__(self, agent_id):
@@ -335,7 +458,7 @@ class BackendAgent(Agent):
                 "memory_id": obj_id
             }
             
-        print(f"Processed database query for table: {table_name}")
+        logger.info("Processed database query for table: %s", table_name)
         return context_id
         
     def create_api_endpoint(self, endpoint_name, method, response_model=None, priority=Priority.MEDIUM):
@@ -358,7 +481,7 @@ class BackendAgent(Agent):
             source="create_api_endpoint"
         )
         
-        print(f"Created API endpoint: {method.upper()} {endpoint_name}")
+        logger.info("Created API endpoint: %s %s", method.upper(), endpoint_name)
         return context_id
 
 class QAAgent(Agent):
@@ -384,7 +507,7 @@ class QAAgent(Agent):
             source="create_test_case"
         )
         
-        print(f"Created test case for {feature_name}")
+        logger.info("Created test case for %s", feature_name)
         return context_id
         
     def report_test_result(self, context_id, passed, details=None):
@@ -408,7 +531,7 @@ class QAAgent(Agent):
             source="test_result"
         )
         
-        print(f"Reported test result for context {context_id}: {'passed' if passed else 'failed'}")
+        logger.info("Reported test result for context %s: %s", context_id, 'passed' if passed else 'failed')
 
 class DevOpsAgent(Agent):
     def __init__(self, agent_id):
@@ -434,7 +557,7 @@ class DevOpsAgent(Agent):
             source="deploy_service"
         )
         
-        print(f"Started deployment of {service_name} to {environment}")
+        logger.info("Started deployment of %s to %s", service_name, environment)
         return context_id
         
     def report_deployment_status(self, context_id, success, details=None):
@@ -458,7 +581,7 @@ class DevOpsAgent(Agent):
             source="deployment_result"
         )
         
-        print(f"Reported deployment result for context {context_id}: {'success' if success else 'failed'}")
+        logger.info("Reported deployment result for context %s: %s", context_id, 'success' if success else 'failed')
 
 # Create agent instances
 # The following agent initializations and tests are disabled to prevent multiple agents from loading
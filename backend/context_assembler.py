@@ -0,0 +1,207 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from metrics import histogram
+
+context_tokens_histogram = histogram(
+    "memory_context_tokens", "Tokens of memory context injected into a prompt",
+    buckets=(0, 64, 128, 256, 512, 1024, 2048, 4096)
+)
+context_memories_histogram = histogram(
+    "memory_context_memories", "Memories injected into a prompt", buckets=(0, 1, 2, 3, 5, 8, 13, 20)
+)
+context_build_histogram = histogram("memory_context_build_seconds", "Time to assemble the memory context")
+
+TRUNCATION_MARKER = " [...]"
+
+_TRANSCRIPT_PATTERN = re.compile(r"^User: (.*?)\nAgent: (.*)$", re.DOTALL)
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class TokenCounter:
+    """Counts tokens with the model's tokenizer or a fast character estimate.
+
+    With a ``tokenize`` function (e.g. ``LlamaCppInterface.tokenize``),
+    counts are exact and cached by text; if the tokenizer fails the
+    estimate is used instead. The estimate is ``len(text) / chars_per_token``
+    rounded up, which errs high for English prose and code.
+    """
+
+    def __init__(self, tokenize: Optional[Callable[[str], Sequence[int]]] = None,
+                 chars_per_token: float = 3.5, cache_size: int = 4096):
+        self.tokenize = tokenize
+        self.chars_per_token = float(chars_per_token)
+        self.cache_size = int(cache_size)
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def estimate(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenize is None:
+            return self.estimate(text)
+
+        with self._lock:
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                return self._cache[text]
+        try:
+            tokens = len(self.tokenize(text))
+        except Exception:
+            return self.estimate(text)
+        with self._lock:
+            self._cache[text] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens, ending with a truncation marker."""
+        if self.count(text) <= max_tokens:
+            return text
+        marker_tokens = self.count(TRUNCATION_MARKER)
+        if max_tokens <= marker_tokens:
+            return ""
+
+        # Start from the estimated cut and shrink until it fits
+        length = min(len(text), int((max_tokens - marker_tokens) * self.chars_per_token))
+        while length > 0:
+            cut = text[:length]
+            if length < len(text) and not text[length].isspace() and " " in cut:
+                # Don't end on a partial word
+                cut = cut.rsplit(None, 1)[0]
+            candidate = cut.rstrip() + TRUNCATION_MARKER
+            if self.count(candidate) <= max_tokens:
+                return candidate
+            length = int(length * 0.9)
+        return ""
+
+
+class ContextAssembler:
+    """Fits retrieved memories into a token budget for prompt injection.
+
+    Memories are taken in rank order. Near-duplicates of an already selected
+    memory (word-set Jaccard similarity at or above ``dedupe_threshold``)
+    are skipped. Each memory is compacted to at most ``max_memory_tokens``:
+    for stored "User: ... Agent: ..." interactions the user request is kept
+    and the agent reply is trimmed first. Assembly stops when the budget is
+    spent, so the injected context, and with it prefill time, stays bounded.
+    """
+
+    def __init__(self, counter: TokenCounter, budget_tokens: int = 1024, max_memory_tokens: int = 256,
+                 min_memory_tokens: int = 32, dedupe_threshold: float = 0.9):
+        """Create an assembler.
+
+        Args:
+            counter: Token counter for the target model
+            budget_tokens: Default budget for the whole memory context
+            max_memory_tokens: Budget for any single memory
+            min_memory_tokens: Smallest remaining budget worth adding a memory for
+            dedupe_threshold: Similarity at which a memory counts as a duplicate
+        """
+        self.counter = counter
+        self.budget_tokens = int(budget_tokens)
+        self.max_memory_tokens = int(max_memory_tokens)
+        self.min_memory_tokens = int(min_memory_tokens)
+        self.dedupe_threshold = float(dedupe_threshold)
+
+    @staticmethod
+    def _format_timestamp(timestamp: Any) -> str:
+        if timestamp and not isinstance(timestamp, datetime):
+            try:
+                # Parse ISO format timestamp and format it nicely
+                timestamp = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+            except ValueError:
+                return str(timestamp)
+        if isinstance(timestamp, datetime):
+            # Stored in UTC; shown in local time
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone()
+            return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        return ""
+
+    def _header(self, number: int, memory: Dict[str, Any]) -> str:
+        return f"Memory #{number} [{self._format_timestamp(memory.get('timestamp'))}]:\nText: "
+
+    @staticmethod
+    def _footer(memory: Dict[str, Any]) -> str:
+        return f"\nTags: {', '.join(memory.get('tag') or [])}"
+
+    def compact(self, text: str, max_tokens: int) -> str:
+        """Fit one memory's text into max_tokens."""
+        if self.counter.count(text) <= max_tokens:
+            return text
+
+        match = _TRANSCRIPT_PATTERN.match(text)
+        if match is None:
+            return self.counter.truncate(text, max_tokens)
+
+        # Keep the user's request (up to half the budget) and trim the reply
+        user = self.counter.truncate(match.group(1), max_tokens // 2)
+        prefix = f"User: {user}\nAgent: "
+        reply = self.counter.truncate(match.group(2), max_tokens - self.counter.count(prefix))
+        return prefix + reply if reply else self.counter.truncate(text, max_tokens)
+
+    @staticmethod
+    def _words(text: str) -> frozenset:
+        return frozenset(_WORD_PATTERN.findall(text.lower()))
+
+    def _is_duplicate(self, words: frozenset, selected: List[frozenset]) -> bool:
+        for other in selected:
+            union = len(words | other)
+            if union and len(words & other) / union >= self.dedupe_threshold:
+                return True
+        return False
+
+    def assemble(self, memories: List[Dict[str, Any]], budget_tokens: Optional[int] = None) -> str:
+        """Format memories as a context string within the token budget.
+
+        Args:
+            memories: Retrieved memories, best first
+            budget_tokens: Budget for this prompt (defaults to budget_tokens)
+
+        Returns:
+            The context string, empty if nothing fits
+        """
+        with context_build_histogram.time():
+            return self._assemble(memories, budget_tokens)
+
+    def _assemble(self, memories: List[Dict[str, Any]], budget_tokens: Optional[int]) -> str:
+        remaining = self.budget_tokens if budget_tokens is None else min(self.budget_tokens, budget_tokens)
+        separator_tokens = self.counter.count("\n\n")
+        items: List[str] = []
+        selected_words: List[frozenset] = []
+        used = 0
+
+        for memory in memories:
+            text = memory.get("text") or ""
+            words = self._words(text)
+            if not words or self._is_duplicate(words, selected_words):
+                continue
+
+            header = self._header(len(items) + 1, memory)
+            footer = self._footer(memory)
+            overhead = self.counter.count(header) + self.counter.count(footer) + (separator_tokens if items else 0)
+            available = min(self.max_memory_tokens, remaining - overhead)
+            if available < self.min_memory_tokens:
+                break
+
+            text = self.compact(text, available)
+            if not text:
+                continue
+            cost = overhead + self.counter.count(text)
+            items.append(header + text + footer)
+            selected_words.append(words)
+            remaining -= cost
+            used += cost
+
+        context_tokens_histogram.observe(used)
+        context_memories_histogram.observe(len(items))
+        return "\n\n".join(items)
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # Schema creation script for Weaviate database
 
-import weaviate
 from weaviate.collections.classes.config import Configure, DataType
 from weaviate.collections.classes.config import VectorDistances
 import time
@@ -10,6 +9,8 @@ import yaml
 import os
 import json
 
+from weaviate_client import close_weaviate_connections, get_weaviate_connection
+
 def get_config():
     # Default values
     config = {
@@ -66,17 +67,12 @@ def create_schema():
     
     print(f"Using Weaviate at {weaviate_host}:{weaviate_port}")
     
-    # Connect to Weaviate
-    client = weaviate.WeaviateClient(
-        connection_params=weaviate.connect.ConnectionParams.from_url(
-            url=f"http://{weaviate_host}:{weaviate_port}",
-            grpc_port=config['weaviate']['grpc_port']
-        )
-    )
+    # Connect to Weaviate through the shared connection
+    connection = get_weaviate_connection(weaviate_host, weaviate_port, config['weaviate']['grpc_port'])
     
     try:
         # Ensure we can connect to Weaviate
-        client.connect()
+        client = connection.client
         print("Successfully connected to Weaviate")
     except Exception as e:
         print(f"Error connecting to Weaviate: {e}")
@@ -92,7 +88,7 @@ def create_schema():
         if "AgentMemory" in collection_names:
             print("AgentMemory collection already exists - will use existing collection")
             # We won't delete existing collection to prevent data loss
-            client.close()
+            close_weaviate_connections()
             print("Schema verification completed successfully!")
             sys.exit(0)  # Exit with success code since we can use existing collection
     except Exception as e:
@@ -191,16 +187,16 @@ def create_schema():
         # Check if the error is due to the collection already existing
         if "already exists" in str(e) or "class name AgentMemory already exists" in str(e):
             print("Collection AgentMemory already exists! Using existing collection.")
-            client.close()
+            close_weaviate_connections()
             print("Schema verification completed successfully!")
             sys.exit(0)  # Exit with success code since we can use existing collection
         else:
             print(f"Error creating schema: {e}")
-            client.close()
+            close_weaviate_connections()
             sys.exit(1)
     
     # Close the client
-    client.close()
+    close_weaviate_connections()
     
     print("Schema creation completed successfully!")
     print("You can now use the VS Code AI Dev Team with memory enabled.")
@@ -0,0 +1,55 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+
+class RequestDebouncer:
+    """Coalesces bursts of requests that share a key (e.g. an editor document).
+
+    Each request takes a ticket with ``begin`` and waits ``delay_ms`` with
+    ``wait``. Only the newest ticket for a key survives the wait: older ones
+    are woken right away and told they were superseded, so a burst of
+    keystrokes costs one LLM request instead of one per keystroke.
+    ``superseded`` stays usable afterwards to abandon work that a newer
+    request has made stale.
+    """
+
+    def __init__(self, delay_ms: float = 100, max_keys: int = 1024):
+        """Create a debouncer.
+
+        Args:
+            delay_ms: Quiet period a request waits for before it runs
+            max_keys: Keys remembered (least recently used are forgotten)
+        """
+        self.delay = max(0.0, float(delay_ms)) / 1000
+        self.max_keys = int(max_keys)
+        self._latest: "OrderedDict[str, int]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def begin(self, key: str) -> int:
+        """Register a request for key; it supersedes every earlier one."""
+        with self._cond:
+            ticket = next(self._sequence)
+            self._latest[key] = ticket
+            self._latest.move_to_end(key)
+            while len(self._latest) > self.max_keys:
+                self._latest.popitem(last=False)
+            self._cond.notify_all()
+            return ticket
+
+    def superseded(self, key: str, ticket: int) -> bool:
+        """Whether a newer request for key has begun since ticket."""
+        with self._cond:
+            return self._latest.get(key, ticket) != ticket
+
+    def wait(self, key: str, ticket: int) -> bool:
+        """Wait out the quiet period.
+
+        Returns:
+            True if the request should run, False if it was superseded
+        """
+        with self._cond:
+            if self.delay:
+                self._cond.wait_for(lambda: self._latest.get(key, ticket) != ticket, timeout=self.delay)
+            return self._latest.get(key, ticket) == ticket
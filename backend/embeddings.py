@@ -0,0 +1,451 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metrics import counter, gauge, histogram
+from port_utils import get_embedding_config, get_worker_processes
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Process-wide registry of loaded embedding models, keyed by model name
+_models: Dict[str, object] = {}
+_rerankers: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+_model_locks: Dict[str, threading.Lock] = {}
+
+# Process-wide embedding caches and micro-batchers, keyed by model name
+_caches: Dict[str, "EmbeddingCache"] = {}
+_batchers: Dict[str, "EmbeddingBatcher"] = {}
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+batch_size_histogram = histogram(
+    "embedding_batch_size", "Texts encoded per micro-batch", ("model",), buckets=BATCH_SIZE_BUCKETS
+)
+queue_wait_histogram = histogram(
+    "embedding_queue_wait_seconds", "Time texts wait in the micro-batch queue before encoding",
+    ("model",), buckets=QUEUE_WAIT_BUCKETS
+)
+encode_histogram = histogram(
+    "embedding_seconds", "Time to get one text's embedding, cache lookup included", ("model", "cache")
+)
+cache_lookups_counter = counter(
+    "embedding_cache_lookups_total", "Embedding cache lookups by result", ("model", "result")
+)
+cache_entries_gauge = gauge("embedding_cache_entries", "Vectors held per embedding cache tier", ("model", "tier"))
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """Get the shared SentenceTransformer for a model name, loading it on first use.
+
+    All agents in the process share one instance per model name. Loading is
+    serialized per model, so concurrent first callers wait for a single load
+    instead of each loading their own copy.
+
+    Args:
+        model_name: Name or path of the sentence-transformers model
+
+    Returns:
+        The loaded SentenceTransformer instance
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model_lock = _model_locks.setdefault(model_name, threading.Lock())
+
+    with model_lock:
+        model = _models.get(model_name)
+        if model is None:
+            # Imported lazily: sentence_transformers pulls in torch
+            from sentence_transformers import SentenceTransformer
+
+            logger.info("Loading embedding model %s...", model_name)
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+
+    return model
+
+
+def is_embedding_model_loaded(model_name: str = DEFAULT_EMBEDDING_MODEL) -> bool:
+    """Check whether a model has already been loaded in this process."""
+    return model_name in _models
+
+
+def get_reranker(model_name: str = DEFAULT_RERANK_MODEL):
+    """Get the shared CrossEncoder for a model name, loading it on first use."""
+    reranker = _rerankers.get(model_name)
+    if reranker is not None:
+        return reranker
+
+    with _registry_lock:
+        model_lock = _model_locks.setdefault(f"rerank:{model_name}", threading.Lock())
+
+    with model_lock:
+        reranker = _rerankers.get(model_name)
+        if reranker is None:
+            from sentence_transformers import CrossEncoder
+
+            logger.info("Loading rerank model %s...", model_name)
+            reranker = CrossEncoder(model_name)
+            _rerankers[model_name] = reranker
+
+    return reranker
+
+
+def rerank_scores(query: str, texts: Sequence[str], model_name: str = DEFAULT_RERANK_MODEL) -> np.ndarray:
+    """Score (query, text) pairs with a cross-encoder, as relevance in [0, 1]."""
+    if not texts:
+        return np.zeros(0, dtype=np.float32)
+    logits = np.asarray(get_reranker(model_name).predict([(query, text) for text in texts]), dtype=np.float32)
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+class EmbeddingCache:
+    """Content-hash keyed cache of embedding vectors for one model.
+
+    Vectors live in a bounded in-memory LRU. If ``disk_path`` is set, every
+    new vector is also appended to a memory-mapped float32 file there, so
+    the cache survives restarts; disk hits are promoted back into the LRU.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    KEYS_FILE = "keys.txt"
+    META_FILE = "meta.json"
+
+    def __init__(self, model_name: str, max_entries: int = 10000, disk_path: Optional[str] = None):
+        """Create a cache.
+
+        Args:
+            model_name: Model the vectors belong to (part of the cache key)
+            max_entries: Maximum number of vectors in the in-memory tier
+            disk_path: Directory for the persistent tier, or None for memory only
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.disk_path = disk_path
+        self._disk_rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._load_disk_index()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached vector for a text, or None on a miss."""
+        key = self._key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                cache_lookups_counter.inc(model=self.model_name, result="hit")
+                return vector
+
+            vector = self._read_disk(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                cache_lookups_counter.inc(model=self.model_name, result="disk_hit")
+                return vector
+
+            self.misses += 1
+            cache_lookups_counter.inc(model=self.model_name, result="miss")
+            return None
+
+    def put(self, text: str, vector) -> np.ndarray:
+        """Cache a vector for a text and return the stored (read-only) array."""
+        key = self._key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector)
+            if self.disk_path and key not in self._disk_rows:
+                self._append_disk(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._lru),
+                "disk_entries": len(self._disk_rows)
+            }
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _load_disk_index(self):
+        """Read the key log written by previous runs."""
+        keys_path = os.path.join(self.disk_path, self.KEYS_FILE)
+        vectors_path = os.path.join(self.disk_path, self.VECTORS_FILE)
+        meta_path = os.path.join(self.disk_path, self.META_FILE)
+        if not all(os.path.exists(path) for path in (keys_path, vectors_path, meta_path)):
+            return
+
+        try:
+            with open(meta_path, "r") as f:
+                self._dim = int(json.load(f)["dim"])
+            with open(keys_path, "r") as f:
+                keys = [line.strip() for line in f if line.strip()]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not read embedding cache at %s: %s", self.disk_path, e)
+            self._dim = None
+            return
+
+        # A torn last write can leave one file longer than the other; keep
+        # only rows present in both and cut the rest so appends stay aligned
+        row_bytes = 4 * self._dim
+        rows = min(len(keys), os.path.getsize(vectors_path) // row_bytes)
+        if rows != len(keys) or os.path.getsize(vectors_path) != rows * row_bytes:
+            with open(vectors_path, "r+b") as f:
+                f.truncate(rows * row_bytes)
+            with open(keys_path, "w") as f:
+                f.writelines(key + "\n" for key in keys[:rows])
+
+        self._disk_rows = {key: row for row, key in enumerate(keys[:rows])}
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        row = self._disk_rows.get(key)
+        if row is None:
+            return None
+
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            vectors_path = os.path.join(self.disk_path, self.VECTORS_FILE)
+            self._mmap = np.memmap(vectors_path, dtype=np.float32, mode="r",
+                                   shape=(len(self._disk_rows), self._dim))
+
+        vector = np.array(self._mmap[row])
+        vector.setflags(write=False)
+        return vector
+
+    def _append_disk(self, key: str, vector: np.ndarray):
+        if vector.ndim != 1:
+            return
+
+        try:
+            if self._dim is None:
+                with open(os.path.join(self.disk_path, self.META_FILE), "w") as f:
+                    json.dump({"model": self.model_name, "dim": int(vector.shape[0])}, f)
+                self._dim = int(vector.shape[0])
+            elif vector.shape[0] != self._dim:
+                return
+
+            with open(os.path.join(self.disk_path, self.VECTORS_FILE), "ab") as f:
+                f.write(vector.tobytes())
+            with open(os.path.join(self.disk_path, self.KEYS_FILE), "a") as f:
+                f.write(key + "\n")
+        except OSError as e:
+            logger.warning("Could not write embedding cache to %s: %s", self.disk_path, e)
+            return
+
+        self._disk_rows[key] = len(self._disk_rows)
+
+
+def get_embedding_cache(model_name: str = DEFAULT_EMBEDDING_MODEL) -> EmbeddingCache:
+    """Get the shared embedding cache for a model, configured from config.yml."""
+    cache = _caches.get(model_name)
+    if cache is not None:
+        return cache
+
+    with _registry_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache_config = get_embedding_config()["cache"]
+            disk_path = cache_config.get("disk_path") or None
+            if disk_path and get_worker_processes() > 1:
+                # The disk tier is append-only with one writer; concurrent
+                # workers would interleave appends and misalign keys and vectors
+                logger.warning("Embedding disk cache disabled: it is not shared safely across %d worker processes",
+                               get_worker_processes())
+                disk_path = None
+            if disk_path:
+                disk_path = os.path.join(os.path.expanduser(disk_path), model_name.replace("/", "_"))
+            cache = EmbeddingCache(
+                model_name,
+                max_entries=int(cache_config.get("max_entries", 10000)),
+                disk_path=disk_path
+            )
+            _caches[model_name] = cache
+            cache_entries_gauge.set_function(lambda: len(cache._lru), model=model_name, tier="memory")
+            cache_entries_gauge.set_function(lambda: len(cache._disk_rows), model=model_name, tier="disk")
+
+    return cache
+
+
+class EmbeddingBatcher:
+    """Micro-batching front end for a shared embedding model.
+
+    Concurrent callers enqueue single texts; a worker thread collects them
+    for up to ``max_wait_ms`` (or until ``max_batch_size`` are pending), runs
+    one vectorized ``encode(list_of_texts)`` call and hands each caller its
+    row of the result.
+    """
+
+    def __init__(self, model_name: str, max_batch_size: int = 32, max_wait_ms: float = 5):
+        """Create a batcher.
+
+        Args:
+            model_name: Model to encode with (loaded through the shared registry)
+            max_batch_size: Maximum texts per encode call
+            max_wait_ms: Longest time the first text of a batch waits for company
+        """
+        self.model_name = model_name
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._pending: List[Tuple[str, Future, float]] = []
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    def encode(self, text: str) -> np.ndarray:
+        """Encode one text, blocking until its batch has been computed."""
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding and return a future for its vector."""
+        future = Future()
+        with self._cond:
+            self._pending.append((text, future, time.monotonic()))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"embedding-batcher-{self.model_name}", daemon=True
+                )
+                self._worker.start()
+            self._cond.notify()
+        return future
+
+    def _next_batch(self) -> List[Tuple[str, Future, float]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # Wait for more texts until the oldest one has waited max_wait
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            for _, _, enqueued in batch:
+                queue_wait_histogram.observe(started - enqueued, model=self.model_name)
+            batch_size_histogram.observe(len(batch), model=self.model_name)
+
+            try:
+                vectors = get_embedding_model(self.model_name).encode(
+                    [text for text, _, _ in batch], batch_size=len(batch)
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def get_embedding_batcher(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[EmbeddingBatcher]:
+    """Get the shared micro-batcher for a model, or None if batching is disabled."""
+    batcher = _batchers.get(model_name)
+    if batcher is not None:
+        return batcher
+
+    batching_config = get_embedding_config()["batching"]
+    if not batching_config.get("enabled", True):
+        return None
+
+    with _registry_lock:
+        batcher = _batchers.get(model_name)
+        if batcher is None:
+            batcher = EmbeddingBatcher(
+                model_name,
+                max_batch_size=batching_config.get("max_batch_size", 32),
+                max_wait_ms=batching_config.get("max_wait_ms", 5)
+            )
+            _batchers[model_name] = batcher
+
+    return batcher
+
+
+def encode_cached(text: str, model_name: str = DEFAULT_EMBEDDING_MODEL) -> np.ndarray:
+    """Encode a text with the shared model, going through the shared cache.
+    
+    Cache misses are encoded through the micro-batcher when batching is enabled.
+    """
+    started = time.perf_counter()
+    cache = get_embedding_cache(model_name)
+    vector = cache.get(text)
+    if vector is not None:
+        encode_histogram.observe(time.perf_counter() - started, model=model_name, cache="hit")
+        return vector
+
+    batcher = get_embedding_batcher(model_name)
+    if batcher is not None:
+        vector = batcher.encode(text)
+    else:
+        vector = get_embedding_model(model_name).encode(text)
+    vector = cache.put(text, vector)
+    encode_histogram.observe(time.perf_counter() - started, model=model_name, cache="miss")
+    return vector
+
+
+def encode_many_cached(texts: Sequence[str], model_name: str = DEFAULT_EMBEDDING_MODEL,
+                       batch_size: int = 64) -> List[np.ndarray]:
+    """Encode many texts at once, going through the shared cache.
+
+    Cache misses are encoded directly in vectorized batches of ``batch_size``
+    (bulk callers already have a full batch, so the micro-batcher is skipped).
+
+    Returns:
+        One vector per input text, in order
+    """
+    cache = get_embedding_cache(model_name)
+    vectors: List[Optional[np.ndarray]] = [cache.get(text) for text in texts]
+
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        encoded = get_embedding_model(model_name).encode(
+            [texts[i] for i in missing], batch_size=batch_size
+        )
+        for i, vector in zip(missing, encoded):
+            vectors[i] = cache.put(texts[i], vector)
+
+    return vectors
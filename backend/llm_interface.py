@@ -1,11 +1,41 @@
 import requests
 import json
+import logging
 import os
-from typing import Dict, List, Optional, Union, Any
+import time
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Union, Any
+from requests.adapters import HTTPAdapter
+from metrics import counter, histogram
 from port_utils import get_llm_config
+from structured_logging import get_logger, truncate_payload
+from tracing import STATUS_ERROR, current_span, span
 
-class LlamaCppInterface:
-    """Interface for communicating with llama.cpp server running Mistral or other models."""
+logger = get_logger(__name__)
+
+request_histogram = histogram("llm_request_seconds", "Total time of LLM requests", ("kind", "result"))
+first_token_histogram = histogram(
+    "llm_time_to_first_token_seconds", "Time until a streamed LLM request yields its first token", ("kind",)
+)
+tokens_counter = counter("llm_tokens_total", "Tokens processed by the LLM, from its usage reports", ("direction",))
+
+def _record_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    if prompt_tokens:
+        tokens_counter.inc(prompt_tokens, direction="prompt")
+    if completion_tokens:
+        tokens_counter.inc(completion_tokens, direction="completion")
+    current_span().set_attributes(**{
+        "gen_ai.usage.input_tokens": prompt_tokens,
+        "gen_ai.usage.output_tokens": completion_tokens,
+    })
+
+class RequestCancelled(Exception):
+    """Raised when the client waiting for a completion has gone away."""
+
+class _LlamaCppBase:
+    """Settings, request payloads and stream parsing shared by the sync and
+    async llama.cpp interfaces."""
     
     def __init__(
         self, 
@@ -14,8 +44,14 @@ class LlamaCppInterface:
         temperature: float = 0.7,
         max_tokens: int = 512,
         top_p: float = 0.95,
+        pool_size: Optional[int] = None,
+        keep_alive: Optional[bool] = None,
+        connect_timeout: Optional[float] = None,
+        first_byte_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
+        cache_prompt: Optional[bool] = None,
     ):
-        """Initialize the LlamaCpp interface.
+        """Initialize the interface.
         
         Args:
             api_url: The URL of the API.
@@ -23,10 +59,20 @@ class LlamaCppInterface:
             temperature: The temperature to use for sampling.
             max_tokens: The maximum number of tokens to generate.
             top_p: The top_p value to use for sampling.
+            pool_size: Maximum number of pooled connections to the server.
+            keep_alive: Whether to reuse connections between requests.
+            connect_timeout: Seconds to wait for the TCP connection.
+            first_byte_timeout: Seconds to wait for the first byte of a response.
+            total_timeout: Seconds allowed for a whole request.
+            cache_prompt: Ask the server to reuse the KV cache of a shared prompt prefix.
+            
+        Connection settings default to the ``llm.client`` section of config.yml.
         """
+        llm_config = get_llm_config()
+        client_config = llm_config['client']
+        
         # Use environment variables if provided, with suitable fallbacks
         if api_url is None:
-            llm_config = get_llm_config()
             api_url = llm_config['url']
         
         model_name = model_name or os.environ.get("LLAMA_CPP_MODEL", "openchat")
@@ -37,6 +83,28 @@ class LlamaCppInterface:
         self.max_tokens = max_tokens
         self.top_p = top_p
         
+        self.pool_size = int(pool_size if pool_size is not None else client_config['pool_size'])
+        self.keep_alive = bool(keep_alive if keep_alive is not None else client_config['keep_alive'])
+        self.connect_timeout = float(
+            connect_timeout if connect_timeout is not None else client_config['connect_timeout']
+        )
+        self.first_byte_timeout = float(
+            first_byte_timeout if first_byte_timeout is not None else client_config['first_byte_timeout']
+        )
+        self.total_timeout = float(
+            total_timeout if total_timeout is not None else client_config['total_timeout']
+        )
+        
+        self.cache_prompt = bool(
+            cache_prompt if cache_prompt is not None else client_config['cache_prompt']
+        )
+        
+        # Pooled HTTP session, created on first use
+        self._session = None
+        
+        # Set to False once the server reports it can't do fill-in-the-middle
+        self.infill_supported = True
+    
     def _build_prompt(self, system_prompt: Optional[str], user_prompt: str) -> List[Dict[str, str]]:
         """Build a prompt in the expected format for the API."""
         messages = []
@@ -50,27 +118,22 @@ class LlamaCppInterface:
         
         return messages
     
-    def call(
-        self, 
-        prompt: str, 
+    def _build_request_data(
+        self,
+        prompt: str,
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
         stop: Optional[List[str]] = None,
+        stream: bool = False,
+        id_slot: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Call the LLM with the given prompt.
+        """Build the chat completions request body, applying instance defaults.
         
-        Args:
-            prompt: The user's prompt/question
-            system_prompt: Optional system prompt to guide model behavior
-            temperature: Override default temperature
-            max_tokens: Override default max_tokens
-            top_p: Override default top_p
-            stop: Optional list of stop sequences
-            
-        Returns:
-            Dictionary containing the model's response
+        ``cache_prompt`` lets llama.cpp reuse the KV cache for the longest
+        common prefix with the slot's previous prompt; ``id_slot`` pins the
+        request to a slot so that prefix is the same session's last prompt.
         """
         # Use instance defaults unless overridden
         temperature = temperature if temperature is not None else self.temperature
@@ -89,22 +152,233 @@ class LlamaCppInterface:
         # Add stop sequences if provided
         if stop:
             request_data["stop"] = stop
+        
+        if stream:
+            request_data["stream"] = True
+            # Ask for the usage block in the final chunk, as non-streamed responses have
+            request_data["stream_options"] = {"include_usage": True}
+        
+        if self.cache_prompt:
+            request_data["cache_prompt"] = True
+        if id_slot is not None:
+            request_data["id_slot"] = id_slot
+        
+        return request_data
+    
+    def _build_infill_data(
+        self,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Build a native /infill or /completion request body, applying instance defaults."""
+        request_data = {
+            "n_predict": max_tokens if max_tokens is not None else self.max_tokens,
+            "temperature": temperature if temperature is not None else self.temperature,
+            "top_p": top_p if top_p is not None else self.top_p,
+            "cache_prompt": self.cache_prompt,
+        }
+        if stop:
+            request_data["stop"] = stop
+        if id_slot is not None:
+            request_data["id_slot"] = id_slot
+        return request_data
+    
+    def _build_warm_up_data(self, system_prompt: str, id_slot: Optional[int] = None) -> Dict[str, Any]:
+        """Build a request that prefills the prompt cache with a system prompt alone."""
+        request_data = self._build_request_data("", system_prompt, max_tokens=1, id_slot=id_slot)
+        request_data["messages"] = request_data["messages"][:1]
+        request_data["cache_prompt"] = True
+        return request_data
+    
+    @staticmethod
+    def _completion_text(response: Dict[str, Any]) -> str:
+        """The generated text of a chat completion response, or an "Error: ..." string."""
+        # Check for errors
+        if "error" in response and response["error"]:
+            return f"Error: {response.get('message', 'Unknown error')}"
+            
+        # Extract completion text
+        try:
+            return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        except (KeyError, IndexError):
+            return "Error: Unable to parse model response"
+    
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[Union[str, bool]]:
+        """Parse one server-sent event line.
+        
+        Returns the content delta, ``True`` at the end of the stream, or
+        ``None`` for lines that carry no content. A usage block, if the
+        line has one, is added to the token counters.
+        """
+        if not line or not line.startswith("data:"):
+            return None
+        
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return True
+        
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            return None
+        
+        usage = chunk.get("usage")
+        if usage:
+            _record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        
+        choices = chunk.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or None
+    
+    @classmethod
+    def _iter_stream_deltas(cls, lines: Iterator[str]) -> Iterator[str]:
+        """Yield content deltas from OpenAI-style server-sent event lines."""
+        for line in lines:
+            parsed = cls._parse_stream_line(line)
+            if parsed is True:
+                break
+            if parsed:
+                yield parsed
+    
+    @property
+    def server_url(self) -> str:
+        """Server root URL (api_url without the OpenAI-compatible /v1 suffix)."""
+        url = self.api_url.rstrip("/")
+        return url[:-3] if url.endswith("/v1") else url
+
+class LlamaCppInterface(_LlamaCppBase):
+    """Interface for communicating with llama.cpp server running Mistral or other models."""
+    
+    @property
+    def session(self) -> requests.Session:
+        """Pooled HTTP session shared by all sync calls on this interface."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+            self._session = session
+        return self._session
+    
+    @property
+    def timeout(self):
+        """(connect, read) timeout tuple passed to requests."""
+        return (self.connect_timeout, self.first_byte_timeout)
+    
+    def close(self):
+        """Close pooled connections."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def _check_deadline(self, deadline: float):
+        """Raise a timeout once the total request budget is spent."""
+        if time.monotonic() > deadline:
+            raise requests.Timeout(f"LLM request exceeded total timeout of {self.total_timeout}s")
+    
+    def _read_json_with_deadline(self, response: requests.Response, deadline: float) -> Dict[str, Any]:
+        """Read a streamed response body, enforcing the total timeout."""
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=8192):
+            body.extend(chunk)
+            self._check_deadline(deadline)
+        return json.loads(body.decode(response.encoding or "utf-8"))
+        
+    def call(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """Call the LLM with the given prompt.
+        
+        Args:
+            prompt: The user's prompt/question
+            system_prompt: Optional system prompt to guide model behavior
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            top_p: Override default top_p
+            stop: Optional list of stop sequences
+            id_slot: llama.cpp slot to run on (see SlotAffinity)
+            cancelled: Returns True once the result is no longer wanted. The
+                request is then streamed from the server so it can be aborted
+                between tokens.
+            
+        Returns:
+            Dictionary containing the model's response
+            
+        Raises:
+            RequestCancelled: If cancelled() became true before the end
+        """
+        with span("LlamaCppInterface.call", kind="client", **{
+            "gen_ai.request.model": self.model_name,
+            "llm.prompt_chars": len(prompt) + len(system_prompt or ""),
+            "llm.cancellable": cancelled is not None,
+        }) as call_span:
+            response = self._call(prompt, system_prompt, temperature, max_tokens, top_p, stop, id_slot, cancelled)
+            if response.get("error"):
+                call_span.set_status(STATUS_ERROR, response.get("message", ""))
+            else:
+                choices = response.get("choices") or [{}]
+                call_span.set_attribute(
+                    "llm.response_chars", len((choices[0].get("message") or {}).get("content") or "")
+                )
+            return response
+    
+    def _call(self, prompt: str, system_prompt: Optional[str], temperature: Optional[float],
+              max_tokens: Optional[int], top_p: Optional[float], stop: Optional[List[str]],
+              id_slot: Optional[int], cancelled: Optional[Callable[[], bool]]) -> Dict[str, Any]:
+        request_data = self._build_request_data(
+            prompt, system_prompt, temperature, max_tokens, top_p, stop,
+            stream=cancelled is not None, id_slot=id_slot
+        )
             
         try:
+            if cancelled is not None:
+                content = "".join(self._stream_deltas(request_data, cancelled))
+                return {
+                    "object": "chat.completion",
+                    "model": self.model_name,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }]
+                }
+            
             # Make API request
             url = f"{self.api_url}/chat/completions"
-            print(f"Calling LLM API: {url}")
-            print(f"Request data: {json.dumps(request_data, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Calling LLM API", extra={"url": url, "payload": truncate_payload(request_data)})
             
-            response = requests.post(url, json=request_data, timeout=60)
-            response.raise_for_status()
-            
-            return response.json()
+            started = time.monotonic()
+            result = "error"
+            try:
+                deadline = started + self.total_timeout
+                with self.session.post(url, json=request_data, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    body = self._read_json_with_deadline(response, deadline)
+                usage = body.get("usage") or {}
+                _record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+                result = "ok"
+                return body
+            finally:
+                request_histogram.observe(time.monotonic() - started, kind="chat", result=result)
             
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             # Handle request errors
             error_msg = f"Error calling llama.cpp API: {str(e)}"
-            print(f"ERROR: {error_msg}")
+            logger.error(error_msg)
             return {
                 "error": True,
                 "message": error_msg,
@@ -127,28 +401,527 @@ class LlamaCppInterface:
         Returns:
             The generated text as a string
         """
-        response = self.call(prompt, system_prompt, **kwargs)
+        return self._completion_text(self.call(prompt, system_prompt, **kwargs))
+    
+    def stream_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[str]:
+        """Stream the completion text from the model as it is generated.
         
-        # Check for errors
-        if "error" in response and response["error"]:
-            return f"Error: {response.get('message', 'Unknown error')}"
+        Sends the request with ``stream: true`` and consumes llama.cpp's
+        server-sent events incrementally, yielding each content delta.
+        Closing the iterator early closes the connection, which stops
+        generation on the server.
+        
+        Args:
+            prompt: The user's prompt/question
+            system_prompt: Optional system prompt to guide model behavior
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            top_p: Override default top_p
+            stop: Optional list of stop sequences
+            id_slot: llama.cpp slot to run on (see SlotAffinity)
+            cancelled: Returns True once the result is no longer wanted
             
-        # Extract completion text
+        Yields:
+            Pieces of the generated text in order
+            
+        Raises:
+            RequestCancelled: If cancelled() became true before the end
+        """
+        request_data = self._build_request_data(
+            prompt, system_prompt, temperature, max_tokens, top_p, stop, stream=True, id_slot=id_slot
+        )
+        
+        # Not activated: a generator must not change its consumer's active span
+        with span("LlamaCppInterface.stream_completion", kind="client", activate=False, **{
+            "gen_ai.request.model": self.model_name,
+            "llm.prompt_chars": len(prompt) + len(system_prompt or ""),
+        }) as stream_span:
+            response_chars = 0
+            try:
+                for delta in self._stream_deltas(request_data, cancelled):
+                    response_chars += len(delta)
+                    yield delta
+            except requests.RequestException as e:
+                error_msg = f"Error calling llama.cpp API: {str(e)}"
+                logger.error(error_msg)
+                stream_span.set_status(STATUS_ERROR, error_msg)
+                yield f"Error: {error_msg}"
+            finally:
+                stream_span.set_attribute("llm.response_chars", response_chars)
+    
+    def _stream_deltas(self, request_data: Dict[str, Any],
+                       cancelled: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+        """Send a streaming request and yield its content deltas.
+        
+        ``cancelled`` is checked before sending and after every delta; the
+        response is closed as soon as it returns True, so llama.cpp stops
+        generating and frees the slot.
+        """
+        if cancelled is not None and cancelled():
+            raise RequestCancelled("Client disconnected before the LLM request was sent")
+        
+        url = f"{self.api_url}/chat/completions"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Streaming from LLM API", extra={"url": url, "payload": truncate_payload(request_data)})
+        
+        started = time.monotonic()
+        result = "error"
+        first = True
         try:
-            return response.get("choices", [{}])[0].get("message", {}).get("content", "")
-        except (KeyError, IndexError):
-            return "Error: Unable to parse model response"
+            deadline = started + self.total_timeout
+            with self.session.post(url, json=request_data, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for delta in self._iter_stream_deltas(response.iter_lines(decode_unicode=True)):
+                    if cancelled is not None and cancelled():
+                        raise RequestCancelled("Client disconnected during generation")
+                    if first:
+                        first_token_histogram.observe(time.monotonic() - started, kind="chat")
+                        first = False
+                    yield delta
+                    self._check_deadline(deadline)
+            result = "ok"
+        except (GeneratorExit, RequestCancelled):
+            result = "cancelled"
+            raise
+        finally:
+            request_histogram.observe(time.monotonic() - started, kind="chat", result=result)
+    
+    def warm_up(self, system_prompt: str, id_slot: Optional[int] = None) -> bool:
+        """Prefill the server's prompt cache with a system prompt.
+        
+        Sends the system prompt alone with ``cache_prompt`` so a following
+        request on the same slot that starts with the same prefix can reuse
+        its KV cache.
+        
+        Returns:
+            True if the server accepted the request
+        """
+        request_data = self._build_warm_up_data(system_prompt, id_slot)
+        try:
+            response = self.session.post(
+                f"{self.api_url}/chat/completions", json=request_data, timeout=self.timeout
+            )
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+    
+    def infill(
+        self,
+        prefix: str,
+        suffix: str = "",
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> str:
+        """Fill in the middle: generate the text between prefix and suffix.
+        
+        Uses llama.cpp's native ``/infill`` endpoint, which formats the
+        model's FIM tokens itself. If the model has none, the server rejects
+        the request; from then on the prefix alone is continued with the
+        raw ``/completion`` endpoint.
+        
+        Args:
+            prefix: Text before the cursor
+            suffix: Text after the cursor
+            temperature: Override default temperature
+            max_tokens: Override default max_tokens
+            top_p: Override default top_p
+            stop: Optional list of stop sequences
+            id_slot: llama.cpp slot to run on (see SlotAffinity)
+            cancelled: Returns True once the result is no longer wanted
+            
+        Returns:
+            The generated text, or an "Error: ..." string
+            
+        Raises:
+            RequestCancelled: If cancelled() became true before the end
+        """
+        request_data = self._build_infill_data(temperature, max_tokens, top_p, stop, id_slot)
+        
+        with span("LlamaCppInterface.infill", kind="client", **{
+            "gen_ai.request.model": self.model_name,
+            "llm.prompt_chars": len(prefix) + len(suffix),
+        }) as infill_span:
+            completion = self._infill(request_data, prefix, suffix, cancelled)
+            if completion.startswith("Error: "):
+                infill_span.set_status(STATUS_ERROR, completion)
+            else:
+                infill_span.set_attribute("llm.response_chars", len(completion))
+            return completion
+    
+    def _infill(self, request_data: Dict[str, Any], prefix: str, suffix: str,
+                cancelled: Optional[Callable[[], bool]]) -> str:
+        try:
+            if self.infill_supported:
+                try:
+                    return self._native_completion(
+                        "/infill", dict(request_data, input_prefix=prefix, input_suffix=suffix), cancelled
+                    )
+                except requests.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else None
+                    if status not in (400, 404, 501):
+                        raise
+                    logger.warning("llama.cpp /infill not supported (%s), using /completion without the suffix", status)
+                    self.infill_supported = False
+            return self._native_completion("/completion", dict(request_data, prompt=prefix), cancelled)
+        except (requests.RequestException, ValueError) as e:
+            error_msg = f"Error calling llama.cpp API: {str(e)}"
+            logger.error(error_msg)
+            return f"Error: {error_msg}"
+    
+    def _native_completion(self, path: str, request_data: Dict[str, Any],
+                           cancelled: Optional[Callable[[], bool]] = None) -> str:
+        """Call a llama.cpp native completion endpoint and return its content.
+        
+        With a ``cancelled`` check the response is streamed so it can be
+        aborted between tokens.
+        """
+        url = f"{self.server_url}{path}"
+        kind = path.strip("/")
+        started = time.monotonic()
+        deadline = started + self.total_timeout
+        result = "error"
+        try:
+            if cancelled is None:
+                with self.session.post(url, json=request_data, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    body = self._read_json_with_deadline(response, deadline)
+                _record_usage(body.get("tokens_evaluated"), body.get("tokens_predicted"))
+                result = "ok"
+                return body.get("content", "")
+            
+            if cancelled():
+                raise RequestCancelled("Client disconnected before the LLM request was sent")
+            parts = []
+            with self.session.post(url, json=dict(request_data, stream=True), stream=True,
+                                   timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    if cancelled():
+                        raise RequestCancelled("Client disconnected during generation")
+                    try:
+                        chunk = json.loads(line[len("data:"):].strip())
+                    except json.JSONDecodeError:
+                        continue
+                    if not parts:
+                        first_token_histogram.observe(time.monotonic() - started, kind=kind)
+                    parts.append(chunk.get("content", ""))
+                    if chunk.get("stop"):
+                        # The final chunk carries the request's token counts
+                        _record_usage(chunk.get("tokens_evaluated"), chunk.get("tokens_predicted"))
+                        break
+                    self._check_deadline(deadline)
+            result = "ok"
+            return "".join(parts)
+        except RequestCancelled:
+            result = "cancelled"
+            raise
+        finally:
+            request_histogram.observe(time.monotonic() - started, kind=kind, result=result)
+    
+    def for_request(self, request_type: Optional[str] = None, session_id: Optional[str] = None) -> "LlamaCppInterface":
+        """The client to use for one request. A single server serves every request."""
+        return self
+    
+    def tokenize(self, text: str) -> List[int]:
+        """Tokenize text with the server's model tokenizer (llama.cpp /tokenize)."""
+        response = self.session.post(
+            f"{self.server_url}/tokenize",
+            json={"content": text},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["tokens"]
     
     def is_available(self) -> bool:
         """Check if the model is available."""
         try:
             # Try to get the list of models
             url = f"{self.api_url}/models"
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=self.timeout)
             return response.status_code == 200
         except requests.RequestException:
             return False
 
+class SlotAffinity:
+    """Pins editor sessions to llama.cpp server slots.
+    
+    Each slot keeps the KV cache of its last prompt, so sending a session's
+    requests to the same slot lets repeated queries on the same file reuse
+    the prefill of the shared prefix. New sessions take a free slot, or the
+    least recently used session's slot once all are taken.
+    """
+    
+    def __init__(self, slots: int):
+        """Create the mapping.
+        
+        Args:
+            slots: Number of server slots (llama-server --parallel); 0 disables pinning
+        """
+        self.slots = max(0, int(slots))
+        self._sessions: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def slot_for(self, session_id: Optional[str]) -> Optional[int]:
+        """The slot for a session, or None if pinning is off or there is no session."""
+        if not self.slots or not session_id:
+            return None
+        with self._lock:
+            slot = self._sessions.get(session_id)
+            if slot is None:
+                used = set(self._sessions.values())
+                free = [candidate for candidate in range(self.slots) if candidate not in used]
+                if free:
+                    slot = free[0]
+                else:
+                    _, slot = self._sessions.popitem(last=False)
+                self._sessions[session_id] = slot
+            self._sessions.move_to_end(session_id)
+            return slot
+
+class AsyncLlamaCppInterface(_LlamaCppBase):
+    """Asyncio-native interface to a llama.cpp server.
+    
+    Offers the same methods as LlamaCppInterface, all as coroutines (and an
+    async iterator for stream_completion), over a single pooled aiohttp
+    session so many concurrent completions can share a small number of
+    keep-alive connections without a thread each. Cancel a request by
+    cancelling its task. Requires the optional ``aiohttp`` dependency.
+    """
+    
+    @staticmethod
+    def _aiohttp():
+        """The aiohttp module, imported on first use since it is optional."""
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise ImportError(
+                "AsyncLlamaCppInterface requires aiohttp. Install it with: pip install aiohttp"
+            ) from e
+        return aiohttp
+    
+    def _get_session(self):
+        """Create the pooled aiohttp session on first use (inside the running loop)."""
+        if self._session is None or self._session.closed:
+            aiohttp = self._aiohttp()
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                force_close=not self.keep_alive
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.total_timeout,
+                sock_connect=self.connect_timeout,
+                sock_read=self.first_byte_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+    
+    @classmethod
+    def _request_errors(cls):
+        """Exceptions that mean the request to the server failed."""
+        import asyncio
+        
+        return (cls._aiohttp().ClientError, asyncio.TimeoutError)
+    
+    async def close(self):
+        """Close pooled connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def call(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Call the LLM with the given prompt. See LlamaCppInterface.call."""
+        request_data = self._build_request_data(
+            prompt, system_prompt, temperature, max_tokens, top_p, stop, id_slot=id_slot
+        )
+        url = f"{self.api_url}/chat/completions"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Calling LLM API (async)", extra={"url": url, "payload": truncate_payload(request_data)})
+        
+        with span("AsyncLlamaCppInterface.call", kind="client", **{
+            "gen_ai.request.model": self.model_name,
+            "llm.prompt_chars": len(prompt) + len(system_prompt or ""),
+        }) as call_span:
+            started = time.monotonic()
+            result = "error"
+            try:
+                async with self._get_session().post(url, json=request_data) as response:
+                    response.raise_for_status()
+                    body = await response.json()
+                usage = body.get("usage") or {}
+                _record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+                result = "ok"
+                return body
+            except self._request_errors() + (ValueError,) as e:
+                error_msg = f"Error calling llama.cpp API: {str(e)}"
+                logger.error(error_msg)
+                call_span.set_status(STATUS_ERROR, error_msg)
+                return {
+                    "error": True,
+                    "message": error_msg,
+                    "details": str(e)
+                }
+            finally:
+                request_histogram.observe(time.monotonic() - started, kind="chat", result=result)
+    
+    async def get_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """Get just the completion text from the model. See LlamaCppInterface.get_completion."""
+        return self._completion_text(await self.call(prompt, system_prompt, **kwargs))
+    
+    async def stream_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the completion text as it is generated. See LlamaCppInterface.stream_completion."""
+        import asyncio
+        
+        request_data = self._build_request_data(
+            prompt, system_prompt, temperature, max_tokens, top_p, stop, stream=True, id_slot=id_slot
+        )
+        url = f"{self.api_url}/chat/completions"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Streaming from LLM API (async)", extra={"url": url, "payload": truncate_payload(request_data)})
+        
+        started = time.monotonic()
+        result = "error"
+        first = True
+        try:
+            async with self._get_session().post(url, json=request_data) as response:
+                response.raise_for_status()
+                async for raw_line in response.content:
+                    parsed = self._parse_stream_line(raw_line.decode("utf-8").strip())
+                    if parsed is True:
+                        break
+                    if parsed:
+                        if first:
+                            first_token_histogram.observe(time.monotonic() - started, kind="chat")
+                            first = False
+                        yield parsed
+            result = "ok"
+        except self._request_errors() as e:
+            error_msg = f"Error calling llama.cpp API: {str(e)}"
+            logger.error(error_msg)
+            yield f"Error: {error_msg}"
+        except (GeneratorExit, asyncio.CancelledError):
+            result = "cancelled"
+            raise
+        finally:
+            request_histogram.observe(time.monotonic() - started, kind="chat", result=result)
+    
+    async def warm_up(self, system_prompt: str, id_slot: Optional[int] = None) -> bool:
+        """Prefill the server's prompt cache with a system prompt. See LlamaCppInterface.warm_up."""
+        request_data = self._build_warm_up_data(system_prompt, id_slot)
+        try:
+            async with self._get_session().post(f"{self.api_url}/chat/completions", json=request_data) as response:
+                return response.status == 200
+        except self._request_errors():
+            return False
+    
+    async def infill(
+        self,
+        prefix: str,
+        suffix: str = "",
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+        id_slot: Optional[int] = None,
+    ) -> str:
+        """Fill in the middle: generate the text between prefix and suffix. See LlamaCppInterface.infill."""
+        aiohttp = self._aiohttp()
+        request_data = self._build_infill_data(temperature, max_tokens, top_p, stop, id_slot)
+        try:
+            if self.infill_supported:
+                try:
+                    return await self._native_completion(
+                        "/infill", dict(request_data, input_prefix=prefix, input_suffix=suffix)
+                    )
+                except aiohttp.ClientResponseError as e:
+                    if e.status not in (400, 404, 501):
+                        raise
+                    logger.warning("llama.cpp /infill not supported (%s), using /completion without the suffix", e.status)
+                    self.infill_supported = False
+            return await self._native_completion("/completion", dict(request_data, prompt=prefix))
+        except self._request_errors() + (ValueError,) as e:
+            error_msg = f"Error calling llama.cpp API: {str(e)}"
+            logger.error(error_msg)
+            return f"Error: {error_msg}"
+    
+    async def _native_completion(self, path: str, request_data: Dict[str, Any]) -> str:
+        """Call a llama.cpp native completion endpoint and return its content."""
+        kind = path.strip("/")
+        started = time.monotonic()
+        result = "error"
+        try:
+            async with self._get_session().post(f"{self.server_url}{path}", json=request_data) as response:
+                response.raise_for_status()
+                body = await response.json()
+            _record_usage(body.get("tokens_evaluated"), body.get("tokens_predicted"))
+            result = "ok"
+            return body.get("content", "")
+        finally:
+            request_histogram.observe(time.monotonic() - started, kind=kind, result=result)
+    
+    def for_request(self, request_type: Optional[str] = None,
+                    session_id: Optional[str] = None) -> "AsyncLlamaCppInterface":
+        """The client to use for one request. A single server serves every request."""
+        return self
+    
+    async def tokenize(self, text: str) -> List[int]:
+        """Tokenize text with the server's model tokenizer (llama.cpp /tokenize)."""
+        async with self._get_session().post(f"{self.server_url}/tokenize", json={"content": text}) as response:
+            response.raise_for_status()
+            return (await response.json())["tokens"]
+    
+    async def is_available(self) -> bool:
+        """Check if the model is available."""
+        try:
+            async with self._get_session().get(f"{self.api_url}/models") as response:
+                return response.status == 200
+        except self._request_errors():
+            return False
+
 # Allow for different server configurations
 def create_llm_interface(
     api_url: Optional[str] = None,
@@ -157,23 +930,62 @@ def create_llm_interface(
 ) -> LlamaCppInterface:
     """Create an LLM interface with environment variable overrides.
     
+    When no api_url is given and ``llm.endpoints`` lists several servers in
+    config.yml, returns an LlmRouter that balances requests across them.
+    
     Args:
         api_url: URL of the llama.cpp server API (can be overridden by LLAMA_CPP_API_URL env var)
         model_name: Name of the model to use (can be overridden by LLAMA_CPP_MODEL env var)
         **kwargs: Additional parameters to pass to LlamaCppInterface
         
     Returns:
-        LlamaCppInterface instance
+        LlamaCppInterface instance (or an LlmRouter with the same methods)
     """
+    model_name = model_name or os.environ.get("LLAMA_CPP_MODEL", "openchat")
+    
     # Allow overriding configuration via environment variables or port info
+    if api_url is None:
+        llm_config = get_llm_config()
+        if llm_config['endpoints']:
+            if os.environ.get('VSCODE_AGENT_LLM_URL'):
+                logger.info("Using the llm.endpoints pool from config.yml; VSCODE_AGENT_LLM_URL=%s is ignored",
+                            os.environ.get('VSCODE_AGENT_LLM_URL'))
+            from llm_router import create_llm_router
+            return create_llm_router(
+                llm_config['endpoints'], llm_config['routes'], llm_config['router'],
+                model_name=model_name, **kwargs
+            )
+        api_url = llm_config['url']
+        logger.info("Creating LLM interface with API URL from %s: %s, model: %s",
+                    "VSCODE_AGENT_LLM_URL" if llm_config['url_source'] == "env" else "config.yml",
+                    api_url, model_name)
+    else:
+        logger.info("Creating LLM interface with API URL: %s, model: %s", api_url, model_name)
+    return LlamaCppInterface(api_url=api_url, model_name=model_name, **kwargs)
+
+def create_async_llm_interface(
+    api_url: Optional[str] = None,
+    model_name: Optional[str] = None,
+    **kwargs
+) -> AsyncLlamaCppInterface:
+    """Create an asyncio LLM interface. Takes the same arguments as create_llm_interface."""
     if api_url is None:
         llm_config = get_llm_config()
         api_url = llm_config['url']
     
     model_name = model_name or os.environ.get("LLAMA_CPP_MODEL", "openchat")
     
-    print(f"Creating LLM interface with API URL: {api_url}, model: {model_name}")
-    return LlamaCppInterface(api_url=api_url, model_name=model_name, **kwargs)
+    logger.info("Creating async LLM interface with API URL: %s, model: %s", api_url, model_name)
+    return AsyncLlamaCppInterface(api_url=api_url, model_name=model_name, **kwargs)
+
+# Default interface instance for easy import, created on first access so
+# importing this module does not read config or open a session
+_default_llm: Optional[LlamaCppInterface] = None
 
-# Default interface instance for easy import
-default_llm = create_llm_interface() 
\ No newline at end of file
+def __getattr__(name: str):
+    global _default_llm
+    if name == "default_llm":
+        if _default_llm is None:
+            _default_llm = create_llm_interface()
+        return _default_llm
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
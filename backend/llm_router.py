@@ -0,0 +1,326 @@
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from llm_interface import LlamaCppInterface, RequestCancelled
+from metrics import counter, gauge
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+outstanding_gauge = gauge("llm_endpoint_outstanding", "Requests in flight per LLM endpoint", ("endpoint",))
+healthy_gauge = gauge("llm_endpoint_healthy", "Whether an LLM endpoint is in rotation", ("endpoint",))
+routed_counter = counter("llm_routed_requests_total", "Requests dispatched per LLM endpoint", ("endpoint", "result"))
+
+# Marker LlamaCppInterface puts at the start of a failed completion
+_ERROR_PREFIX = "Error: Error calling llama.cpp API"
+
+
+class LlmEndpoint:
+    """One llama.cpp server in the router's pool."""
+
+    def __init__(self, interface: LlamaCppInterface, name: str, groups: Sequence[str] = ()):
+        """Create an endpoint.
+
+        Args:
+            interface: Client for the server
+            name: Label used in logs and metrics
+            groups: Route groups this endpoint serves (e.g. "small", "big")
+        """
+        self.interface = interface
+        self.name = name
+        self.groups = frozenset(groups)
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        healthy_gauge.set(1, endpoint=name)
+        outstanding_gauge.set(0, endpoint=name)
+
+
+class LlmRouter:
+    """Load balancer over several llama.cpp servers.
+
+    Requests go to the healthy endpoint with the fewest requests in flight.
+    A request type can be routed to a group of endpoints (``routes`` maps
+    e.g. "code_completion" to "small"); if no endpoint of the group is
+    healthy, any healthy endpoint is used. Editor sessions stick to the
+    endpoint that served them last, so its slot keeps their prompt prefix
+    cached, as long as it is healthy and no more than ``affinity_slack``
+    requests busier than the least loaded candidate.
+
+    An endpoint is ejected after ``max_failures`` consecutive failed
+    requests or a failed ``is_available`` check; a background thread checks
+    every endpoint each ``health_check_interval`` seconds and readmits
+    ejected ones once they answer again. A failed request is retried on
+    the next endpoint (streams only until the first chunk is sent).
+
+    Exposes the LlamaCppInterface methods, so it can stand in for one.
+    """
+
+    def __init__(self, endpoints: List[LlmEndpoint], routes: Optional[Dict[str, str]] = None,
+                 max_failures: int = 3, health_check_interval: float = 10, affinity_slack: int = 1,
+                 max_sessions: int = 1024):
+        if not endpoints:
+            raise ValueError("LlmRouter needs at least one endpoint")
+        self.endpoints = endpoints
+        self.routes = dict(routes or {})
+        self.max_failures = max(1, int(max_failures))
+        self.health_check_interval = float(health_check_interval)
+        self.affinity_slack = int(affinity_slack)
+        self.max_sessions = int(max_sessions)
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, LlmEndpoint]" = OrderedDict()
+        self._tiebreak = itertools.count()
+        self._stopped = threading.Event()
+        self._health_thread = threading.Thread(target=self._health_loop, name="llm-router-health", daemon=True)
+        self._health_thread.start()
+
+    # Defaults come from the first endpoint (used e.g. for response cache keys)
+
+    @property
+    def primary(self) -> LlamaCppInterface:
+        return self.endpoints[0].interface
+
+    @property
+    def model_name(self) -> str:
+        return self.primary.model_name
+
+    @property
+    def temperature(self) -> float:
+        return self.primary.temperature
+
+    @property
+    def max_tokens(self) -> int:
+        return self.primary.max_tokens
+
+    @property
+    def top_p(self) -> float:
+        return self.primary.top_p
+
+    # Dispatch
+
+    def for_request(self, request_type: Optional[str] = None, session_id: Optional[str] = None) -> "_RoutedRequest":
+        """A client bound to a request type and editor session."""
+        return _RoutedRequest(self, self.routes.get(request_type) if request_type else None, session_id)
+
+    def _acquire(self, group: Optional[str], session_id: Optional[str], exclude: set) -> Optional[LlmEndpoint]:
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.healthy and e not in exclude]
+            candidates = [e for e in healthy if group in e.groups] if group else healthy
+            candidates = candidates or healthy
+            if not candidates:
+                return None
+
+            chosen = min(candidates, key=lambda e: (e.outstanding, next(self._tiebreak) % len(candidates)))
+            sticky = self._sessions.get(session_id) if session_id else None
+            if sticky in candidates and sticky.outstanding <= chosen.outstanding + self.affinity_slack:
+                chosen = sticky
+
+            if session_id:
+                self._sessions[session_id] = chosen
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+
+            chosen.outstanding += 1
+            outstanding_gauge.set(chosen.outstanding, endpoint=chosen.name)
+            return chosen
+
+    def _release(self, endpoint: LlmEndpoint, ok: bool):
+        with self._lock:
+            endpoint.outstanding -= 1
+            outstanding_gauge.set(endpoint.outstanding, endpoint=endpoint.name)
+            routed_counter.inc(endpoint=endpoint.name, result="ok" if ok else "error")
+            if ok:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.consecutive_failures += 1
+            if endpoint.healthy and endpoint.consecutive_failures >= self.max_failures:
+                self._set_health(endpoint, False)
+
+    def _set_health(self, endpoint: LlmEndpoint, healthy: bool):
+        endpoint.healthy = healthy
+        endpoint.consecutive_failures = 0
+        healthy_gauge.set(1 if healthy else 0, endpoint=endpoint.name)
+        if healthy:
+            logger.info("LLM endpoint %s is back in rotation", endpoint.name)
+        else:
+            logger.warning("LLM endpoint %s ejected from rotation", endpoint.name)
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_check_interval):
+            for endpoint in self.endpoints:
+                available = endpoint.interface.is_available()
+                with self._lock:
+                    if available != endpoint.healthy:
+                        self._set_health(endpoint, available)
+
+    def _all_failed(self, group: Optional[str]) -> str:
+        return f"{_ERROR_PREFIX}: no healthy LLM endpoint available" + (f" for '{group}'" if group else "")
+
+    def call(self, prompt: str, system_prompt: Optional[str] = None, group: Optional[str] = None,
+             session_id: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """LlamaCppInterface.call on the least loaded endpoint, retrying others on failure."""
+        tried: set = set()
+        response: Dict[str, Any] = {"error": True, "message": self._all_failed(group)[len("Error: "):]}
+        while True:
+            endpoint = self._acquire(group, session_id, tried)
+            if endpoint is None:
+                return response
+            tried.add(endpoint)
+            ok = False
+            try:
+                response = endpoint.interface.call(prompt, system_prompt, **kwargs)
+                ok = not response.get("error")
+            except RequestCancelled:
+                # The client went away; the endpoint did nothing wrong
+                ok = True
+                raise
+            finally:
+                self._release(endpoint, ok)
+            if ok:
+                return response
+
+    def get_completion(self, prompt: str, system_prompt: Optional[str] = None, group: Optional[str] = None,
+                       session_id: Optional[str] = None, **kwargs) -> str:
+        """Completion text from the least loaded endpoint."""
+        response = self.call(prompt, system_prompt, group, session_id, **kwargs)
+        if response.get("error"):
+            return f"Error: {response.get('message', 'Unknown error')}"
+        try:
+            return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        except (KeyError, IndexError):
+            return "Error: Unable to parse model response"
+
+    def stream_completion(self, prompt: str, system_prompt: Optional[str] = None, group: Optional[str] = None,
+                          session_id: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """Stream from the least loaded endpoint; fails over until the first chunk is sent."""
+        tried: set = set()
+        while True:
+            endpoint = self._acquire(group, session_id, tried)
+            if endpoint is None:
+                yield self._all_failed(group)
+                return
+            tried.add(endpoint)
+            started = False
+            try:
+                for chunk in endpoint.interface.stream_completion(prompt, system_prompt, **kwargs):
+                    if not started and chunk.startswith(_ERROR_PREFIX):
+                        break
+                    started = True
+                    yield chunk
+            except (GeneratorExit, RequestCancelled):
+                # The consumer stopped early; the endpoint did nothing wrong
+                started = True
+                raise
+            finally:
+                self._release(endpoint, started)
+            if started:
+                return
+
+    def infill(self, prefix: str, suffix: str = "", group: Optional[str] = None,
+               session_id: Optional[str] = None, **kwargs) -> str:
+        """LlamaCppInterface.infill on the least loaded endpoint, retrying others on failure."""
+        tried: set = set()
+        text = self._all_failed(group)
+        while True:
+            endpoint = self._acquire(group, session_id, tried)
+            if endpoint is None:
+                return text
+            tried.add(endpoint)
+            ok = False
+            try:
+                text = endpoint.interface.infill(prefix, suffix, **kwargs)
+                ok = not text.startswith(_ERROR_PREFIX)
+            except RequestCancelled:
+                ok = True
+                raise
+            finally:
+                self._release(endpoint, ok)
+            if ok:
+                return text
+
+    def warm_up(self, system_prompt: str, id_slot: Optional[int] = None, group: Optional[str] = None,
+                session_id: Optional[str] = None) -> bool:
+        """Prefill the prompt cache on the endpoint the session will use."""
+        endpoint = self._acquire(group, session_id, set())
+        if endpoint is None:
+            return False
+        try:
+            return endpoint.interface.warm_up(system_prompt, id_slot)
+        finally:
+            self._release(endpoint, True)
+
+    def tokenize(self, text: str) -> List[int]:
+        """Tokenize with the first healthy endpoint (endpoints should share a tokenizer)."""
+        healthy = [e for e in self.endpoints if e.healthy] or self.endpoints
+        return healthy[0].interface.tokenize(text)
+
+    def is_available(self) -> bool:
+        """Whether any endpoint is available."""
+        return any(endpoint.interface.is_available() for endpoint in self.endpoints)
+
+    def close(self):
+        """Stop health checks and close every endpoint's connections."""
+        self._stopped.set()
+        for endpoint in self.endpoints:
+            endpoint.interface.close()
+
+
+class _RoutedRequest:
+    """LlmRouter bound to one request's route group and editor session."""
+
+    def __init__(self, router: LlmRouter, group: Optional[str], session_id: Optional[str]):
+        self.router = router
+        self.group = group
+        self.session_id = session_id
+
+    def __getattr__(self, name):
+        return getattr(self.router, name)
+
+    @property
+    def model_name(self) -> str:
+        # Route groups usually serve different models, so keep their cache entries apart
+        return f"{self.router.model_name}@{self.group}" if self.group else self.router.model_name
+
+    def call(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        return self.router.call(prompt, system_prompt, self.group, self.session_id, **kwargs)
+
+    def get_completion(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+        return self.router.get_completion(prompt, system_prompt, self.group, self.session_id, **kwargs)
+
+    def stream_completion(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Iterator[str]:
+        return self.router.stream_completion(prompt, system_prompt, self.group, self.session_id, **kwargs)
+
+    def infill(self, prefix: str, suffix: str = "", **kwargs) -> str:
+        return self.router.infill(prefix, suffix, self.group, self.session_id, **kwargs)
+
+    def warm_up(self, system_prompt: str, id_slot: Optional[int] = None) -> bool:
+        return self.router.warm_up(system_prompt, id_slot, self.group, self.session_id)
+
+
+def create_llm_router(endpoint_configs: List[Dict[str, Any]], routes: Optional[Dict[str, str]] = None,
+                      router_config: Optional[Dict[str, Any]] = None, **kwargs) -> LlmRouter:
+    """Create a router from llm.endpoints entries.
+
+    Args:
+        endpoint_configs: Dicts with "url" and optional "model", "name" and "groups"
+        routes: Request type to route group
+        router_config: llm.router settings (max_failures, health_check_interval, affinity_slack)
+        **kwargs: Parameters passed to every endpoint's LlamaCppInterface
+    """
+    endpoints = []
+    for index, endpoint_config in enumerate(endpoint_configs):
+        interface = LlamaCppInterface(
+            api_url=endpoint_config["url"],
+            model_name=endpoint_config.get("model") or kwargs.get("model_name"),
+            **{key: value for key, value in kwargs.items() if key != "model_name"}
+        )
+        groups = endpoint_config.get("groups") or []
+        if isinstance(groups, str):
+            groups = [groups]
+        endpoints.append(LlmEndpoint(interface, endpoint_config.get("name") or endpoint_config["url"], groups))
+    logger.info("Routing LLM requests across %d endpoints", len(endpoints))
+    return LlmRouter(endpoints, routes, **(router_config or {}))
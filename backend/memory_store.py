@@ -0,0 +1,617 @@
+import os
+import re
+import json
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from port_utils import get_memory_config, get_worker_processes
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Properties that search filters may match on (see Agent.search_memory's filter_obj)
+FILTERABLE_PROPERTIES = ("status", "priority", "agentId", "contextId")
+
+# (uuid, properties, vector) triples accepted by insert_many
+MemoryObject = Tuple[str, Dict[str, Any], Any]
+
+# Properties indexed for keyword (BM25) search, matching indexSearchable in create_schema.py
+SEARCHABLE_PROPERTIES = ("text", "tag", "metadata")
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, keeping identifiers like get_completion whole."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class MemoryStore(ABC):
+    """Storage interface behind Agent's memory methods.
+
+    Filters are dicts of property name to required value, for the
+    properties in FILTERABLE_PROPERTIES. Results are property dicts with the
+    object UUID added as "id"; search results also carry a relevance
+    "score" (higher is better).
+    """
+
+    def insert(self, properties: Dict[str, Any], vector, uuid: Optional[str] = None) -> str:
+        """Store one memory and return its UUID."""
+        uuids, errors = self.insert_many([(uuid or str(uuid4()), properties, vector)])
+        if errors:
+            raise RuntimeError(errors[0])
+        return uuids[0]
+
+    @abstractmethod
+    def insert_many(self, objects: Sequence[MemoryObject]) -> Tuple[Dict[int, str], Dict[int, str]]:
+        """Store many memories.
+
+        Returns:
+            (uuids, errors): dicts keyed by position in ``objects``
+        """
+
+    @abstractmethod
+    def search(self, vector, limit: int = 5, filters: Optional[Dict[str, Any]] = None,
+               query_text: Optional[str] = None, alpha: float = 1.0) -> List[Dict[str, Any]]:
+        """Return the most relevant memories, best first.
+
+        With query_text and alpha < 1 the search is hybrid: vector and BM25
+        keyword scores are each scaled to [0, 1] and blended as
+        ``alpha * vector + (1 - alpha) * keyword``. alpha = 1 is pure vector
+        search and alpha = 0 pure keyword search.
+        """
+
+    @abstractmethod
+    def fetch(self, filters: Optional[Dict[str, Any]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return memories matching the filters, without ranking."""
+
+    @abstractmethod
+    def update(self, uuid: str, properties: Dict[str, Any]):
+        """Merge properties into an existing memory."""
+
+    @abstractmethod
+    def delete(self, uuid: str):
+        """Delete a memory."""
+
+    def close(self):
+        """Release resources held by the store."""
+
+
+class WeaviateMemoryStore(MemoryStore):
+    """Memory store backed by the AgentMemory collection in Weaviate."""
+
+    def __init__(self, host: str, port: int, grpc_port: int, collection_name: str = "AgentMemory"):
+        from weaviate_client import get_weaviate_connection
+
+        # Borrow the process-wide connection; it reconnects on its own
+        self.connection = get_weaviate_connection(host, port, grpc_port)
+        self.collection_name = collection_name
+
+        # Get collection
+        try:
+            self.connection.collection(collection_name)
+            logger.info("Connected to %s collection", collection_name)
+        except Exception as e:
+            logger.error("Error connecting to %s collection: %s", collection_name, e)
+            logger.error("Please run create_schema.py first to set up the Weaviate schema.")
+            raise
+
+    @property
+    def client(self):
+        return self.connection.client
+
+    @property
+    def collection(self):
+        return self.connection.collection(self.collection_name)
+
+    def _run(self, operation):
+        return self.connection.run(operation, self.collection_name)
+
+    @staticmethod
+    def _build_filters(filters: Optional[Dict[str, Any]]):
+        from weaviate.classes import query
+
+        combined = None
+        for name, value in (filters or {}).items():
+            condition = query.Filter.by_property(name).equal(value)
+            combined = condition if combined is None else combined & condition
+        return combined
+
+    def insert_many(self, objects: Sequence[MemoryObject]) -> Tuple[Dict[int, str], Dict[int, str]]:
+        from weaviate.classes.data import DataObject
+
+        data_objects = [
+            DataObject(properties=properties, vector=vector, uuid=uuid)
+            for uuid, properties, vector in objects
+        ]
+        response = self._run(lambda collection: collection.data.insert_many(data_objects))
+        errors = {position: getattr(error, "message", str(error)) for position, error in response.errors.items()}
+        uuids = {
+            position: str(response.uuids.get(position, objects[position][0]))
+            for position in range(len(objects)) if position not in errors
+        }
+        return uuids, errors
+
+    def insert(self, properties: Dict[str, Any], vector, uuid: Optional[str] = None) -> str:
+        return str(self._run(lambda collection: collection.data.insert(properties=properties, vector=vector, uuid=uuid)))
+
+    def search(self, vector, limit: int = 5, filters: Optional[Dict[str, Any]] = None,
+               query_text: Optional[str] = None, alpha: float = 1.0) -> List[Dict[str, Any]]:
+        from weaviate.classes.query import HybridFusion, MetadataQuery
+
+        if query_text and alpha < 1:
+            result = self._run(lambda collection: collection.query.hybrid(
+                query=query_text,
+                vector=vector,
+                alpha=alpha,
+                fusion_type=HybridFusion.RELATIVE_SCORE,
+                query_properties=list(SEARCHABLE_PROPERTIES),
+                limit=limit,
+                filters=self._build_filters(filters),
+                return_metadata=MetadataQuery(score=True)
+            ))
+            return [dict(obj.properties, id=str(obj.uuid), score=obj.metadata.score or 0.0) for obj in result.objects]
+
+        result = self._run(lambda collection: collection.query.near_vector(
+            near_vector=vector,
+            limit=limit,
+            filters=self._build_filters(filters),
+            return_metadata=MetadataQuery(distance=True)
+        ))
+        # Cosine distance to similarity
+        return [
+            dict(obj.properties, id=str(obj.uuid), score=1.0 - (obj.metadata.distance or 0.0))
+            for obj in result.objects
+        ]
+
+    def fetch(self, filters: Optional[Dict[str, Any]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        result = self._run(lambda collection: collection.query.fetch_objects(
+            limit=limit, filters=self._build_filters(filters)
+        ))
+        return [dict(obj.properties, id=str(obj.uuid)) for obj in result.objects]
+
+    def update(self, uuid: str, properties: Dict[str, Any]):
+        self._run(lambda collection: collection.data.update(uuid=uuid, properties=properties))
+
+    def delete(self, uuid: str):
+        self._run(lambda collection: collection.data.delete_by_id(uuid=uuid))
+
+    def close(self):
+        # The connection is shared; it is closed by close_weaviate_connections at shutdown
+        pass
+
+
+class LocalMemoryStore(MemoryStore):
+    """In-process memory store for single-developer and CI deployments.
+
+    Vectors are L2-normalized float32 rows in ``vectors.f32``, read through
+    ``np.memmap``. Properties, updates and deletes are recorded in an
+    append-only ``log.jsonl`` that is replayed on open. Search is
+    brute-force cosine similarity, or an IVF index (k-means coarse
+    quantizer, ``nprobe`` lists scanned) once the store has enough rows.
+    Hybrid search adds BM25 over SEARCHABLE_PROPERTIES from an in-memory
+    inverted index rebuilt from the log on open.
+    """
+
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    VECTORS_FILE = "vectors.f32"
+    LOG_FILE = "log.jsonl"
+    META_FILE = "meta.json"
+
+    def __init__(self, path: str, index: str = "flat", nlist: int = 256, nprobe: int = 8):
+        """Open (or create) a store.
+
+        Args:
+            path: Directory holding the store files
+            index: "flat" for brute-force search or "ivf"
+            nlist: Number of IVF lists
+            nprobe: IVF lists scanned per query
+        """
+        self.path = os.path.expanduser(path)
+        self.index = index
+        self.nlist = max(1, int(nlist))
+        self.nprobe = max(1, int(nprobe))
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._row_uuids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._properties: Dict[str, Dict[str, Any]] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._alive: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._indexed_rows = 0
+
+        # BM25 inverted index: term -> {row: term frequency}, plus per-row lengths
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta_path = self._file(self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                self._dim = int(json.load(f)["dim"])
+
+        log_path = self._file(self.LOG_FILE)
+        if os.path.exists(log_path):
+            complete = 0
+            with open(log_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Torn last write
+                        break
+                    complete += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._apply(entry)
+            if os.path.getsize(log_path) != complete:
+                # Cut the torn line so the next append starts on a line of its own
+                with open(log_path, "r+b") as f:
+                    f.truncate(complete)
+
+        vectors_path = self._file(self.VECTORS_FILE)
+        if self._dim is not None and os.path.exists(vectors_path):
+            row_bytes = 4 * self._dim
+            rows_on_disk = os.path.getsize(vectors_path) // row_bytes
+            if os.path.getsize(vectors_path) != min(rows_on_disk, len(self._row_uuids)) * row_bytes:
+                # Vectors written without a log entry (or a torn row): cut them so new rows stay aligned
+                with open(vectors_path, "r+b") as f:
+                    f.truncate(min(rows_on_disk, len(self._row_uuids)) * row_bytes)
+            if rows_on_disk < len(self._row_uuids):
+                # Vectors missing for the last logged inserts: drop those rows
+                for uuid in self._row_uuids[rows_on_disk:]:
+                    if uuid is not None:
+                        self._rows.pop(uuid, None)
+                        self._properties.pop(uuid, None)
+                del self._row_uuids[rows_on_disk:]
+            self._remap()
+
+    def _apply(self, entry: Dict[str, Any]):
+        uuid = entry.get("uuid")
+        op = entry.get("op")
+        if op == "insert":
+            row = int(entry["row"])
+            while len(self._row_uuids) <= row:
+                self._row_uuids.append(None)
+            self._row_uuids[row] = uuid
+            self._rows[uuid] = row
+            self._properties[uuid] = entry["properties"]
+            self._index_terms(row, entry["properties"])
+        elif op == "update" and uuid in self._properties:
+            reindex = any(name in entry["properties"] for name in SEARCHABLE_PROPERTIES)
+            if reindex:
+                self._unindex_terms(self._rows[uuid], self._properties[uuid])
+            self._properties[uuid].update(entry["properties"])
+            if reindex:
+                self._index_terms(self._rows[uuid], self._properties[uuid])
+        elif op == "delete" and uuid in self._rows:
+            row = self._rows.pop(uuid)
+            self._row_uuids[row] = None
+            self._unindex_terms(row, self._properties.pop(uuid, {}))
+
+    @staticmethod
+    def _searchable_text(properties: Dict[str, Any]) -> str:
+        parts = []
+        for name in SEARCHABLE_PROPERTIES:
+            value = properties.get(name)
+            if isinstance(value, list):
+                parts.extend(str(item) for item in value)
+            elif value:
+                parts.append(str(value))
+        return " ".join(parts)
+
+    def _index_terms(self, row: int, properties: Dict[str, Any]):
+        terms = Counter(tokenize(self._searchable_text(properties)))
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[row] = count
+        length = sum(terms.values())
+        self._doc_lengths[row] = length
+        self._total_length += length
+
+    def _unindex_terms(self, row: int, properties: Dict[str, Any]):
+        if row not in self._doc_lengths:
+            return
+        self._total_length -= self._doc_lengths.pop(row)
+        for term in set(tokenize(self._searchable_text(properties))):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(row, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _bm25_scores(self, query_text: str, rows: np.ndarray) -> np.ndarray:
+        """BM25 scores of the given rows for a query."""
+        scores = np.zeros(rows.size, dtype=np.float32)
+        if not self._doc_lengths or rows.size == 0:
+            return scores
+
+        position = {int(row): i for i, row in enumerate(rows)}
+        documents = len(self._doc_lengths)
+        average_length = self._total_length / documents or 1.0
+        for term in set(tokenize(query_text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, frequency in postings.items():
+                i = position.get(row)
+                if i is None:
+                    continue
+                length_norm = 1 - self.BM25_B + self.BM25_B * self._doc_lengths[row] / average_length
+                scores[i] += idf * frequency * (self.BM25_K1 + 1) / (frequency + self.BM25_K1 * length_norm)
+        return scores
+
+    @staticmethod
+    def _scale(scores: np.ndarray) -> np.ndarray:
+        """Min-max scale scores to [0, 1] (relative score fusion)."""
+        if scores.size == 0:
+            return scores
+        low, high = float(scores.min()), float(scores.max())
+        if high == low:
+            return np.ones_like(scores) if high > 0 else np.zeros_like(scores)
+        return (scores - low) / (high - low)
+
+    def _append_log(self, entries: List[Dict[str, Any]]):
+        with open(self._file(self.LOG_FILE), "a") as f:
+            f.write("".join(json.dumps(entry, default=str) + "\n" for entry in entries))
+
+    def _remap(self):
+        """Re-open the vector file after it has grown."""
+        rows = len(self._row_uuids)
+        if rows == 0 or self._dim is None:
+            self._matrix = None
+        else:
+            self._matrix = np.memmap(self._file(self.VECTORS_FILE), dtype=np.float32, mode="r", shape=(rows, self._dim))
+        self._columns = {}
+        self._alive = None
+
+    def _alive_mask(self) -> np.ndarray:
+        if self._alive is None:
+            self._alive = np.array([uuid is not None for uuid in self._row_uuids], dtype=bool)
+        return self._alive
+
+    def _column(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            column = np.array(
+                [self._properties[uuid].get(name) if uuid is not None else None for uuid in self._row_uuids],
+                dtype=object
+            )
+            self._columns[name] = column
+        return column
+
+    def _filter_mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self._alive_mask().copy()
+        for name, value in (filters or {}).items():
+            mask &= self._column(name) == value
+        return mask
+
+    def _result(self, row: int, score: Optional[float] = None) -> Dict[str, Any]:
+        uuid = self._row_uuids[row]
+        result = dict(self._properties[uuid], id=uuid)
+        if score is not None:
+            result["score"] = score
+        return result
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def insert_many(self, objects: Sequence[MemoryObject]) -> Tuple[Dict[int, str], Dict[int, str]]:
+        uuids: Dict[int, str] = {}
+        errors: Dict[int, str] = {}
+        with self._lock:
+            accepted = []
+            batch_uuids = set()
+            for position, (uuid, properties, vector) in enumerate(objects):
+                vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+                uuid = str(uuid or uuid4())
+                if self._dim is None:
+                    self._dim = int(vector.shape[0])
+                    with open(self._file(self.META_FILE), "w") as f:
+                        json.dump({"dim": self._dim}, f)
+                if vector.shape[0] != self._dim:
+                    errors[position] = f"Vector has dimension {vector.shape[0]}, expected {self._dim}"
+                elif uuid in self._rows or uuid in batch_uuids:
+                    errors[position] = f"Memory {uuid} already exists"
+                else:
+                    accepted.append((position, uuid, properties, vector))
+                    batch_uuids.add(uuid)
+
+            if not accepted:
+                return uuids, errors
+
+            first_row = len(self._row_uuids)
+            vectors = self._normalize(np.stack([vector for _, _, _, vector in accepted]))
+            entries = []
+            for offset, (position, uuid, properties, _) in enumerate(accepted):
+                entries.append({"op": "insert", "uuid": uuid, "row": first_row + offset, "properties": properties})
+
+            # Vectors first: a row is only live once its log entry exists
+            with open(self._file(self.VECTORS_FILE), "ab") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            self._append_log(entries)
+
+            for entry, (position, uuid, _, _) in zip(entries, accepted):
+                self._apply(json.loads(json.dumps(entry, default=str)))
+                uuids[position] = uuid
+            self._remap()
+            self._assign_to_lists(first_row, vectors)
+        return uuids, errors
+
+    def search(self, vector, limit: int = 5, filters: Optional[Dict[str, Any]] = None,
+               query_text: Optional[str] = None, alpha: float = 1.0) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._matrix is None or limit <= 0:
+                return []
+
+            query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+            mask = self._filter_mask(filters)
+            hybrid = bool(query_text) and alpha < 1
+
+            candidates = self._ivf_candidates(query) if self.index == "ivf" else None
+            if candidates is not None:
+                if hybrid:
+                    # Keyword matches outside the probed lists are still candidates
+                    keyword_rows = [row for term in set(tokenize(query_text)) for row in self._postings.get(term, ())]
+                    candidates = np.unique(np.concatenate([candidates, np.asarray(keyword_rows, dtype=np.int64)]))
+                candidates = candidates[mask[candidates]]
+            else:
+                candidates = np.flatnonzero(mask)
+            if candidates.size == 0:
+                return []
+
+            scores = self._matrix[candidates] @ query
+            if hybrid:
+                keyword_scores = self._bm25_scores(query_text, candidates)
+                scores = alpha * self._scale(scores) + (1 - alpha) * self._scale(keyword_scores)
+            if candidates.size > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(candidates.size)
+            top = top[np.argsort(-scores[top])]
+            return [self._result(int(candidates[i]), float(scores[i])) for i in top]
+
+    def fetch(self, filters: Optional[Dict[str, Any]] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self._row_uuids:
+                return []
+            rows = np.flatnonzero(self._filter_mask(filters))[:limit]
+            return [self._result(int(row)) for row in rows]
+
+    def update(self, uuid: str, properties: Dict[str, Any]):
+        with self._lock:
+            if uuid not in self._properties:
+                raise KeyError(f"Memory {uuid} not found")
+            entry = {"op": "update", "uuid": uuid, "properties": properties}
+            self._append_log([entry])
+            self._apply(json.loads(json.dumps(entry, default=str)))
+            self._columns = {}
+
+    def delete(self, uuid: str):
+        with self._lock:
+            if uuid not in self._rows:
+                raise KeyError(f"Memory {uuid} not found")
+            self._append_log([{"op": "delete", "uuid": uuid}])
+            self._apply({"op": "delete", "uuid": uuid})
+            self._columns = {}
+            self._alive = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # IVF index
+
+    def _ivf_candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows in the nprobe lists nearest to the query, or None to scan everything."""
+        if self._centroids is None:
+            if int(self._alive_mask().sum()) < self.nlist * 39:
+                # Too few rows for a useful coarse quantizer
+                return None
+            self._train_ivf()
+
+        nearest = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        # Rows appended after training that are not yet assigned are always scanned
+        unassigned = np.arange(self._indexed_rows, len(self._row_uuids))
+        return np.concatenate([self._lists[i] for i in nearest] + [unassigned])
+
+    def _train_ivf(self, iterations: int = 10, sample_size: int = 100000):
+        rows = np.flatnonzero(self._alive_mask())
+        rng = np.random.default_rng(0)
+        sample = self._matrix[rng.choice(rows, size=min(sample_size, rows.size), replace=False)]
+
+        centroids = sample[rng.choice(sample.shape[0], size=self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(self.nlist):
+                members = sample[assignment == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+
+        self._centroids = centroids
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self._indexed_rows = 0
+        self._assign_to_lists(0, self._matrix)
+
+    def _assign_to_lists(self, first_row: int, vectors: np.ndarray, chunk: int = 65536):
+        if self._centroids is None:
+            return
+        for start in range(0, vectors.shape[0], chunk):
+            assignment = np.argmax(vectors[start:start + chunk] @ self._centroids.T, axis=1)
+            rows = np.arange(first_row + start, first_row + start + assignment.size)
+            for i in np.unique(assignment):
+                self._lists[i] = np.concatenate([self._lists[i], rows[assignment == i]])
+        self._indexed_rows = first_row + vectors.shape[0]
+
+
+LOCAL_STORE_WORKERS_ERROR = (
+    "The local memory backend is only safe in a single process; "
+    "use memory.backend 'weaviate' or run one worker"
+)
+
+_local_stores: Dict[str, LocalMemoryStore] = {}
+_local_stores_lock = threading.Lock()
+
+
+def get_local_memory_store(path: str, **kwargs) -> LocalMemoryStore:
+    """Get the process-wide LocalMemoryStore for a directory.
+
+    Agents sharing a path must share one instance, since the files are
+    append-only and owned by a single writer.
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    with _local_stores_lock:
+        store = _local_stores.get(path)
+        if store is None:
+            store = LocalMemoryStore(path, **kwargs)
+            _local_stores[path] = store
+        return store
+
+
+def create_memory_store(weaviate_config: Dict[str, Any]) -> MemoryStore:
+    """Create the memory store selected by memory.backend in config.yml.
+
+    Args:
+        weaviate_config: Weaviate host, port and grpc_port (used by the weaviate backend)
+    """
+    memory_config = get_memory_config()
+    backend = memory_config.get("backend", "weaviate")
+
+    if backend == "local":
+        if get_worker_processes() > 1:
+            raise ValueError(LOCAL_STORE_WORKERS_ERROR)
+        local_config = memory_config["local"]
+        logger.info("Using local memory store at %s", local_config['path'])
+        return get_local_memory_store(
+            local_config["path"],
+            index=local_config.get("index", "flat"),
+            nlist=local_config.get("nlist", 256),
+            nprobe=local_config.get("nprobe", 8)
+        )
+    if backend == "weaviate":
+        return WeaviateMemoryStore(
+            weaviate_config["host"], weaviate_config["port"], weaviate_config["grpc_port"]
+        )
+    raise ValueError(f"Unknown memory backend '{backend}', expected 'weaviate' or 'local'")
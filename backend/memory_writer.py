@@ -0,0 +1,172 @@
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from metrics import counter, gauge, histogram
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+queue_depth_gauge = gauge("memory_write_queue_depth", "Memories waiting in the write-behind queue")
+flush_latency_histogram = histogram("memory_write_flush_seconds", "Time to flush one batch of memories")
+flush_size_histogram = histogram(
+    "memory_write_flush_size", "Memories written per flush", buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+written_counter = counter("memory_write_items_total", "Memories written by the write-behind queue", ("result",))
+overflow_counter = counter(
+    "memory_write_overflow_total", "Memories written synchronously because the write-behind queue was full"
+)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Bounded background queue that persists memories off the response path.
+
+    Producers hand memories (dicts of ``Agent.add_memory`` keyword arguments)
+    to ``submit`` and return immediately; a worker thread drains the queue
+    and writes them in batches with ``Agent.add_memories_bulk``.
+
+    Backpressure: when the queue is full, ``submit`` waits up to
+    ``put_timeout`` seconds and then writes the memory synchronously, so a
+    stalled Weaviate slows producers down instead of losing data. Pending
+    memories are flushed by ``close``, which is registered with atexit.
+    """
+
+    def __init__(self, agent, max_queue: int = 1000, batch_size: int = 50,
+                 flush_interval_ms: float = 200, put_timeout: float = 1.0):
+        """Create and start the queue.
+
+        Args:
+            agent: The Agent whose memory store receives the writes
+            max_queue: Maximum memories waiting to be written
+            batch_size: Maximum memories per bulk write
+            flush_interval_ms: How long the worker waits to fill a batch
+            put_timeout: Seconds submit waits for space before writing inline
+        """
+        self.agent = agent
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.put_timeout = float(put_timeout)
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_queue)))
+        # Guards _closed and _putting, so close() enqueues _STOP only after every
+        # submit that saw the queue open has finished putting its memory
+        self._state = threading.Condition()
+        self._closed = False
+        self._putting = 0
+        self._worker = threading.Thread(target=self._run, name="memory-write-behind", daemon=True)
+        self._worker.start()
+
+        queue_depth_gauge.set_function(self._queue.qsize)
+        atexit.register(self.close)
+
+    def submit(self, memory: Dict[str, Any]) -> str:
+        """Queue a memory for writing.
+
+        Args:
+            memory: add_memory keyword arguments; "uuid" is assigned if missing
+
+        Returns:
+            The UUID the memory will be stored under
+        """
+        memory = dict(memory)
+        memory.setdefault("uuid", str(uuid4()))
+
+        with self._state:
+            queued = not self._closed
+            if queued:
+                self._putting += 1
+
+        if queued:
+            try:
+                self._queue.put(memory, timeout=self.put_timeout)
+                return memory["uuid"]
+            except queue.Full:
+                overflow_counter.inc()
+            finally:
+                with self._state:
+                    self._putting -= 1
+                    self._state.notify_all()
+
+        self._write([memory])
+        return memory["uuid"]
+
+    def flush(self):
+        """Block until every memory queued so far has been written."""
+        self._queue.join()
+
+    def close(self, timeout: Optional[float] = 30):
+        """Write all pending memories and stop the worker.
+
+        Memories submitted from now on are written inline. Gives up after
+        ``timeout`` seconds if the worker cannot keep up (e.g. Weaviate is
+        stalled), so a full queue cannot hang shutdown.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            while self._putting:
+                self._state.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+        try:
+            self._queue.put(_STOP, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            logger.warning("Gave up flushing %d queued memories on close", self._queue.qsize())
+            return
+        self._worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _next_batch(self) -> List[Any]:
+        batch = [self._queue.get()]
+        if batch[0] is _STOP:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            memories = [item for item in batch if item is not _STOP]
+            try:
+                if memories:
+                    self._write(memories)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, memories: List[Dict[str, Any]]):
+        started = time.monotonic()
+        try:
+            results = self.agent.add_memories_bulk(memories, batch_size=self.batch_size)
+        except Exception as e:
+            logger.error("Failed to write %d memories: %s", len(memories), e)
+            written_counter.inc(len(memories), result="error")
+            return
+        finally:
+            flush_latency_histogram.observe(time.monotonic() - started)
+            flush_size_histogram.observe(len(memories))
+
+        failed = sum(1 for result in results if result["error"])
+        written_counter.inc(len(memories) - failed, result="ok")
+        if failed:
+            written_counter.inc(failed, result="error")
+            logger.error("%d of %d memories failed to write", failed, len(memories))
@@ -1,18 +1,46 @@
 import os
+import copy
 import json
 import yaml
 import tempfile
 
+# libyaml's parser when PyYAML was built with it; the pure-Python one is ~10x slower
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# (path, mtime, size) and contents of the last config.yml parsed
+_config_cache = (None, None)
+
+def _parse_config(f):
+    """
+    Parse an open config.yml. Every get_*_config call reads the file, so the
+    parsed contents are reused (as a copy) until the file changes.
+    """
+    global _config_cache
+    stat = os.fstat(f.fileno())
+    key = (f.name, stat.st_mtime_ns, stat.st_size)
+    cached_key, contents = _config_cache
+    if cached_key != key:
+        contents = yaml.load(f, Loader=_YamlLoader)
+        _config_cache = (key, contents)
+    return copy.deepcopy(contents)
+
 def get_weaviate_config():
     """
     Get the Weaviate configuration from various sources.
-    Returns a dict with host, port, and grpc_port.
+    Returns a dict with host, port, grpc_port and the shared connection's
+    health check and reconnect settings under "connection".
     """
     # Default values
     config = {
         "host": "localhost",
         "port": 8083,
-        "grpc_port": 50051
+        "grpc_port": 50051,
+        "connection": {
+            "health_check_interval": 30,
+            "reconnect_attempts": 5,
+            "backoff_initial": 0.5,
+            "backoff_max": 10
+        }
     }
     
     # First try to read from environment variables
@@ -38,12 +66,14 @@ def get_weaviate_config():
     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yml')
     try:
         with open(config_path, 'r') as f:
-            yaml_config = yaml.safe_load(f)
+            yaml_config = _parse_config(f)
             if yaml_config and 'weaviate' in yaml_config:
                 if 'host' in yaml_config['weaviate']:
                     config['host'] = yaml_config['weaviate']['host']
                 if 'port' in yaml_config['weaviate']:
                     config['port'] = yaml_config['weaviate']['port']
+                if isinstance(yaml_config['weaviate'].get('connection'), dict):
+                    config['connection'].update(yaml_config['weaviate']['connection'])
     except Exception as e:
         print(f"Warning: Could not load config.yml: {e}")
     
@@ -52,7 +82,10 @@ def get_weaviate_config():
 def get_llm_config():
     """
     Get the LLM server configuration from various sources.
-    Returns a dict with host, port, model, and other parameters.
+    Returns a dict with host, port, model, and other parameters, including
+    the optional endpoint pool ("endpoints", "routes", "router") for the
+    LLM router. "url_source" names where "url" came from: "env" when
+    VSCODE_AGENT_LLM_URL applies, "config" otherwise.
     """
     # Default values
     config = {
@@ -60,7 +93,23 @@ def get_llm_config():
         "port": 8084,
         "model": "models/mistral-7b-instruct-v0.2.Q4_K_M.gguf",
         "context_size": 4096,
-        "temperature": 0.7
+        "temperature": 0.7,
+        "slots": 1,
+        "endpoints": [],
+        "routes": {},
+        "router": {
+            "max_failures": 3,
+            "health_check_interval": 10,
+            "affinity_slack": 1
+        },
+        "client": {
+            "pool_size": 10,
+            "keep_alive": True,
+            "connect_timeout": 5,
+            "first_byte_timeout": 60,
+            "total_timeout": 300,
+            "cache_prompt": True
+        }
     }
     
     # First try to read from environment variables
@@ -68,11 +117,8 @@ def get_llm_config():
         config['host'] = os.environ.get('VSCODE_AGENT_LLM_HOST')
     if os.environ.get('VSCODE_AGENT_LLM_PORT'):
         config['port'] = int(os.environ.get('VSCODE_AGENT_LLM_PORT'))
-    if os.environ.get('VSCODE_AGENT_LLM_URL'):
-        config['url'] = os.environ.get('VSCODE_AGENT_LLM_URL')
-    else:
-        # Construct URL from host and port if not explicitly set
-        config['url'] = f"http://{config['host']}:{config['port']}/v1"
+    # Construct URL from host and port; VSCODE_AGENT_LLM_URL is applied last
+    config['url'] = f"http://{config['host']}:{config['port']}/v1"
     
     # Then try to read from the central port info file
     port_info_path = "/tmp/ai-dev-team/ports.json"
@@ -91,7 +137,7 @@ def get_llm_config():
     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yml')
     try:
         with open(config_path, 'r') as f:
-            yaml_config = yaml.safe_load(f)
+            yaml_config = _parse_config(f)
             if yaml_config and 'llm' in yaml_config:
                 llm_config = yaml_config['llm']
                 if 'host' in llm_config:
@@ -104,11 +150,29 @@ def get_llm_config():
                     config['context_size'] = llm_config['context_size']
                 if 'temperature' in llm_config:
                     config['temperature'] = llm_config['temperature']
+                if 'slots' in llm_config:
+                    config['slots'] = llm_config['slots']
+                if llm_config.get('endpoints'):
+                    config['endpoints'] = llm_config['endpoints']
+                if isinstance(llm_config.get('routes'), dict):
+                    config['routes'] = llm_config['routes']
+                if isinstance(llm_config.get('router'), dict):
+                    config['router'].update(llm_config['router'])
+                if isinstance(llm_config.get('client'), dict):
+                    config['client'].update(llm_config['client'])
                 # Update URL with final host/port
                 config['url'] = f"http://{config['host']}:{config['port']}/v1"
     except Exception as e:
         print(f"Warning: Could not load config.yml: {e}")
     
+    # An explicit URL wins over the port file and config.yml for the single
+    # server. The launch scripts always export it, so a configured endpoint
+    # pool is kept and takes precedence over it.
+    config['url_source'] = "config"
+    if os.environ.get('VSCODE_AGENT_LLM_URL') and not config['endpoints']:
+        config['url'] = os.environ.get('VSCODE_AGENT_LLM_URL')
+        config['url_source'] = "env"
+    
     return config
 
 def get_backend_port():
@@ -151,7 +215,7 @@ def get_backend_port():
     config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yml')
     try:
         with open(config_path, 'r') as f:
-            yaml_config = yaml.safe_load(f)
+            yaml_config = _parse_config(f)
             if yaml_config and 'backend' in yaml_config:
                 if 'port' in yaml_config['backend']:
                     port = yaml_config['backend']['port']
@@ -160,6 +224,276 @@ def get_backend_port():
     
     return port
 
+def _load_config_section(*keys):
+    """
+    Load a (possibly nested) section of config.yml, e.g. ("backend", "server").
+    Returns an empty dict if the file or section is missing.
+    """
+    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yml')
+    try:
+        with open(config_path, 'r') as f:
+            section = _parse_config(f) or {}
+    except Exception as e:
+        print(f"Warning: Could not load config.yml: {e}")
+        return {}
+    
+    for key in keys:
+        section = section.get(key) if isinstance(section, dict) else None
+    return section if isinstance(section, dict) else {}
+
+def _section_config(name, defaults):
+    """
+    Merge a section of config.yml over its defaults. name is the section's
+    dotted path, e.g. "backend.server". Nested dicts in the defaults (such
+    as memory.retrieval) are merged key by key, so a partial one in
+    config.yml keeps the remaining defaults.
+    """
+    config = copy.deepcopy(defaults)
+    for key, value in _load_config_section(*name.split('.')).items():
+        if isinstance(config.get(key), dict) and isinstance(value, dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    return config
+
+def get_server_config():
+    """
+    Get the serving configuration for the backend from the backend.server
+    section of config.yml, with VSCODE_AGENT_SERVER overriding the type.
+    Returns a dict with type, workers, threads, max_queue, backlog,
+    drain_timeout and request_lookahead.
+    """
+    # Default values
+    config = _section_config('backend.server', {
+        "type": "waitress",
+        "workers": 1,
+        "threads": 16,
+        "max_queue": 64,
+        "backlog": 128,
+        "drain_timeout": 30,
+        "request_lookahead": 5
+    })
+    
+    if os.environ.get('VSCODE_AGENT_SERVER'):
+        config['type'] = os.environ.get('VSCODE_AGENT_SERVER')
+    
+    return config
+
+def get_worker_processes():
+    """
+    Get the number of backend processes serving requests side by side, as
+    exported in VSCODE_AGENT_WORKERS by serving.run_uvicorn (1 otherwise).
+    State kept in files by one process (the embedding disk cache, the local
+    memory store) is only safe with a single worker.
+    """
+    try:
+        return max(1, int(os.environ.get('VSCODE_AGENT_WORKERS', 1)))
+    except ValueError:
+        return 1
+
+def get_startup_config():
+    """
+    Get the startup settings from the backend.startup section of config.yml,
+    with VSCODE_AGENT_STARTUP_MODE overriding mode. Returns a dict with mode
+    ("background", "lazy" or "eager") and preload_embedding_model.
+    """
+    config = _section_config('backend.startup', {
+        "mode": "background",
+        "preload_embedding_model": True
+    })
+    
+    if os.environ.get('VSCODE_AGENT_STARTUP_MODE'):
+        config['mode'] = os.environ.get('VSCODE_AGENT_STARTUP_MODE').lower()
+    
+    return config
+
+def get_logging_config():
+    """
+    Get the logging settings from the logging section of config.yml, with
+    VSCODE_AGENT_LOG_LEVEL and VSCODE_AGENT_LOG_FORMAT overriding level and
+    format. Returns a dict with level, format ("text" or "json"),
+    queue_size, payload_max_chars and per-level "sampling" rates.
+    """
+    config = _section_config('logging', {
+        "level": "INFO",
+        "format": "text",
+        "queue_size": 10000,
+        "payload_max_chars": 2048,
+        "sampling": {
+            "debug": 1.0,
+            "info": 1.0
+        }
+    })
+    
+    if os.environ.get('VSCODE_AGENT_LOG_LEVEL'):
+        config['level'] = os.environ.get('VSCODE_AGENT_LOG_LEVEL')
+    if os.environ.get('VSCODE_AGENT_LOG_FORMAT'):
+        config['format'] = os.environ.get('VSCODE_AGENT_LOG_FORMAT')
+
+    return config
+
+def get_tracing_config():
+    """
+    Get the tracing settings from the tracing section of config.yml, with
+    VSCODE_AGENT_TRACING=1 enabling it. Returns a dict with enabled,
+    exporter ("file" or "otlp"), file_path, otlp_endpoint, service_name and
+    sample_ratio.
+    """
+    config = _section_config('tracing', {
+        "enabled": False,
+        "exporter": "file",
+        "file_path": os.path.join(tempfile.gettempdir(), "ai-dev-team", "traces.jsonl"),
+        "otlp_endpoint": "http://localhost:4318/v1/traces",
+        "service_name": "vscode-agent",
+        "sample_ratio": 1.0
+    })
+
+    if os.environ.get('VSCODE_AGENT_TRACING'):
+        config['enabled'] = os.environ.get('VSCODE_AGENT_TRACING').lower() in ('1', 'true', 'yes')
+
+    return config
+
+def get_inline_completion_config():
+    """
+    Get the as-you-type (fill-in-the-middle) completion settings from the
+    inline_completion section of config.yml. Returns a dict with
+    max_tokens, temperature, top_p, stop, debounce_ms, max_prefix_chars and
+    max_suffix_chars.
+    """
+    config = _section_config('inline_completion', {
+        "max_tokens": 48,
+        "temperature": 0.2,
+        "top_p": 0.9,
+        "stop": ["\n"],
+        "debounce_ms": 100,
+        "max_prefix_chars": 3000,
+        "max_suffix_chars": 1000
+    })
+    return config
+
+def get_admission_config():
+    """
+    Get the LLM admission control settings from the admission section of
+    config.yml. Returns a dict with enabled, max_concurrent, max_queue,
+    per_client_limit, queue_timeout, retry_after, default_priority and the
+    request type priorities under "priorities".
+    """
+    config = _section_config('admission', {
+        "enabled": True,
+        "max_concurrent": 4,
+        "max_queue": 32,
+        "per_client_limit": 4,
+        "queue_timeout": 30,
+        "retry_after": 2,
+        "default_priority": 1,
+        "priorities": {
+            "inline_completion": 0,
+            "code_completion": 0,
+            "general_query": 1,
+            "code_explanation": 1,
+            "openai": 1,
+            "code_improvement": 2
+        }
+    })
+    return config
+
+def get_embedding_config():
+    """
+    Get the embedding settings from the embeddings section of config.yml.
+    Returns a dict with the cache settings under "cache" and the
+    micro-batching settings under "batching".
+    """
+    config = _section_config('embeddings', {
+        "cache": {
+            "max_entries": 10000,
+            "disk_path": ""
+        },
+        "batching": {
+            "enabled": True,
+            "max_batch_size": 32,
+            "max_wait_ms": 5
+        }
+    })
+    
+    if os.environ.get('VSCODE_AGENT_EMBEDDING_CACHE_DIR'):
+        config['cache']['disk_path'] = os.environ.get('VSCODE_AGENT_EMBEDDING_CACHE_DIR')
+    
+    return config
+
+def get_memory_config():
+    """
+    Get the agent memory settings from the memory section of config.yml.
+    Returns a dict with the store backend ("weaviate" or "local", overridable
+    with VSCODE_AGENT_MEMORY_BACKEND), the local store settings under "local",
+    the bulk ingestion, retrieval and prefetch settings, the search ranking
+    settings under "retrieval", the prompt context budget under "context"
+    and the write-behind queue settings under "write_behind".
+    """
+    config = _section_config('memory', {
+        "backend": "weaviate",
+        "local": {
+            "path": "~/.ai-dev-team/memory",
+            "index": "flat",
+            "nlist": 256,
+            "nprobe": 8
+        },
+        "bulk_batch_size": 100,
+        "bulk_concurrency": 2,
+        "prefetch": True,
+        "retrieval_workers": 8,
+        "warm_up_llm": False,
+        "context": {
+            "budget_tokens": 1024,
+            "max_memory_tokens": 256,
+            "min_memory_tokens": 32,
+            "reserve_tokens": 1024,
+            "dedupe_threshold": 0.9,
+            "tokenizer": "estimate",
+            "chars_per_token": 3.5
+        },
+        "retrieval": {
+            "mode": "hybrid",
+            "alpha": 0.75,
+            "candidates": 20,
+            "priority_weight": 0.05,
+            "recency_weight": 0.1,
+            "recency_half_life_days": 30,
+            "rerank": False,
+            "rerank_model": "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        },
+        "write_behind": {
+            "enabled": True,
+            "max_queue": 1000,
+            "batch_size": 50,
+            "flush_interval_ms": 200,
+            "put_timeout": 1.0
+        }
+    })
+    
+    if os.environ.get('VSCODE_AGENT_MEMORY_BACKEND'):
+        config['backend'] = os.environ.get('VSCODE_AGENT_MEMORY_BACKEND')
+    if os.environ.get('VSCODE_AGENT_MEMORY_PATH'):
+        config['local']['path'] = os.environ.get('VSCODE_AGENT_MEMORY_PATH')
+    return config
+
+def get_response_cache_config():
+    """
+    Get the LLM response cache settings from the response_cache section of config.yml.
+    Returns a dict with enabled, max_entries, ttl_seconds, allow_sampling and
+    the near-duplicate tier settings under "semantic".
+    """
+    config = _section_config('response_cache', {
+        "enabled": True,
+        "max_entries": 500,
+        "ttl_seconds": 3600,
+        "allow_sampling": False,
+        "semantic": {
+            "enabled": False,
+            "threshold": 0.95
+        }
+    })
+    return config
+
 def save_port_info(backend_port=None, weaviate_port=None, llm_port=None):
     """
     Save port information to a central location and to the VS Code extension port file.
@@ -0,0 +1,156 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from metrics import counter
+
+cache_requests_counter = counter(
+    "response_cache_requests_total", "Response cache lookups by result", ("result",)
+)
+
+
+class ResponseCache:
+    """Cache of LLM responses in front of the model.
+
+    The exact tier is keyed on (system_prompt, prompt, memory context,
+    model, sampling params). The optional semantic tier reuses a response
+    whose prompt embedding is within ``similarity_threshold`` cosine
+    similarity of the new prompt, among entries with the same system
+    prompt, memory context, model and params. Entries expire after ``ttl_seconds`` and the oldest are evicted
+    beyond ``max_entries``.
+
+    Requests sampled with temperature > 0 bypass the cache unless
+    ``allow_sampling`` is set, since they are expected to vary.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 500,
+        ttl_seconds: float = 3600,
+        allow_sampling: bool = False,
+        semantic: bool = False,
+        similarity_threshold: float = 0.95,
+        embed: Optional[Callable[[str], Any]] = None,
+    ):
+        """Create a cache.
+
+        Args:
+            max_entries: Maximum cached responses
+            ttl_seconds: Seconds a response stays valid
+            allow_sampling: Also cache requests with temperature > 0
+            semantic: Enable the near-duplicate tier
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            embed: Function returning an embedding vector for a prompt
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.allow_sampling = allow_sampling
+        self.semantic = semantic and embed is not None
+        self.similarity_threshold = float(similarity_threshold)
+        self.embed = embed
+
+        # key -> (expires_at, response, scope, normalized prompt vector or None)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(payload: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _keys(self, system_prompt: Optional[str], prompt: str, model: str, params: Dict[str, Any],
+              memory_context: str = ""):
+        scope = self._hash({
+            "system_prompt": system_prompt, "memory_context": memory_context, "model": model, "params": params
+        })
+        return self._hash({"scope": scope, "prompt": prompt}), scope
+
+    def is_cacheable(self, params: Dict[str, Any]) -> bool:
+        """Whether a request with these sampling params may use the cache."""
+        return self.allow_sampling or not (params.get("temperature") or 0) > 0
+
+    def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        vector = np.asarray(self.embed(prompt), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, system_prompt: Optional[str], prompt: str, model: str, params: Dict[str, Any],
+            memory_context: str = "") -> Optional[str]:
+        """Look up a cached response, or None on a miss or bypass.
+
+        ``memory_context`` is the memory text injected into the prompt; a
+        response is only reused for the same memories.
+        """
+        if not self.is_cacheable(params):
+            cache_requests_counter.inc(result="bypass")
+            return None
+
+        key, scope = self._keys(system_prompt, prompt, model, params, memory_context)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    cache_requests_counter.inc(result="exact_hit")
+                    return entry[1]
+                del self._entries[key]
+
+        if self.semantic:
+            response = self._semantic_get(prompt, scope, now)
+            if response is not None:
+                cache_requests_counter.inc(result="semantic_hit")
+                return response
+
+        cache_requests_counter.inc(result="miss")
+        return None
+
+    def _semantic_get(self, prompt: str, scope: str, now: float) -> Optional[str]:
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry[2] == scope and entry[3] is not None and entry[0] > now
+            ]
+        if not candidates:
+            return None
+
+        vector = self._embed(prompt)
+        if vector is None:
+            return None
+
+        similarities = np.stack([entry[3] for _, entry in candidates]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        key, entry = candidates[best]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, system_prompt: Optional[str], prompt: str, model: str, params: Dict[str, Any], response: str,
+            memory_context: str = ""):
+        """Cache a response."""
+        if not self.is_cacheable(params):
+            return
+
+        key, scope = self._keys(system_prompt, prompt, model, params, memory_context)
+        vector = self._embed(prompt) if self.semantic else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response, scope, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,256 @@
+"""
+Production serving for the VS Code agent backend.
+
+Runs the Flask app under a threaded WSGI server (waitress) or an ASGI
+server (uvicorn) instead of Werkzeug's development server, with a bound on
+queued/in-flight requests and a graceful drain on shutdown.
+"""
+
+import json
+import os
+import signal
+import threading
+import time
+import _thread
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+SERVER_TYPES = ("waitress", "uvicorn", "flask")
+
+
+class DrainMiddleware:
+    """WSGI middleware that tracks in-flight requests.
+
+    Rejects new requests with 503 once ``max_queue`` requests are already
+    being handled, or once draining has started for shutdown.
+    """
+
+    def __init__(self, app: Callable, max_queue: int = 0, retry_after: int = 1):
+        """Wrap a WSGI app.
+
+        Args:
+            app: The WSGI application to wrap
+            max_queue: Maximum requests queued or in flight (0 = unlimited)
+            retry_after: Seconds advertised in the Retry-After header on 503
+        """
+        self.app = app
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.draining = False
+        self._cond = threading.Condition()
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        with self._cond:
+            if self.draining:
+                return self._reject(start_response, "Server is shutting down")
+            if self.max_queue and self.in_flight >= self.max_queue:
+                return self._reject(start_response, "Server is busy, too many queued requests")
+            self.in_flight += 1
+
+        try:
+            result = self.app(environ, start_response)
+        except Exception:
+            self._finish()
+            raise
+        return _ClosingIterator(result, self._finish)
+
+    def _finish(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _reject(self, start_response: Callable, message: str) -> Iterable[bytes]:
+        body = json.dumps({"status": "error", "message": message}).encode("utf-8")
+        start_response("503 Service Unavailable", [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(body))),
+            ("Retry-After", str(self.retry_after)),
+        ])
+        return [body]
+
+    def start_draining(self):
+        """Stop accepting new requests."""
+        with self._cond:
+            self.draining = True
+
+    def wait_for_idle(self, timeout: float) -> bool:
+        """Block until no requests are in flight or the timeout expires.
+
+        Returns:
+            True if all in-flight requests finished
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+class _ClosingIterator:
+    """Response iterable that runs a callback once the server closes it.
+
+    Streaming responses stay in flight until fully sent, not just until the
+    view function returns.
+    """
+
+    def __init__(self, iterable: Iterable[bytes], callback: Callable[[], None]):
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._callback = callback
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._iterator)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._callback()
+
+
+def serve(app, host: str, port: int, server_config: Dict[str, Any], server_type: Optional[str] = None):
+    """Run the app with the configured server.
+
+    Args:
+        app: The Flask application (None for uvicorn, which builds its own with create_asgi_app)
+        host: Host to bind to
+        port: Port to bind to
+        server_config: The ``backend.server`` configuration section
+        server_type: Override for ``server_config['type']``
+    """
+    server_type = server_type or server_config.get("type", "waitress")
+    if server_type not in SERVER_TYPES:
+        raise ValueError(f"Unknown server type '{server_type}', expected one of {', '.join(SERVER_TYPES)}")
+
+    if server_type == "waitress":
+        run_waitress(app, host, port, server_config)
+    elif server_type == "uvicorn":
+        run_uvicorn(host, port, server_config)
+    else:
+        logger.warning("Using the Flask development server. Do not use it for multi-user deployments.")
+        app.run(host=host, port=port, threaded=True)
+
+
+def run_waitress(app, host: str, port: int, server_config: Dict[str, Any]):
+    """Serve with waitress' threaded WSGI server, draining on SIGTERM/SIGINT."""
+    try:
+        from waitress.server import create_server
+    except ImportError as e:
+        raise ImportError("The waitress server requires waitress. Install it with: pip install waitress") from e
+
+    threads = int(server_config.get("threads", 16))
+    max_queue = int(server_config.get("max_queue", 0))
+    drain_timeout = float(server_config.get("drain_timeout", 30))
+
+    wsgi_app = DrainMiddleware(app, max_queue=max_queue)
+    server = create_server(
+        wsgi_app,
+        host=host,
+        port=port,
+        threads=threads,
+        backlog=int(server_config.get("backlog", 128)),
+        # Leave headroom above max_queue so excess requests get a fast 503
+        # from DrainMiddleware instead of waiting for a socket
+        connection_limit=max(100, max_queue * 2) if max_queue else 1000,
+        channel_timeout=int(server_config.get("channel_timeout", 120)),
+        # Keep reading from the socket while a request runs, so a client
+        # disconnect is noticed and the LLM request can be cancelled
+        channel_request_lookahead=int(server_config.get("request_lookahead", 5)),
+    )
+
+    def drain_and_stop():
+        if not wsgi_app.wait_for_idle(drain_timeout):
+            logger.warning("Drain timeout of %ss reached with %d requests in flight", drain_timeout, wsgi_app.in_flight)
+        # Raises KeyboardInterrupt in the main thread, which makes waitress
+        # shut down its task dispatcher and return from run()
+        _thread.interrupt_main()
+
+    def handle_shutdown(signum, frame):
+        if wsgi_app.draining:
+            # Second signal: stop immediately
+            raise KeyboardInterrupt
+        logger.info("Received signal %s, draining %d in-flight requests...", signum, wsgi_app.in_flight)
+        wsgi_app.start_draining()
+        threading.Thread(target=drain_and_stop, name="drain", daemon=True).start()
+
+    signal.signal(signal.SIGINT, handle_shutdown)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_shutdown)
+
+    logger.info("Serving with waitress on http://%s:%s (%d threads, max queue %s)",
+                host, port, threads, max_queue or "unlimited")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    logger.info("Server stopped")
+
+
+def create_asgi_app():
+    """ASGI application factory used by uvicorn workers.
+
+    Called once per worker process. A single worker runs in the process that
+    called run_uvicorn, where vscode_integration is already imported (its
+    main() registers itself under that name), so its agent is reused.
+    """
+    from asgiref.wsgi import WsgiToAsgi
+    from port_utils import get_server_config
+    from vscode_integration import create_app
+
+    server_config = get_server_config()
+    return WsgiToAsgi(DrainMiddleware(create_app(), max_queue=int(server_config.get("max_queue", 0))))
+
+
+def run_uvicorn(host: str, port: int, server_config: Dict[str, Any]):
+    """Serve with uvicorn workers, wrapping the WSGI app with asgiref."""
+    try:
+        import uvicorn
+        import asgiref  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "The uvicorn server requires uvicorn and asgiref. Install them with: pip install uvicorn asgiref"
+        ) from e
+
+    workers = int(server_config.get("workers", 1))
+    max_queue = int(server_config.get("max_queue", 0))
+
+    if workers > 1:
+        from memory_store import LOCAL_STORE_WORKERS_ERROR
+        from port_utils import get_memory_config
+
+        # Fail before spawning workers rather than in each one on first memory use
+        if get_memory_config().get("backend") == "local":
+            raise ValueError(LOCAL_STORE_WORKERS_ERROR)
+
+    # Inherited by the worker processes, so file-backed state can tell it is not alone
+    os.environ["VSCODE_AGENT_WORKERS"] = str(max(1, workers))
+
+    logger.info("Serving with uvicorn on http://%s:%s (%d workers, max queue %s)",
+                host, port, workers, max_queue or "unlimited")
+    uvicorn.run(
+        "serving:create_asgi_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        backlog=int(server_config.get("backlog", 128)),
+        limit_concurrency=max_queue or None,
+        timeout_graceful_shutdown=int(server_config.get("drain_timeout", 30)),
+    )
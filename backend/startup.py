@@ -0,0 +1,112 @@
+"""
+Deferred initialization of the backend's slow dependencies.
+
+The embedding model (torch), the memory store connection and the LLM
+availability check are set up after the server binds its port, so health
+checks answer within a second of starting. Each one is a named component
+whose state is reported by ``/ready``.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import gauge
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+STARTUP_MODES = ("background", "lazy", "eager")
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+component_ready_gauge = gauge(
+    "startup_component_ready", "1 once a startup component has initialized, 0 before or on failure", ("component",)
+)
+component_seconds_gauge = gauge(
+    "startup_component_seconds", "Time a startup component took to initialize", ("component",)
+)
+
+
+class Readiness:
+    """Initializes named components and tracks their state.
+
+    In "background" mode every component initializes in its own daemon
+    thread, so a fast one (the LLM check) is not held up by a slow one (the
+    embedding model). "eager" initializes them one after another before
+    returning, and "lazy" leaves them to be set up by the first request
+    that needs them.
+    """
+
+    def __init__(self, mode: str = "background"):
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode '{mode}', expected one of {', '.join(STARTUP_MODES)}")
+        self.mode = mode
+        self.started_at = time.monotonic()
+        self._components: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self, components: List[Tuple[str, Callable[[], object]]]):
+        """Initialize components according to the mode. Only the first call has an effect.
+
+        Args:
+            components: (name, initializer) pairs; an initializer that raises marks its component failed
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            if self.mode == "lazy":
+                return
+            for name, _ in components:
+                self._components[name] = {"status": PENDING, "seconds": None, "error": None}
+                component_ready_gauge.set(0, component=name)
+
+        for name, initialize in components:
+            if self.mode == "eager":
+                self._initialize(name, initialize)
+            else:
+                threading.Thread(
+                    target=self._initialize, args=(name, initialize), name=f"startup-{name}", daemon=True
+                ).start()
+
+    def _initialize(self, name: str, initialize: Callable[[], object]):
+        started = time.monotonic()
+        error: Optional[str] = None
+        try:
+            initialize()
+        except Exception as e:
+            error = str(e)
+            logger.error("Startup component %s failed to initialize: %s", name, e)
+        seconds = time.monotonic() - started
+        with self._lock:
+            self._components[name] = {"status": FAILED if error else READY, "seconds": round(seconds, 3), "error": error}
+        component_ready_gauge.set(0 if error else 1, component=name)
+        component_seconds_gauge.set(seconds, component=name)
+        if not error:
+            logger.info("Startup component %s ready in %.2fs", name, seconds)
+
+    @property
+    def ready(self) -> bool:
+        """True once no component is still pending.
+
+        A failed component does not hold readiness back: the agent falls back
+        to simulated responses or retries the connection on use, as it would
+        without deferred startup.
+        """
+        with self._lock:
+            return all(component["status"] != PENDING for component in self._components.values())
+
+    def status(self) -> Dict[str, object]:
+        """The mode, overall readiness, uptime and per-component state."""
+        with self._lock:
+            components = {name: dict(component) for name, component in self._components.items()}
+        return {
+            "ready": all(component["status"] != PENDING for component in components.values()),
+            "mode": self.mode,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "components": components,
+        }
@@ -0,0 +1,194 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from metrics import counter
+
+dropped_counter = counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# Correlation ID of the request being handled; copy the context into worker
+# threads (contextvars.copy_context().run) to carry it along
+request_id_var: "contextvars.ContextVar[str]" = contextvars.ContextVar("request_id", default="-")
+
+# LogRecord attributes that are not fields passed with extra=
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id"
+}
+
+_configured = False
+_configure_lock = threading.Lock()
+_payload_max_chars = 2048
+
+
+def new_request_id() -> str:
+    return uuid4().hex[:16]
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None):
+    """Run a block with a request ID (a new one if none is given) set for logging."""
+    token = request_id_var.set(request_id or new_request_id())
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+def truncate_payload(payload: Any, max_chars: Optional[int] = None) -> str:
+    """Compact JSON for a request/response body, cut to max_chars.
+
+    Serializing large bodies is expensive, so only call this when the
+    record will be emitted, e.g. under ``logger.isEnabledFor(logging.DEBUG)``.
+    """
+    text = payload if isinstance(payload, str) else json.dumps(payload, separators=(",", ":"), default=str)
+    limit = _payload_max_chars if max_chars is None else int(max_chars)
+    if len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more chars]"
+    return text
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request ID."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records per level. Warnings and errors are always kept."""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rates = {
+            logging.getLevelName(str(level).upper()): float(rate) for level, rate in (rates or {}).items()
+        }
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {
+        key: value for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRIBUTES and not key.startswith("_")
+    }
+
+
+def _timestamp(record: logging.LogRecord) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, request_id, message and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": _timestamp(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with the request ID and extra fields as key=value."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = (f"{_timestamp(record)} {record.levelname:<7} {record.name} "
+                f"[{getattr(record, 'request_id', '-')}] {record.getMessage()}")
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; drops them when the queue is full
+    rather than blocking the request."""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_counter.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what can't wait; formatting happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(config: Optional[Dict[str, Any]] = None):
+    """Set up the root logger once, from the logging section of config.yml.
+
+    Records are filtered by level and sampling in the calling thread, then
+    queued and written by a background thread, so logging never waits on
+    stdout.
+    """
+    global _configured, _payload_max_chars
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+        if config is None:
+            from port_utils import get_logging_config
+            config = get_logging_config()
+        _payload_max_chars = int(config.get("payload_max_chars", 2048))
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if config.get("format") == "json" else TextFormatter())
+
+        queue_size = int(config.get("queue_size", 10000))
+        if queue_size > 0:
+            handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+            listener = logging.handlers.QueueListener(handler.queue, output)
+            listener.start()
+            atexit.register(listener.stop)
+        else:
+            handler = output
+        handler.addFilter(RequestIdFilter())
+        handler.addFilter(SamplingFilter(config.get("sampling")))
+
+        root = logging.getLogger()
+        root.setLevel(str(config.get("level", "INFO")).upper())
+        root.addHandler(handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A logger for a module, configuring logging on first use."""
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,14 @@
+"""
+Shared setup for the backend unit tests.
+
+The backend modules import each other by bare name (``from metrics import
+...``), as they do when started from the backend directory, so that
+directory is put on sys.path. Run with ``python -m pytest backend/tests``.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,162 @@
+"""Tests for AdmissionController and the admitted() wrapper around LLM-bound views."""
+
+import importlib
+import threading
+import time
+
+import pytest
+from flask import Flask, Response, request
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+def test_waiting_requests_are_admitted_by_priority():
+    controller = AdmissionController(max_concurrent=1, max_queue=8, priorities={"fast": 0, "slow": 2})
+    running = controller.admit("slow", "holder")
+    order = []
+
+    def wait(request_type, client_id):
+        with controller.admit(request_type, client_id):
+            order.append(request_type)
+
+    threads = []
+    for request_type in ("slow", "normal", "fast"):
+        thread = threading.Thread(target=wait, args=(request_type, request_type))
+        thread.start()
+        threads.append(thread)
+        # Queue them in this order, so FIFO alone would admit "slow" first
+        wait_for(lambda: len(controller._waiting) == len(threads))
+
+    running.release()
+    for thread in threads:
+        thread.join(2)
+    assert order == ["fast", "normal", "slow"]
+
+
+def test_client_over_its_cap_gets_429():
+    controller = AdmissionController(max_concurrent=4, per_client_limit=2, retry_after=7)
+    tickets = [controller.admit("general_query", "editor-1") for _ in range(2)]
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("general_query", "editor-1")
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after == 7
+
+    # Other clients, and clients that cannot be told apart, are not affected
+    controller.admit("general_query", "editor-2").release()
+    controller.admit("general_query", None).release()
+
+    tickets[0].release()
+    controller.admit("general_query", "editor-1").release()
+
+
+def test_full_queue_gets_503():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, per_client_limit=0, retry_after=3)
+    running = controller.admit("general_query", None)
+    waiter = threading.Thread(target=lambda: controller.admit("general_query", None).release())
+    waiter.start()
+    wait_for(lambda: len(controller._waiting) == 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("general_query", None)
+    assert rejected.value.status == 503
+    assert rejected.value.retry_after == 3
+
+    running.release()
+    waiter.join(2)
+    assert controller._running == 0 and not controller._waiting
+
+
+def test_queue_timeout_gets_503_and_leaves_the_queue():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    running = controller.admit("general_query", "a")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("general_query", "b")
+    assert rejected.value.status == 503
+    assert not controller._waiting
+    assert "b" not in controller._per_client
+    running.release()
+
+
+@pytest.fixture
+def integration(monkeypatch, tmp_path):
+    """vscode_integration with a local memory store and a strict admission controller."""
+    monkeypatch.setenv("VSCODE_AGENT_MEMORY_BACKEND", "local")
+    monkeypatch.setenv("VSCODE_AGENT_MEMORY_PATH", str(tmp_path / "memory"))
+    module = importlib.import_module("vscode_integration")
+    controller = AdmissionController(max_concurrent=1, max_queue=0, per_client_limit=1, retry_after=5)
+    monkeypatch.setattr(module, "admission", controller)
+    return module, controller
+
+
+@pytest.fixture
+def client(integration):
+    module, _ = integration
+    app = Flask(__name__)
+    release = threading.Event()
+
+    @app.route("/json", methods=["POST"])
+    def json_view():
+        return module.admitted("general_query", request.get_json(), lambda: Response("{}", mimetype="application/json"))
+
+    @app.route("/stream", methods=["POST"])
+    def stream_view():
+        def chunks():
+            yield "data: first\n\n"
+            release.wait(2)
+            yield "data: last\n\n"
+        return module.admitted("general_query", request.get_json(), lambda: Response(chunks(), mimetype="text/event-stream"))
+
+    app.release_stream = release
+    return app.test_client()
+
+
+def test_streamed_response_holds_its_slot_until_closed(integration, client):
+    _, controller = integration
+    response = client.post("/stream", json={}, buffered=False)
+    assert next(response.response) == b"data: first\n\n"
+    assert controller._running == 1
+
+    # The slot is still taken while the stream is open: the queue is empty, so this is a 503
+    busy = client.post("/json", json={})
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "5"
+
+    client.application.release_stream.set()
+    response.close()
+    assert controller._running == 0
+    assert client.post("/json", json={}).status_code == 200
+
+
+def test_per_client_cap_uses_the_client_id_header(integration, client):
+    _, controller = integration
+    streaming = client.post("/stream", json={}, headers={"X-Client-Id": "session-1"}, buffered=False)
+    next(streaming.response)
+
+    over_cap = client.post("/json", json={}, headers={"X-Client-Id": "session-1"})
+    assert over_cap.status_code == 429
+    assert over_cap.headers["Retry-After"] == "5"
+
+    client.application.release_stream.set()
+    streaming.close()
+    assert controller._per_client == {}
+
+
+def test_unidentified_local_clients_are_exempt_from_the_client_cap(integration):
+    module, _ = integration
+    app = Flask(__name__)
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "127.0.0.1"}):
+        assert module._client_id({}) is None
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.5"}):
+        assert module._client_id({}) == "10.0.0.5"
+    with app.test_request_context("/", headers={"X-Client-Id": "session-1"}, environ_base={"REMOTE_ADDR": "127.0.0.1"}):
+        assert module._client_id({}) == "session-1"
@@ -0,0 +1,30 @@
+"""Tests for Agent's search ranking boost."""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from agent_roles import Agent
+
+RETRIEVAL = {"priority_weight": 0.0, "recency_weight": 1.0, "recency_half_life_days": 1}
+
+
+def boost(memory):
+    return Agent._boost(SimpleNamespace(retrieval_config=RETRIEVAL), memory)
+
+
+def test_new_memory_gets_the_full_recency_boost():
+    properties = Agent._build_properties(SimpleNamespace(role="tester", agent_id="agent"), "text")
+    assert properties["timestamp"].endswith("Z")
+    assert boost(properties) == pytest.approx(1.0, abs=1e-3)
+
+
+@pytest.mark.parametrize("timestamp", [
+    (datetime.now(timezone.utc) - timedelta(days=1)).isoformat().replace("+00:00", "Z"),
+    # As Weaviate returns dates
+    datetime.now(timezone.utc) - timedelta(days=1),
+    datetime.now(timezone(timedelta(hours=-7))) - timedelta(days=1),
+])
+def test_recency_boost_is_measured_in_utc(timestamp):
+    assert boost({"timestamp": timestamp}) == pytest.approx(0.5, abs=1e-3)
@@ -0,0 +1,168 @@
+"""Tests for LlmRouter against stub endpoints."""
+
+import time
+
+import pytest
+
+import port_utils
+from llm_router import _ERROR_PREFIX, LlmEndpoint, LlmRouter
+
+
+class StubInterface:
+    """Stands in for LlamaCppInterface; records calls and can be made to fail."""
+
+    model_name = "stub"
+    temperature = 0.0
+    max_tokens = 16
+    top_p = 1.0
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.failing = False
+        self.available = True
+
+    def call(self, prompt, system_prompt=None, **kwargs):
+        self.calls += 1
+        if self.failing:
+            return {"error": True, "message": f"Error calling llama.cpp API: {self.name} is down"}
+        return {"choices": [{"message": {"content": self.name}}]}
+
+    def stream_completion(self, prompt, system_prompt=None, **kwargs):
+        self.calls += 1
+        if self.failing:
+            yield f"{_ERROR_PREFIX}: {self.name} is down"
+            return
+        yield self.name
+
+    def is_available(self):
+        return self.available
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def make_router():
+    routers = []
+
+    def make(*names, **kwargs):
+        kwargs.setdefault("health_check_interval", 3600)
+        endpoints = [LlmEndpoint(StubInterface(name), name) for name in names]
+        router = LlmRouter(endpoints, **kwargs)
+        routers.append(router)
+        return router, [endpoint.interface for endpoint in endpoints]
+
+    yield make
+    for router in routers:
+        router.close()
+
+
+def test_least_outstanding_endpoint_is_chosen(make_router):
+    router, (a, b) = make_router("a", "b")
+    router.endpoints[0].outstanding = 2
+
+    assert router.get_completion("hi") == "b"
+    assert (a.calls, b.calls) == (0, 1)
+
+    router.endpoints[0].outstanding = 0
+    router.endpoints[1].outstanding = 2
+    assert router.get_completion("hi") == "a"
+
+
+def test_session_sticks_within_affinity_slack(make_router):
+    router, _ = make_router("a", "b", affinity_slack=1)
+    router.endpoints[1].outstanding = 1
+    assert router.get_completion("hi", session_id="s") == "a"
+
+    # One more request in flight on the session's endpoint is tolerated...
+    router.endpoints[0].outstanding = 1
+    router.endpoints[1].outstanding = 0
+    assert router.get_completion("hi", session_id="s") == "a"
+
+    # ...two are not, and the session moves
+    router.endpoints[0].outstanding = 2
+    assert router.get_completion("hi", session_id="s") == "b"
+
+
+def test_endpoint_is_ejected_after_max_failures(make_router):
+    router, (a,) = make_router("a", max_failures=2)
+    a.failing = True
+
+    assert router.call("hi")["error"]
+    assert router.endpoints[0].healthy
+    assert router.call("hi")["error"]
+    assert not router.endpoints[0].healthy
+
+    response = router.call("hi")
+    assert "no healthy LLM endpoint" in response["message"]
+    assert a.calls == 2
+
+
+def test_health_loop_readmits_endpoint(make_router):
+    router, (a,) = make_router("a", max_failures=1, health_check_interval=0.01)
+    a.failing = True
+    a.available = False
+    router.call("hi")
+    assert not router.endpoints[0].healthy
+
+    a.failing = False
+    a.available = True
+    deadline = time.monotonic() + 2
+    while not router.endpoints[0].healthy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert router.endpoints[0].healthy
+    assert router.get_completion("hi") == "a"
+
+
+def test_failed_request_is_retried_on_another_endpoint(make_router):
+    router, (a, b) = make_router("a", "b")
+    a.failing = True
+    router.endpoints[1].outstanding = 1
+
+    assert router.get_completion("hi") == "b"
+    assert (a.calls, b.calls) == (1, 1)
+    assert router.endpoints[0].consecutive_failures == 1
+    assert router.endpoints[1].outstanding == 1
+
+
+def test_failed_stream_is_retried_before_the_first_chunk(make_router):
+    router, (a, b) = make_router("a", "b")
+    a.failing = True
+    router.endpoints[1].outstanding = 1
+
+    assert list(router.stream_completion("hi")) == ["b"]
+    assert (a.calls, b.calls) == (1, 1)
+
+
+def test_llm_url_env_keeps_endpoint_pool(monkeypatch):
+    endpoints = [{"url": "http://127.0.0.1:9001/v1"}, {"url": "http://127.0.0.1:9002/v1"}]
+    parse_config = port_utils._parse_config
+
+    def with_endpoints(f):
+        config = parse_config(f) or {}
+        config.setdefault("llm", {})["endpoints"] = endpoints
+        return config
+
+    monkeypatch.setenv("VSCODE_AGENT_LLM_URL", "http://127.0.0.1:9999/v1")
+    monkeypatch.setattr(port_utils, "_parse_config", with_endpoints)
+
+    config = port_utils.get_llm_config()
+    assert config["endpoints"] == endpoints
+    assert config["url_source"] == "config"
+
+
+def test_llm_url_env_applies_without_endpoint_pool(monkeypatch):
+    parse_config = port_utils._parse_config
+
+    def without_endpoints(f):
+        config = parse_config(f) or {}
+        config.setdefault("llm", {})["endpoints"] = []
+        return config
+
+    monkeypatch.setenv("VSCODE_AGENT_LLM_URL", "http://127.0.0.1:9999/v1")
+    monkeypatch.setattr(port_utils, "_parse_config", without_endpoints)
+
+    config = port_utils.get_llm_config()
+    assert config["url"] == "http://127.0.0.1:9999/v1"
+    assert config["url_source"] == "env"
@@ -0,0 +1,163 @@
+"""Tests for LocalMemoryStore against a temporary directory."""
+
+import os
+
+import numpy as np
+import pytest
+
+import memory_store
+from memory_store import LocalMemoryStore, get_local_memory_store
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def memory(text, **properties):
+    return dict({"text": text, "status": "active", "priority": 1, "agentId": "agent", "contextId": "ctx"}, **properties)
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "memory")
+
+
+def test_insert_search_and_reload(store_path):
+    store = LocalMemoryStore(store_path)
+    a = store.insert(memory("alpha"), unit(1, 0, 0))
+    b = store.insert(memory("beta"), unit(0, 1, 0))
+
+    results = store.search(unit(1, 0.1, 0), limit=2)
+    assert [result["id"] for result in results] == [a, b]
+    assert results[0]["text"] == "alpha"
+    assert results[0]["score"] > results[1]["score"]
+
+    reopened = LocalMemoryStore(store_path)
+    assert len(reopened) == 2
+    assert [result["id"] for result in reopened.search(unit(0, 1, 0), limit=1)] == [b]
+
+
+def test_vector_file_grows_across_batches(store_path):
+    store = LocalMemoryStore(store_path)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(30, 8)).astype(np.float32)
+    for start in range(0, 30, 10):
+        uuids, errors = store.insert_many(
+            [(None, memory(f"m{i}"), vectors[i]) for i in range(start, start + 10)]
+        )
+        assert not errors and len(uuids) == 10
+
+    assert os.path.getsize(os.path.join(store_path, LocalMemoryStore.VECTORS_FILE)) == 30 * 8 * 4
+    reopened = LocalMemoryStore(store_path)
+    assert reopened.search(vectors[17], limit=1)[0]["text"] == "m17"
+
+
+def test_update_and_delete_survive_reload(store_path):
+    store = LocalMemoryStore(store_path)
+    keep = store.insert(memory("keep"), unit(1, 0))
+    gone = store.insert(memory("gone"), unit(0, 1))
+    store.update(keep, {"status": "archived"})
+    store.delete(gone)
+
+    reopened = LocalMemoryStore(store_path)
+    assert len(reopened) == 1
+    assert reopened.fetch()[0]["status"] == "archived"
+    assert reopened.fetch(filters={"status": "active"}) == []
+    with pytest.raises(KeyError):
+        reopened.delete(gone)
+
+
+def test_filters_restrict_search(store_path):
+    store = LocalMemoryStore(store_path)
+    store.insert(memory("mine", agentId="a"), unit(1, 0))
+    store.insert(memory("theirs", agentId="b"), unit(1, 0.01))
+
+    results = store.search(unit(1, 0), limit=5, filters={"agentId": "b"})
+    assert [result["text"] for result in results] == ["theirs"]
+
+
+def test_rejected_objects_are_reported(store_path):
+    store = LocalMemoryStore(store_path)
+    first = store.insert(memory("first"), unit(1, 0))
+
+    uuids, errors = store.insert_many([
+        (first, memory("duplicate"), unit(1, 0)),
+        (None, memory("wrong size"), unit(1, 0, 0)),
+        (None, memory("fine"), unit(0, 1)),
+    ])
+    assert set(errors) == {0, 1}
+    assert list(uuids) == [2]
+    assert len(store) == 2
+
+
+def test_load_skips_torn_log_line(store_path):
+    store = LocalMemoryStore(store_path)
+    kept = store.insert(memory("kept"), unit(1, 0))
+    store.insert(memory("torn"), unit(0, 1))
+
+    log_path = os.path.join(store_path, LocalMemoryStore.LOG_FILE)
+    with open(log_path, "rb") as f:
+        contents = f.read()
+    # Cut the last entry mid-line, as a crash during the append would
+    with open(log_path, "wb") as f:
+        f.write(contents[:contents.rindex(b"\n", 0, len(contents) - 1) + 20])
+
+    reopened = LocalMemoryStore(store_path)
+    assert [result["id"] for result in reopened.fetch()] == [kept]
+    # The vector of the lost insert is cut, so the next row lines up with its log entry
+    assert os.path.getsize(os.path.join(store_path, LocalMemoryStore.VECTORS_FILE)) == 2 * 4
+    added = reopened.insert(memory("after"), unit(0, 1))
+    assert reopened.search(unit(0, 1), limit=1)[0]["id"] == added
+    assert LocalMemoryStore(store_path).search(unit(0, 1), limit=1)[0]["id"] == added
+
+
+def test_load_drops_rows_without_vectors(store_path):
+    store = LocalMemoryStore(store_path)
+    kept = store.insert(memory("kept"), unit(1, 0))
+    store.insert(memory("lost"), unit(0, 1))
+
+    vectors_path = os.path.join(store_path, LocalMemoryStore.VECTORS_FILE)
+    with open(vectors_path, "r+b") as f:
+        f.truncate(2 * 4 + 3)
+
+    reopened = LocalMemoryStore(store_path)
+    assert [result["id"] for result in reopened.fetch()] == [kept]
+    assert os.path.getsize(vectors_path) == 2 * 4
+
+
+def test_hybrid_search_ranks_keyword_matches(store_path):
+    store = LocalMemoryStore(store_path)
+    store.insert(memory("unrelated words here"), unit(1, 0))
+    keyword = store.insert(memory("get_completion retries on timeout"), unit(0.9, 0.1))
+
+    assert store.search(unit(1, 0), limit=1)[0]["id"] != keyword
+    results = store.search(unit(1, 0), limit=1, query_text="get_completion", alpha=0.25)
+    assert results[0]["id"] == keyword
+
+    # The keyword index is rebuilt from the log on open
+    reopened = LocalMemoryStore(store_path)
+    assert reopened.search(unit(1, 0), limit=1, query_text="get_completion", alpha=0.25)[0]["id"] == keyword
+
+
+def test_ivf_index_finds_nearest_neighbours(store_path):
+    store = LocalMemoryStore(store_path, index="ivf", nlist=4, nprobe=2)
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(4 * 39 + 10, 16)).astype(np.float32)
+    store.insert_many([(None, memory(f"m{i}"), vector) for i, vector in enumerate(vectors)])
+
+    for i in (0, 50, 120):
+        assert store.search(vectors[i], limit=1)[0]["text"] == f"m{i}"
+    assert store._centroids is not None
+
+    # Rows added after training are searchable before they are assigned to a list
+    extra = rng.normal(size=16).astype(np.float32)
+    extra_id = store.insert(memory("extra"), extra)
+    assert store.search(extra, limit=1)[0]["id"] == extra_id
+
+
+def test_local_store_is_shared_per_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_store, "_local_stores", {})
+    first = get_local_memory_store(str(tmp_path / "a"))
+    assert get_local_memory_store(str(tmp_path / "a" / ".." / "a")) is first
+    assert get_local_memory_store(str(tmp_path / "b")) is not first
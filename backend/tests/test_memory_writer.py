@@ -0,0 +1,114 @@
+"""Tests for WriteBehindQueue with a stand-in agent."""
+
+import threading
+import time
+
+import pytest
+
+from memory_writer import WriteBehindQueue
+
+WORKER_THREAD = "memory-write-behind"
+
+
+class RecordingAgent:
+    """Records add_memories_bulk calls; the worker thread can be held with ``stall``."""
+
+    def __init__(self):
+        self.written = []
+        self.writers = []
+        self.stall = threading.Event()
+        self.resume = threading.Event()
+        self.resume.set()
+        self._lock = threading.Lock()
+
+    def add_memories_bulk(self, memories, batch_size=100):
+        if threading.current_thread().name == WORKER_THREAD:
+            self.stall.set()
+            self.resume.wait(5)
+        with self._lock:
+            self.written.extend(memory["uuid"] for memory in memories)
+            self.writers.append(threading.current_thread().name)
+        return [{"uuid": memory["uuid"], "error": None} for memory in memories]
+
+
+@pytest.fixture
+def agent():
+    agent = RecordingAgent()
+    yield agent
+    # Let any stalled worker finish, so the atexit close does not wait on it
+    agent.resume.set()
+
+
+def test_close_writes_every_queued_memory(agent):
+    writer = WriteBehindQueue(agent, max_queue=1000, batch_size=10, flush_interval_ms=50)
+    uuids = [writer.submit({"text": f"memory {i}"}) for i in range(100)]
+    writer.close()
+
+    assert sorted(agent.written) == sorted(uuids)
+    assert set(agent.writers) == {WORKER_THREAD}
+
+
+def test_full_queue_falls_back_to_a_synchronous_write(agent):
+    writer = WriteBehindQueue(agent, max_queue=1, batch_size=1, flush_interval_ms=0, put_timeout=0.05)
+    agent.resume.clear()
+    writer.submit({"text": "taken by the worker"})
+    assert agent.stall.wait(2)
+    writer.submit({"text": "fills the queue"})
+
+    started = time.monotonic()
+    overflow = writer.submit({"text": "overflows"})
+    assert time.monotonic() - started >= 0.05
+    assert agent.written == [overflow]
+    assert agent.writers == [threading.current_thread().name]
+
+    agent.resume.set()
+    writer.close()
+    assert len(agent.written) == 3
+
+
+def test_submit_after_close_writes_inline(agent):
+    writer = WriteBehindQueue(agent)
+    writer.close()
+
+    uuid = writer.submit({"text": "late"})
+    assert agent.written == [uuid]
+    assert agent.writers == [threading.current_thread().name]
+    assert writer._queue.empty()
+
+
+def test_submits_racing_close_are_not_lost(agent):
+    writer = WriteBehindQueue(agent, max_queue=50, batch_size=10, flush_interval_ms=1, put_timeout=1.0)
+    submitted = []
+    lock = threading.Lock()
+    start = threading.Barrier(9)
+
+    def produce():
+        start.wait()
+        for i in range(50):
+            uuid = writer.submit({"text": f"memory {i}"})
+            with lock:
+                submitted.append(uuid)
+
+    producers = [threading.Thread(target=produce) for _ in range(8)]
+    for producer in producers:
+        producer.start()
+    start.wait()
+    time.sleep(0.005)
+    writer.close()
+    for producer in producers:
+        producer.join(5)
+
+    assert len(submitted) == 400
+    assert sorted(agent.written) == sorted(submitted)
+
+
+def test_close_gives_up_when_the_worker_is_stalled(agent):
+    writer = WriteBehindQueue(agent, max_queue=1, batch_size=1, flush_interval_ms=0, put_timeout=0.01)
+    agent.resume.clear()
+    writer.submit({"text": "taken by the worker"})
+    assert agent.stall.wait(2)
+    writer.submit({"text": "fills the queue"})
+
+    started = time.monotonic()
+    writer.close(timeout=0.2)
+    assert time.monotonic() - started < 1.0
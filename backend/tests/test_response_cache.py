@@ -0,0 +1,31 @@
+"""Tests for ResponseCache keys."""
+
+from response_cache import ResponseCache
+
+GREEDY = {"temperature": 0, "max_tokens": 64, "top_p": 1.0, "stop": None}
+
+
+def test_hit_requires_the_same_memory_context():
+    cache = ResponseCache()
+    cache.put("system", "question", "model", GREEDY, "answer", "memory A")
+
+    assert cache.get("system", "question", "model", GREEDY, "memory A") == "answer"
+    assert cache.get("system", "question", "model", GREEDY, "memory B") is None
+    assert cache.get("system", "question", "model", GREEDY) is None
+
+
+def test_semantic_hit_requires_the_same_memory_context():
+    cache = ResponseCache(semantic=True, similarity_threshold=0.9, embed=lambda text: [1.0, float(len(text)) / 100])
+    cache.put("system", "question", "model", GREEDY, "answer", "memory A")
+
+    assert cache.get("system", "question?", "model", GREEDY, "memory A") == "answer"
+    assert cache.get("system", "question?", "model", GREEDY, "memory B") is None
+
+
+def test_sampled_requests_bypass_the_cache_by_default():
+    cache = ResponseCache()
+    sampled = dict(GREEDY, temperature=0.7)
+    cache.put("system", "question", "model", sampled, "answer")
+
+    assert len(cache) == 0
+    assert cache.get("system", "question", "model", sampled) is None
@@ -0,0 +1,61 @@
+"""Tests for VSCodeAgent's use of the response cache, with a stub LLM and a local memory store."""
+
+import pytest
+
+from vscode_agent import VSCodeAgent
+
+
+class StubLlm:
+    """Stands in for LlamaCppInterface; records the prompts it is sent."""
+
+    model_name = "stub"
+    temperature = 0.0
+    max_tokens = 64
+    top_p = 1.0
+
+    def __init__(self):
+        self.prompts = []
+
+    def for_request(self, request_type=None, session_id=None):
+        return self
+
+    def get_completion(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        return f"answer {len(self.prompts)}"
+
+    def stream_completion(self, prompt, system_prompt=None, **kwargs):
+        yield self.get_completion(prompt, system_prompt, **kwargs)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def agent(monkeypatch, tmp_path):
+    monkeypatch.setenv("VSCODE_AGENT_MEMORY_BACKEND", "local")
+    monkeypatch.setenv("VSCODE_AGENT_MEMORY_PATH", str(tmp_path / "memory"))
+    agent = VSCodeAgent(temperature=0)
+    agent.llm = StubLlm()
+    agent._llm_available = True
+    # Keep the memory store to what each test adds
+    monkeypatch.setattr(agent, "store_interaction", lambda *args, **kwargs: None)
+    yield agent
+    if agent.memory_writer is not None:
+        agent.memory_writer.close()
+
+
+def test_repeated_request_is_served_from_the_cache(agent):
+    assert agent.get_completion("what is x", use_memory=False) == "answer 1"
+    assert agent.get_completion("what is x", use_memory=False) == "answer 1"
+    assert "".join(agent.get_completion("what is x", use_memory=False, stream=True)) == "answer 1"
+    assert len(agent.llm.prompts) == 1
+
+
+def test_cached_response_is_not_reused_once_memories_change(agent):
+    agent.agent.add_memory("x is forty two", tag=["fact"])
+    assert agent.get_completion("what is x") == "answer 1"
+    assert agent.get_completion("what is x") == "answer 1"
+
+    agent.agent.add_memory("x was changed to seven", tag=["fact"])
+    assert agent.get_completion("what is x") == "answer 2"
+    assert "x was changed to seven" in agent.llm.prompts[-1]
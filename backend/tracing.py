@@ -0,0 +1,367 @@
+import atexit
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Union
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds and status codes
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+
+class SpanContext:
+    """Identity of a span, as carried by a W3C ``traceparent`` header."""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """Parse a W3C traceparent header; None if it is missing or invalid."""
+    match = _TRACEPARENT_PATTERN.match((header or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+# The active span (or the remote parent of the current request)
+_current: "contextvars.ContextVar[Optional[Union[Span, SpanContext]]]" = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def _context_of(parent: Union["Span", SpanContext, None]) -> Optional[SpanContext]:
+    return parent.context if isinstance(parent, (Span, _NonRecordingSpan)) else parent
+
+
+class _NoopSpan:
+    """Span returned when tracing is off. Every method does nothing."""
+
+    is_recording = False
+    context = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def set_status(self, code: int, message: str = ""):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _NonRecordingSpan(_NoopSpan):
+    """Unsampled span: records nothing, but its children inherit the decision."""
+
+    def __init__(self, context: SpanContext, activate: bool):
+        self.context = context
+        self._activate = activate
+        self._token = None
+
+    def __enter__(self):
+        if self._activate:
+            self._token = _current.set(self.context)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _reset(self._token)
+
+
+def _reset(token):
+    if token is None:
+        return
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Exited in another context than it was entered in (e.g. an ASGI adapter)
+        _current.set(None)
+
+
+class Span:
+    """A timed operation. Use as a context manager, or call end() once."""
+
+    is_recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, context: SpanContext, parent_id: Optional[str],
+                 kind: str = "internal", attributes: Optional[Dict[str, Any]] = None, activate: bool = True):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = {}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._activate = activate
+        self._token = None
+        self.set_attributes(**(attributes or {}))
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None and self.end_ns is None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_status(self, code: int, message: str = ""):
+        self.status = code
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException):
+        self.set_status(STATUS_ERROR, str(exc))
+        self.set_attribute("exception.type", type(exc).__name__)
+        self.set_attribute("exception.message", str(exc))
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.tracer._finish(self)
+
+    def __enter__(self):
+        if self._activate:
+            self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A generator closed early is not an error
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.record_exception(exc)
+        self.end()
+        _reset(self._token)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status, "message": self.status_message} if self.status_message
+            else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class FileSpanExporter:
+    """Appends each batch as one OTLP/JSON ``ExportTraceServiceRequest`` line."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Posts batches to an OpenTelemetry collector's OTLP/HTTP JSON endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5):
+        import requests
+
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, payload: Dict[str, Any]):
+        response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class Tracer:
+    """Creates spans and exports finished ones in batches from a background thread.
+
+    Root spans are sampled with probability ``sample_ratio``; child spans
+    and spans continuing a remote ``traceparent`` follow their parent.
+    """
+
+    def __init__(self, exporter, service_name: str = "vscode-agent", sample_ratio: float = 1.0,
+                 max_queue: int = 4096, batch_size: int = 512, flush_interval: float = 2.0):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.sample_ratio = float(sample_ratio)
+        self.max_queue = int(max_queue)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+
+        self._finished: deque = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def start_span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                   parent: Union["Span", SpanContext, None] = None, activate: bool = True):
+        """Start a span under ``parent`` (defaults to the active span)."""
+        parent_context = _context_of(parent if parent is not None else _current.get())
+        if parent_context is None:
+            context = SpanContext(os.urandom(16).hex(), os.urandom(8).hex(), random.random() < self.sample_ratio)
+        else:
+            context = SpanContext(parent_context.trace_id, os.urandom(8).hex(), parent_context.sampled)
+        if not context.sampled:
+            return _NonRecordingSpan(context, activate)
+        return Span(self, name, context, parent_context.span_id if parent_context else None,
+                    kind, attributes, activate)
+
+    def _finish(self, span: Span):
+        with self._cond:
+            if len(self._finished) >= self.max_queue:
+                return
+            self._finished.append(span)
+            if len(self._finished) >= self.batch_size:
+                self._cond.notify()
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "vscode-agent"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped and len(self._finished) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                spans = [self._finished.popleft() for _ in range(min(self.batch_size, len(self._finished)))]
+                stopped = self._stopped
+            if spans:
+                try:
+                    self.exporter.export(self._payload(spans))
+                except Exception as e:
+                    logger.warning("Could not export %d spans: %s", len(spans), e)
+            if stopped and not self._finished:
+                return
+
+    def shutdown(self, timeout: float = 5):
+        """Export what is queued and stop the exporter thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+
+class _NoopTracer:
+    def start_span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                   parent: Union["Span", SpanContext, None] = None, activate: bool = True):
+        return NOOP_SPAN
+
+    def shutdown(self, timeout: float = 5):
+        pass
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """The process tracer, configured from the tracing section of config.yml.
+
+    Tracing is off by default; the no-op tracer then makes every span free.
+    """
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            from port_utils import get_tracing_config
+
+            config = get_tracing_config()
+            _tracer = _NoopTracer()
+            if config.get("enabled"):
+                try:
+                    if config.get("exporter") == "otlp":
+                        exporter = OtlpHttpSpanExporter(config["otlp_endpoint"])
+                    else:
+                        exporter = FileSpanExporter(config["file_path"])
+                    _tracer = Tracer(exporter, config["service_name"], config["sample_ratio"])
+                    logger.info("Tracing enabled, exporting to %s",
+                                config["otlp_endpoint"] if config.get("exporter") == "otlp" else config["file_path"])
+                except Exception as e:
+                    logger.warning("Could not set up tracing, continuing without it: %s", e)
+    return _tracer
+
+
+def span(name: str, kind: str = "internal", parent: Union[Span, SpanContext, None] = None,
+         activate: bool = True, **attributes):
+    """Start a span; use as ``with span("name", key=value) as s:``.
+
+    Pass activate=False for spans inside generators, which must not change
+    the active span of the code that iterates them.
+    """
+    return get_tracer().start_span(name, kind, attributes, parent, activate)
+
+
+def current_span():
+    """The active recording span, or a no-op span."""
+    active = _current.get()
+    return active if isinstance(active, Span) else NOOP_SPAN
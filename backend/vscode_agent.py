@@ -1,11 +1,27 @@
 import os
 import json
-from typing import Optional, List, Dict, Any, Union
+import contextvars
+import threading
+from typing import Callable, Optional, Iterator, List, Dict, Any, Union
 from uuid import uuid4
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from llm_interface import create_llm_interface, LlamaCppInterface
+from llm_interface import create_llm_interface, LlamaCppInterface, SlotAffinity
 from agent_roles import Agent, Status, Priority
+from context_assembler import ContextAssembler, TokenCounter
+from memory_writer import WriteBehindQueue
+from metrics import histogram
+from port_utils import get_inline_completion_config, get_llm_config, get_memory_config, get_response_cache_config
+from response_cache import ResponseCache
+from structured_logging import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+retrieval_wait_histogram = histogram(
+    "memory_retrieval_wait_seconds", "Time a request blocked waiting for its memory search"
+)
 
 class VSCodeAgent:
     """
@@ -33,6 +49,41 @@ class VSCodeAgent:
         # Create the base agent for memory management
         self.agent = Agent(agent_id, "vscode_assistant")
         
+        memory_config = get_memory_config()
+        self.prefetch = memory_config.get('prefetch', True)
+        self.warm_up_llm = memory_config.get('warm_up_llm', False)
+        
+        # Memory retrieval runs here so it overlaps with other request work
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(memory_config.get('retrieval_workers', 8)),
+            thread_name_prefix="memory-retrieval"
+        )
+        
+        # Persist interactions in the background so responses don't wait on them
+        write_behind = memory_config['write_behind']
+        self.memory_writer = None
+        if write_behind.get('enabled', True):
+            self.memory_writer = WriteBehindQueue(
+                self.agent,
+                max_queue=write_behind['max_queue'],
+                batch_size=write_behind['batch_size'],
+                flush_interval_ms=write_behind['flush_interval_ms'],
+                put_timeout=write_behind['put_timeout']
+            )
+        
+        # Cache responses for repeated requests
+        cache_config = get_response_cache_config()
+        self.response_cache = None
+        if cache_config.get('enabled', True):
+            self.response_cache = ResponseCache(
+                max_entries=cache_config['max_entries'],
+                ttl_seconds=cache_config['ttl_seconds'],
+                allow_sampling=cache_config['allow_sampling'],
+                semantic=cache_config['semantic'].get('enabled', False),
+                similarity_threshold=cache_config['semantic'].get('threshold', 0.95),
+                embed=self.agent._generate_embedding
+            )
+        
         # Initialize LLM interface
         self.llm = create_llm_interface(
             api_url=api_url,
@@ -41,11 +92,53 @@ class VSCodeAgent:
             max_tokens=max_tokens
         )
         
-        # Check if LLM is accessible
-        self.llm_available = self.llm.is_available()
-        if not self.llm_available:
-            print(f"Warning: LLM is not available. Agent {agent_id} will operate with Weaviate memory only.")
-            print(f"LLM features will return simulated responses for demonstration purposes.")
+        # Pin editor sessions to server slots so their prompt prefixes stay cached
+        llm_config = get_llm_config()
+        self.slot_affinity = SlotAffinity(llm_config['slots'])
+        
+        self.inline_config = get_inline_completion_config()
+        
+        # Fit injected memories into a token budget so prompt size stays bounded
+        context_config = memory_config['context']
+        self.context_size = int(llm_config['context_size'])
+        self.context_reserve_tokens = int(context_config['reserve_tokens'])
+        self.context_assembler = ContextAssembler(
+            TokenCounter(
+                tokenize=self.llm.tokenize if context_config['tokenizer'] == "llama" else None,
+                chars_per_token=context_config['chars_per_token']
+            ),
+            budget_tokens=context_config['budget_tokens'],
+            max_memory_tokens=context_config['max_memory_tokens'],
+            min_memory_tokens=context_config['min_memory_tokens'],
+            dedupe_threshold=context_config['dedupe_threshold']
+        )
+        
+        # Whether the LLM is accessible, checked on first use (see check_llm)
+        self.agent_id = agent_id
+        self._llm_available: Optional[bool] = None
+        self._llm_check_lock = threading.RLock()
+    
+    @property
+    def llm_available(self) -> bool:
+        """Whether the LLM server answered the availability check."""
+        if self._llm_available is None:
+            with self._llm_check_lock:
+                if self._llm_available is None:
+                    self.check_llm()
+        return self._llm_available
+    
+    def check_llm(self) -> bool:
+        """Check whether the LLM server is accessible and remember the result.
+        
+        Runs once on first use, or at startup when the backend initializes in
+        the background, so importing the agent never blocks on the server.
+        """
+        with self._llm_check_lock:
+            self._llm_available = self.llm.is_available()
+        if not self._llm_available:
+            logger.warning("LLM is not available. Agent %s will operate with Weaviate memory only.", self.agent_id)
+            logger.warning("LLM features will return simulated responses for demonstration purposes.")
+        return self._llm_available
     
     def get_completion(
         self, 
@@ -54,67 +147,260 @@ class VSCodeAgent:
         use_memory: bool = True,
         memory_query: Optional[str] = None,
         memory_limit: int = 5,
+        stream: bool = False,
+        use_cache: bool = True,
+        memory_future: Optional[Future] = None,
+        context: Optional[str] = None,
+        session_id: Optional[str] = None,
+        request_type: Optional[str] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
         **kwargs
-    ) -> str:
+    ) -> Union[str, Iterator[str]]:
         """Get a completion from the LLM with optional memory context.
         
+        The user message is laid out from most to least stable, so
+        consecutive requests share the longest possible prompt prefix with
+        llama.cpp's cached one: file context, then memories, then the query.
+        
         Args:
             prompt: The user's prompt/question
             system_prompt: Optional system prompt to guide model behavior
             use_memory: Whether to use memory context
-            memory_query: Query to find relevant memories (defaults to prompt if None)
+            memory_query: Query to find relevant memories (defaults to context and prompt if None)
             memory_limit: Maximum number of memories to include
+            stream: Return an iterator over text chunks as they are generated
+            use_cache: Whether to use the response cache
+            memory_future: Retrieval already started with retrieve_memories
+            context: File/code context the query is about, placed before the memories
+            session_id: Editor session (e.g. document) whose requests share a server slot
+            request_type: Kind of request (e.g. "code_completion"), used to pick an LLM route
+            cancelled: Returns True once the client has gone away; generation
+                is then aborted and the interaction is not stored
             **kwargs: Additional parameters to pass to the LLM
             
         Returns:
-            The generated text as a string
+            The generated text as a string, or an iterator of text chunks when
+            streaming. A streamed interaction is stored once the stream finishes.
+            
+        Raises:
+            RequestCancelled: If cancelled() became true during generation
         """
-        if not self.llm_available:
-            return f"[Simulated LLM response for: {prompt}] This is a demo response since LLM is not available."
+        logger.debug("Completion requested", extra={"request_type": request_type, "stream": stream, "use_memory": use_memory})
+        if stream:
+            return self._stream_completion(
+                prompt, system_prompt, use_memory, memory_query, memory_limit, use_cache,
+                memory_future, context, session_id, request_type, cancelled, **kwargs
+            )
+        
+        with span("VSCodeAgent.get_completion", **{
+            "request.type": request_type, "memory.enabled": use_memory, "prompt.chars": len(prompt)
+        }) as completion_span:
+            full_prompt = self._join_context(context, prompt)
+            if not self.llm_available:
+                return self._simulated_response(full_prompt)
+            
+            llm = self.llm.for_request(request_type, session_id)
+            
+            id_slot = self.slot_affinity.slot_for(session_id)
+            memory_future = self._start_retrieval(use_memory, memory_query or full_prompt, memory_limit, memory_future)
+            self._maybe_warm_up(llm, system_prompt, memory_future, id_slot)
+            memory_context = self._memory_context(prompt, memory_future, context)
+            
+            # Keyed on the injected memories too, so an answer built from memories
+            # that have since changed is not served from the cache
+            cache_params = self._cache_params(kwargs) if use_cache and self.response_cache is not None else None
+            if cache_params is not None:
+                cached = self.response_cache.get(system_prompt, full_prompt, llm.model_name, cache_params, memory_context)
+                if cached is not None:
+                    completion_span.set_attribute("cache.hit", True)
+                    return cached
+            
+            enhanced_prompt = self._build_enhanced_prompt(prompt, memory_context, context)
+            
+            # Get completion from LLM
+            response = llm.get_completion(enhanced_prompt, system_prompt, id_slot=id_slot, cancelled=cancelled, **kwargs)
+            
+            if cache_params is not None and not response.startswith("Error:"):
+                self.response_cache.put(system_prompt, full_prompt, llm.model_name, cache_params, response, memory_context)
+            
+            # Store the interaction in memory, unless nobody saw it
+            if cancelled is None or not cancelled():
+                self.store_interaction(full_prompt, response, system_prompt)
+            
+            completion_span.set_attribute("response.chars", len(response))
+            return response
+    
+    def _stream_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        use_memory: bool,
+        memory_query: Optional[str],
+        memory_limit: int,
+        use_cache: bool = True,
+        memory_future: Optional[Future] = None,
+        context: Optional[str] = None,
+        session_id: Optional[str] = None,
+        request_type: Optional[str] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """Yield completion chunks and store the interaction once the stream ends."""
+        # Not activated: a generator must not change its consumer's active span
+        with span("VSCodeAgent.get_completion", activate=False, **{
+            "request.type": request_type, "memory.enabled": use_memory, "prompt.chars": len(prompt), "stream": True
+        }) as completion_span:
+            full_prompt = self._join_context(context, prompt)
+            if not self.llm_available:
+                yield self._simulated_response(full_prompt)
+                return
+            
+            llm = self.llm.for_request(request_type, session_id)
+            
+            id_slot = self.slot_affinity.slot_for(session_id)
+            memory_future = self._start_retrieval(use_memory, memory_query or full_prompt, memory_limit, memory_future)
+            self._maybe_warm_up(llm, system_prompt, memory_future, id_slot)
+            memory_context = self._memory_context(prompt, memory_future, context)
+            
+            cache_params = self._cache_params(kwargs) if use_cache and self.response_cache is not None else None
+            if cache_params is not None:
+                cached = self.response_cache.get(system_prompt, full_prompt, llm.model_name, cache_params, memory_context)
+                if cached is not None:
+                    completion_span.set_attribute("cache.hit", True)
+                    yield cached
+                    return
+            
+            enhanced_prompt = self._build_enhanced_prompt(prompt, memory_context, context)
+            
+            chunks = []
+            upstream = llm.stream_completion(enhanced_prompt, system_prompt, id_slot=id_slot, cancelled=cancelled, **kwargs)
+            try:
+                for chunk in upstream:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                # If the client disconnected, closing the upstream stream stops generation
+                upstream.close()
+            
+            # Only reached when the stream was fully consumed
+            response = "".join(chunks)
+            completion_span.set_attribute("response.chars", len(response))
+            if cache_params is not None and not response.startswith("Error:"):
+                self.response_cache.put(system_prompt, full_prompt, llm.model_name, cache_params, response, memory_context)
+            self.store_interaction(full_prompt, response, system_prompt)
+    
+    def _cache_params(self, llm_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Sampling parameters that identify a response in the cache."""
+        return {
+            "temperature": llm_kwargs.get("temperature", self.llm.temperature),
+            "max_tokens": llm_kwargs.get("max_tokens", self.llm.max_tokens),
+            "top_p": llm_kwargs.get("top_p", self.llm.top_p),
+            "stop": llm_kwargs.get("stop")
+        }
+    
+    def _simulated_response(self, prompt: str) -> str:
+        """Response returned when the LLM server is not reachable."""
+        return f"[Simulated LLM response for: {prompt}] This is a demo response since LLM is not available."
+    
+    def prefetch_memories(self, memory_query: str, limit: int = 5) -> Future:
+        """Start a memory search in the background.
         
-        # Include memory context if requested
-        memory_context = []
-        if use_memory:
-            query = memory_query or prompt
-            memory_context = self.agent.search_memory(query, limit=memory_limit)
+        Pass the returned future to get_completion as memory_future; its
+        result is also available to the caller (e.g. to report a memory ID)
+        without a second search.
         
-        # Construct enhanced prompt with memory context
-        enhanced_prompt = prompt
-        if memory_context:
-            context_str = self._format_memories_as_context(memory_context)
-            enhanced_prompt = f"Context from your memory:\n{context_str}\n\nUser Query: {prompt}"
+        Args:
+            memory_query: Query to find relevant memories
+            limit: Maximum number of memories to return
+            
+        Returns:
+            A future resolving to the list of memory objects
+        """
+        # Run in a copy of this context so the search logs under the request's ID
+        return self._executor.submit(
+            contextvars.copy_context().run, self.agent.search_memory, memory_query, limit=limit
+        )
+    
+    def retrieve_memories(self, memory_query: str, limit: int = 5) -> Future:
+        """Get the memories for a request as a future, honouring memory.prefetch.
         
-        # Get completion from LLM
-        response = self.llm.get_completion(enhanced_prompt, system_prompt, **kwargs)
+        With prefetch on this is prefetch_memories. With it off the search
+        runs now, in the calling thread, and the future is already done.
         
-        # Store the interaction in memory
-        self.store_interaction(prompt, response, system_prompt)
+        Args:
+            memory_query: Query to find relevant memories
+            limit: Maximum number of memories to return
+            
+        Returns:
+            A future resolving to the list of memory objects
+        """
+        if self.prefetch:
+            return self.prefetch_memories(memory_query, limit=limit)
         
-        return response
+        future: Future = Future()
+        try:
+            future.set_result(self.agent.search_memory(memory_query, limit=limit))
+        except Exception as e:
+            future.set_exception(e)
+        return future
     
-    def _format_memories_as_context(self, memories: List[Dict[str, Any]]) -> str:
-        """Format a list of memory objects as a context string for the LLM."""
-        context_items = []
-        
-        for i, memory in enumerate(memories):
-            # Format timestamp if present
-            timestamp = memory.get("timestamp", "")
-            if timestamp:
-                try:
-                    # Parse ISO format timestamp and format it nicely
-                    dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-                    timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except (ValueError, TypeError):
-                    pass
-            
-            # Format memory as a context item
-            context_items.append(
-                f"Memory #{i+1} [{timestamp}]:\n"
-                f"Text: {memory.get('text', '')}\n"
-                f"Tags: {', '.join(memory.get('tag', []))}"
-            )
+    def _start_retrieval(
+        self,
+        use_memory: bool,
+        memory_query: str,
+        memory_limit: int,
+        memory_future: Optional[Future],
+    ) -> Optional[Future]:
+        """Return the retrieval future for a request, starting one if needed."""
+        if not use_memory:
+            return None
+        if memory_future is not None:
+            return memory_future
+        return self.prefetch_memories(memory_query, limit=memory_limit)
+    
+    def _maybe_warm_up(self, llm: LlamaCppInterface, system_prompt: Optional[str], memory_future: Optional[Future],
+                       id_slot: Optional[int] = None):
+        """Prefill the LLM prompt cache with the system prompt while retrieval is still running."""
+        if self.warm_up_llm and system_prompt and memory_future is not None and not memory_future.done():
+            self._executor.submit(contextvars.copy_context().run, llm.warm_up, system_prompt, id_slot)
+    
+    @staticmethod
+    def _join_context(context: Optional[str], prompt: str) -> str:
+        """The request as one text, for caching, memory search and storage."""
+        return f"{context}\n\n{prompt}" if context else prompt
+    
+    def _memory_context(self, prompt: str, memory_future: Optional[Future], context: Optional[str] = None) -> str:
+        """Wait for retrieval and format the memories that fit the budget ("" if none)."""
+        memories = []
+        if memory_future is not None:
+            try:
+                with retrieval_wait_histogram.time():
+                    memories = memory_future.result()
+            except Exception as e:
+                logger.warning("Memory retrieval failed, continuing without memory: %s", e)
+        if not memories:
+            return ""
+        
+        # Memories get what the context window has left after the prompt and the reserve
+        budget = (self.context_size - self.context_reserve_tokens
+                  - self.context_assembler.counter.count(self._join_context(context, prompt)))
+        return self._format_memories_as_context(memories, budget_tokens=budget)
+    
+    def _build_enhanced_prompt(self, prompt: str, memory_context: str, context: Optional[str] = None) -> str:
+        """Lay out the user message as file context, then memories, then the query."""
+        if not context and not memory_context:
+            return prompt
         
-        return "\n\n".join(context_items)
+        # Stable parts first: the file context is shared by repeated requests on a file
+        sections = [context] if context else []
+        if memory_context:
+            sections.append(f"Context from your memory:\n{memory_context}")
+        sections.append(f"User Query: {prompt}")
+        return "\n\n".join(sections)
+    
+    def _format_memories_as_context(self, memories: List[Dict[str, Any]], budget_tokens: Optional[int] = None) -> str:
+        """Format a list of memory objects as a context string for the LLM, within the token budget."""
+        return self.context_assembler.assemble(memories, budget_tokens)
     
     def store_interaction(
         self, 
@@ -125,6 +411,9 @@ class VSCodeAgent:
     ) -> str:
         """Store an interaction in memory.
         
+        With the write-behind queue enabled the write happens in the
+        background and this returns as soon as the interaction is queued.
+        
         Args:
             prompt: The user's prompt
             response: The agent's response
@@ -134,17 +423,22 @@ class VSCodeAgent:
         Returns:
             The memory UUID
         """
-        memory_id, _ = self.agent.add_memory(
-            text=f"User: {prompt}\nAgent: {response}",
-            tag=tags,
-            status=Status.COMPLETED,
-            metadata=json.dumps({
+        memory = {
+            "text": f"User: {prompt}\nAgent: {response}",
+            "tag": tags,
+            "status": Status.COMPLETED,
+            "metadata": json.dumps({
                 "prompt": prompt,
                 "response": response,
                 "system_prompt": system_prompt,
                 "timestamp": datetime.now().isoformat()
             })
-        )
+        }
+        
+        if self.memory_writer is not None:
+            return self.memory_writer.submit(memory)
+        
+        memory_id, _ = self.agent.add_memory(**memory)
         return memory_id
     
     def code_completion(
@@ -163,7 +457,7 @@ class VSCodeAgent:
             **kwargs: Additional parameters for the LLM
             
         Returns:
-            Generated code completion
+            Generated code completion (an iterator of chunks if stream=True)
         """
         system_prompt = (
             "You are an expert coding assistant specialized in providing precise and idiomatic "
@@ -171,16 +465,67 @@ class VSCodeAgent:
             "Provide only the exact code without explanations or markdown formatting."
         )
         
-        prompt = f"Given this code context:\n```{file_type}\n{code_context}\n```\n\nRequest: {request}"
+        context = f"Given this code context:\n```{file_type}\n{code_context}\n```"
+        prompt = f"Request: {request}"
         
         # Use memory to find similar coding patterns
         return self.get_completion(
             prompt=prompt,
             system_prompt=system_prompt,
             memory_query=f"{file_type} code {request}",
+            context=context,
+            request_type="code_completion",
             **kwargs
         )
     
+    def inline_completion(
+        self,
+        prefix: str,
+        suffix: str = "",
+        session_id: Optional[str] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+        **kwargs
+    ) -> str:
+        """Fill-in-the-middle completion for as-you-type suggestions.
+        
+        Built for latency rather than quality: no memory retrieval, response
+        cache or stored interaction, a short generation that stops at the end
+        of the line by default, and prefix/suffix clipped to whole lines
+        within the inline_completion limits so prefill stays small.
+        
+        Args:
+            prefix: Text before the cursor
+            suffix: Text after the cursor
+            session_id: Editor session (e.g. document)
+            cancelled: Returns True once the suggestion is no longer wanted
+            **kwargs: Sampling overrides for the inline_completion defaults
+            
+        Returns:
+            The text to insert at the cursor (empty if the LLM is unavailable)
+        """
+        if not self.llm_available:
+            return ""
+        
+        config = self.inline_config
+        max_prefix, max_suffix = int(config['max_prefix_chars']), int(config['max_suffix_chars'])
+        if max_prefix and len(prefix) > max_prefix:
+            prefix = prefix[-max_prefix:]
+            prefix = prefix[prefix.find("\n") + 1:]
+        if max_suffix and len(suffix) > max_suffix:
+            suffix = suffix[:max_suffix]
+            suffix = suffix[:suffix.rfind("\n") + 1]
+        
+        options = {key: config[key] for key in ("max_tokens", "temperature", "top_p", "stop")}
+        options.update(kwargs)
+        
+        # Successive keystrokes share almost their whole prompt, so give a
+        # document's inline completions their own slot to keep it cached
+        inline_session = f"{session_id}:inline" if session_id else None
+        llm = self.llm.for_request("inline_completion", inline_session)
+        return llm.infill(
+            prefix, suffix, id_slot=self.slot_affinity.slot_for(inline_session), cancelled=cancelled, **options
+        )
+    
     def code_explanation(
         self,
         code: str,
@@ -195,7 +540,7 @@ class VSCodeAgent:
             **kwargs: Additional parameters for the LLM
             
         Returns:
-            Explanation of the code
+            Explanation of the code (an iterator of chunks if stream=True)
         """
         system_prompt = (
             "You are an expert code explainer. Break down the given code into understandable parts, "
@@ -203,11 +548,14 @@ class VSCodeAgent:
             "important patterns or idioms used."
         )
         
-        prompt = f"Please explain this {file_type} code:\n```{file_type}\n{code}\n```"
+        context = f"```{file_type}\n{code}\n```"
+        prompt = f"Please explain this {file_type} code."
         
         return self.get_completion(
             prompt=prompt,
             system_prompt=system_prompt,
+            context=context,
+            request_type="code_explanation",
             **kwargs
         )
     
@@ -225,7 +573,7 @@ class VSCodeAgent:
             **kwargs: Additional parameters for the LLM
             
         Returns:
-            Suggested improvements
+            Suggested improvements (an iterator of chunks if stream=True)
         """
         system_prompt = (
             "You are an expert code reviewer and optimizer. Analyze the given code and suggest improvements "
@@ -233,11 +581,14 @@ class VSCodeAgent:
             "suggestions with example code where appropriate."
         )
         
-        prompt = f"Please suggest improvements for this {file_type} code:\n```{file_type}\n{code}\n```"
+        context = f"```{file_type}\n{code}\n```"
+        prompt = f"Please suggest improvements for this {file_type} code."
         
         return self.get_completion(
             prompt=prompt,
             system_prompt=system_prompt,
+            context=context,
+            request_type="suggest_improvements",
             **kwargs
         )
     
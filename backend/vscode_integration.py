@@ -1,38 +1,205 @@
 import os
 import sys
 import json
+import time
+import logging
 import argparse
-from typing import Dict, Any
-from flask import Flask, request, jsonify, Response, make_response
+from uuid import uuid4
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, Union
+from flask import Flask, g, request, jsonify, Response, make_response, stream_with_context
 from datetime import datetime
 
 # Try different import approaches to support various ways of running the script
 try:
     # Direct import when run as python -m backend.vscode_integration
-    from .port_utils import get_backend_port, save_port_info
+    from .port_utils import (
+        get_admission_config, get_backend_port, get_inline_completion_config, get_server_config,
+        get_startup_config, save_port_info
+    )
 except (ImportError, ModuleNotFoundError):
     try:
         # Direct import when run within the backend directory
-        from port_utils import get_backend_port, save_port_info
+        from port_utils import (
+            get_admission_config, get_backend_port, get_inline_completion_config, get_server_config,
+            get_startup_config, save_port_info
+        )
     except (ImportError, ModuleNotFoundError):
         # Absolute import when run from project root
         sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from backend.port_utils import get_backend_port, save_port_info
+        from backend.port_utils import (
+            get_admission_config, get_backend_port, get_inline_completion_config, get_server_config,
+            get_startup_config, save_port_info
+        )
 
+from admission import AdmissionController, AdmissionRejected
+from debounce import RequestDebouncer
+from llm_interface import RequestCancelled
+from metrics import counter, histogram, render_metrics
+from structured_logging import get_logger, new_request_id, request_id_var, truncate_payload
+from tracing import TRACEPARENT_HEADER, current_span, parse_traceparent, span
 from vscode_agent import VSCodeAgent
+from agent_roles import Priority
+from serving import SERVER_TYPES, serve
+from startup import Readiness
+from weaviate_client import close_weaviate_connections
+
+logger = get_logger(__name__)
 
-# Initialize the VSCodeAgent
+# Initialize the VSCodeAgent (cheap: its memory store, embedding model and
+# LLM check are set up on first use or by the startup components below)
 agent = VSCodeAgent()
 
+# Set up the slow dependencies without holding up the port
+_startup_config = get_startup_config()
+readiness = Readiness(_startup_config['mode'])
+
+def _check_llm():
+    if not agent.check_llm():
+        raise ConnectionError("LLM server is not available; responses will be simulated")
+
+def _load_embedding_model():
+    # The first encode also pays one-off setup cost, so run one here
+    agent.agent.model.encode(["warm up"])
+
+def startup_components():
+    """The (name, initializer) pairs reported by /ready."""
+    components = [("llm", _check_llm), ("memory_store", lambda: agent.agent.store)]
+    if _startup_config['preload_embedding_model']:
+        components.append(("embedding_model", _load_embedding_model))
+    return components
+
+# Bound the LLM requests running and waiting in this process
+_admission_config = get_admission_config()
+admission = None
+if _admission_config.pop('enabled', True):
+    admission = AdmissionController(**_admission_config)
+
+parse_histogram = histogram("agent_request_parse_seconds", "Time to parse an agent request body")
+# Streamed responses are observed when the stream ends, so their latency
+# covers generation. "status" is one of REQUEST_STATUSES.
+request_histogram = histogram("agent_request_seconds", "Time to handle an agent request", ("type",))
+requests_counter = counter("agent_requests_total", "Agent requests handled by type and outcome", ("type", "status"))
+
+# Outcomes recorded in agent_requests_total's "status" label, for JSON and streamed responses alike:
+# success, error (the handler or LLM reported an error), exception (the handler raised),
+# cancelled (the client disconnected) and superseded (an inline completion replaced by a newer one)
+REQUEST_STATUSES = ("success", "error", "exception", "cancelled", "superseded")
+
+# Prefix of the text the LLM interfaces yield in place of a stream they could not produce
+STREAM_ERROR_PREFIX = "Error: "
+
+# Request types reported as themselves in metrics; others count as "unknown"
+METRIC_REQUEST_TYPES = (
+    "code_completion", "code_explanation", "code_improvement", "general_query", "inline_completion", "openai"
+)
+
+# Coalesce as-you-type completion requests from the same document
+inline_debouncer = RequestDebouncer(get_inline_completion_config()['debounce_ms'])
+
+# Response fields that carry generated text in /api/agent responses
+STREAMABLE_RESULT_KEYS = ("completion", "explanation", "improvements", "response")
+
+# Sampling parameters a request may pass through to the LLM
+LLM_OPTION_KEYS = ("temperature", "max_tokens", "top_p", "stop")
+
+def _llm_options(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Sampling overrides and the editor session ID present in a request body,
+    plus the current request's disconnect check."""
+    options = {key: request_data[key] for key in LLM_OPTION_KEYS if request_data.get(key) is not None}
+    if request_data.get("session_id"):
+        options["session_id"] = str(request_data["session_id"])
+    client_disconnected = _client_disconnected()
+    if client_disconnected is not None:
+        options["cancelled"] = client_disconnected
+    return options
+
+def _client_disconnected() -> Optional[Callable[[], bool]]:
+    """Callable telling whether the current request's client has gone away.
+    
+    waitress provides one when ``channel_request_lookahead`` is set (see
+    backend.server.request_lookahead); under other servers there is none
+    and requests run to completion.
+    """
+    try:
+        return request.environ.get("waitress.client_disconnected")
+    except RuntimeError:
+        # Outside a request context
+        return None
+
 def parse_vscode_request(request_json: str) -> Dict[str, Any]:
     """Parse a request from VS Code IDE."""
+    with parse_histogram.time():
+        try:
+            return json.loads(request_json)
+        except json.JSONDecodeError:
+            return {"error": "Invalid JSON format"}
+
+def _record_request(request_type: str, status: str, started: float):
+    """Record a finished request's latency and outcome (one of REQUEST_STATUSES)."""
+    request_type = request_type if request_type in METRIC_REQUEST_TYPES else "unknown"
+    elapsed = time.perf_counter() - started
+    current_span().set_attribute("response.status", status)
+    request_histogram.observe(elapsed, type=request_type)
+    requests_counter.inc(type=request_type, status=status)
+    logger.info(
+        "Handled %s request: %s", request_type, status,
+        extra={"request_type": request_type, "status": status, "duration_ms": round(elapsed * 1000, 1)}
+    )
+
+def observed(request_type: str, handler, request_data: Dict[str, Any], *args) -> Dict[str, Any]:
+    """Run a request handler, recording its latency and outcome.
+    
+    The outcome is the response's "status" ("success", "error", ...),
+    "exception" if the handler raised, or "cancelled". A successful
+    response that carries a stream is recorded by observed_stream once the
+    stream ends instead.
+    """
+    status = "exception"
+    started = time.perf_counter()
+    streaming = False
+    try:
+        response = handler(request_data, *args)
+        status = str(response.get("status") or ("error" if "error" in response else "success"))
+        if status == "success":
+            for key in STREAMABLE_RESULT_KEYS:
+                if response.get(key) is not None and not isinstance(response[key], str):
+                    response[key] = observed_stream(request_type, response[key], started)
+                    streaming = True
+        return response
+    except RequestCancelled:
+        status = "cancelled"
+        raise
+    finally:
+        if not streaming:
+            _record_request(request_type, status, started)
+
+def observed_stream(request_type: str, chunks: Iterable[str], started: float) -> Iterator[str]:
+    """Pass a response's text chunks through, recording the request's
+    latency and outcome once the stream is exhausted, fails or is closed.
+    
+    The outcome is "error" if the stream opens with the LLM's error text,
+    "cancelled" if the client went away first, else as for observed.
+    """
+    status = "exception"
+    failed = None
     try:
-        return json.loads(request_json)
-    except json.JSONDecodeError:
-        return {"error": "Invalid JSON format"}
+        for chunk in chunks:
+            if failed is None:
+                failed = chunk.startswith(STREAM_ERROR_PREFIX)
+            yield chunk
+        status = "error" if failed else "success"
+    except (RequestCancelled, GeneratorExit):
+        status = "cancelled"
+        raise
+    finally:
+        _record_request(request_type, status, started)
 
 def handle_vscode_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
     """Handle a request from VS Code IDE and return a response."""
+    with span("handle_vscode_request", **{"request.type": request_data.get("type", "")}):
+        return observed(request_data.get("type", ""), _dispatch_vscode_request, request_data)
+
+def _dispatch_vscode_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
     request_type = request_data.get("type", "")
     
     if request_type == "code_completion":
@@ -64,7 +231,9 @@ def handle_code_completion(request_data: Dict[str, Any]) -> Dict[str, Any]:
     completion = agent.code_completion(
         code_context=code_context,
         file_type=file_type,
-        request=user_request
+        request=user_request,
+        stream=request_data.get("stream", False),
+        **_llm_options(request_data)
     )
     
     return {
@@ -85,7 +254,9 @@ def handle_code_explanation(request_data: Dict[str, Any]) -> Dict[str, Any]:
     
     explanation = agent.code_explanation(
         code=code,
-        file_type=file_type
+        file_type=file_type,
+        stream=request_data.get("stream", False),
+        **_llm_options(request_data)
     )
     
     return {
@@ -106,7 +277,9 @@ def handle_code_improvement(request_data: Dict[str, Any]) -> Dict[str, Any]:
     
     improvements = agent.suggest_improvements(
         code=code,
-        file_type=file_type
+        file_type=file_type,
+        stream=request_data.get("stream", False),
+        **_llm_options(request_data)
     )
     
     return {
@@ -119,6 +292,7 @@ def handle_general_query(request_data: Dict[str, Any]) -> Dict[str, Any]:
     query = request_data.get("query", "")
     system_prompt = request_data.get("system_prompt", None)
     use_memory = request_data.get("use_memory", True)
+    stream = request_data.get("stream", False)
     
     # Extract context if provided (for VS Code extension)
     context = request_data.get("context", {})
@@ -141,19 +315,30 @@ def handle_general_query(request_data: Dict[str, Any]) -> Dict[str, Any]:
     if file_language:
         memory_query = f"{file_language} {query}"
     
+    # Start retrieval right away (or run it now if memory.prefetch is off);
+    # its result also provides the memory ID
+    memory_future = agent.retrieve_memories(memory_query) if use_memory else None
+    
     response = agent.get_completion(
         prompt=enhanced_query,
         system_prompt=system_prompt,
         use_memory=use_memory,
-        memory_query=memory_query
+        memory_query=memory_query,
+        stream=stream,
+        memory_future=memory_future,
+        request_type="general_query",
+        **_llm_options(request_data)
     )
     
-    # For VS Code extension, track the memory ID used
+    # For VS Code extension, track the top memory used for context
     memory_id = ""
-    if use_memory:
-        recent_memories = agent.search_memory(memory_query, limit=1)
-        if recent_memories and len(recent_memories) > 0:
-            memory_id = recent_memories[0].get("id", "")
+    if memory_future is not None and not stream:
+        try:
+            memories = memory_future.result()
+        except Exception:
+            memories = []
+        if memories:
+            memory_id = memories[0].get("id", "")
     
     return {
         "status": "success",
@@ -161,12 +346,88 @@ def handle_general_query(request_data: Dict[str, Any]) -> Dict[str, Any]:
         "memoryId": memory_id
     }
 
-# OpenAI-compatible handlers
-def handle_openai_completion(request_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle OpenAI-style completion requests."""
-    # Print the request for debugging
-    print(f"Received completion request: {json.dumps(request_data)}")
+def handle_inline_completion(request_data: Dict[str, Any],
+                             superseded: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """Handle an as-you-type fill-in-the-middle completion request.
+    
+    Args:
+        request_data: Body with "prefix", optional "suffix" and sampling overrides
+        superseded: Returns True once a newer request for the same document arrived
+    """
+    prefix = request_data.get("prefix")
+    suffix = request_data.get("suffix") or ""
+    if not isinstance(prefix, str) or not isinstance(suffix, str):
+        return {
+            "status": "error",
+            "message": "Missing required parameter 'prefix' for inline completion"
+        }
+    
+    options = _llm_options(request_data)
+    client_disconnected = options.pop("cancelled", None)
+    
+    def cancelled() -> bool:
+        return bool((superseded and superseded()) or (client_disconnected and client_disconnected()))
+    
+    try:
+        completion = agent.inline_completion(prefix, suffix, cancelled=cancelled, **options)
+    except RequestCancelled:
+        if superseded is None or not superseded():
+            raise
+        return {"status": "superseded", "completion": ""}
+    
+    if completion.startswith("Error:"):
+        return {"status": "error", "message": completion[len("Error: "):]}
+    return {
+        "status": "success",
+        "completion": completion
+    }
+
+# Keyword arguments accepted per item by /api/memory/bulk
+BULK_MEMORY_FIELDS = (
+    "text", "tag", "priority", "status", "related_agents", "context_id",
+    "metadata", "expiry_days", "source", "uuid"
+)
+
+def handle_memory_bulk(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle a bulk memory ingestion request."""
+    memories = request_data.get("memories")
+    if not isinstance(memories, list) or not memories:
+        return {
+            "status": "error",
+            "message": "Missing required parameter 'memories' (a non-empty list)"
+        }
+    
+    items = []
+    for memory in memories:
+        if isinstance(memory, str):
+            memory = {"text": memory}
+        if not isinstance(memory, dict):
+            memory = {}
+        item = {key: memory[key] for key in BULK_MEMORY_FIELDS if key in memory}
+        # Accept the extension's "tags" spelling and priority names like "high"
+        if "tags" in memory and "tag" not in item:
+            item["tag"] = memory["tags"]
+        if isinstance(item.get("priority"), str) and item["priority"].upper() in Priority.__members__:
+            item["priority"] = Priority[item["priority"].upper()]
+        items.append(item)
     
+    results = agent.agent.add_memories_bulk(
+        items,
+        batch_size=request_data.get("batch_size"),
+        concurrency=request_data.get("concurrency")
+    )
+    failed = sum(1 for result in results if result["error"])
+    
+    return {
+        "status": "success" if not failed else "partial" if failed < len(results) else "error",
+        "inserted": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }
+
+# OpenAI-compatible handlers
+def _extract_openai_prompts(request_data: Dict[str, Any]):
+    """Return (prompt, system_prompt) from an OpenAI-style request body."""
     prompt = request_data.get("prompt", "")
     if not prompt:
         # Try to extract from messages for chat completions
@@ -178,14 +439,6 @@ def handle_openai_completion(request_data: Dict[str, Any]) -> Dict[str, Any]:
                     prompt = msg.get("content", "")
                     break
     
-    if not prompt:
-        return {
-            "error": {
-                "message": "No prompt or messages provided",
-                "type": "invalid_request_error"
-            }
-        }
-    
     system_prompt = None
     # Check for system message in chat completions
     messages = request_data.get("messages", [])
@@ -194,17 +447,33 @@ def handle_openai_completion(request_data: Dict[str, Any]) -> Dict[str, Any]:
             system_prompt = msg.get("content")
             break
     
+    return prompt, system_prompt
+
+def _missing_prompt_error() -> Dict[str, Any]:
+    """Error body for OpenAI-style requests without a prompt."""
+    return {
+        "error": {
+            "message": "No prompt or messages provided",
+            "type": "invalid_request_error"
+        }
+    }
+
+def handle_openai_completion(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle OpenAI-style completion requests."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received completion request", extra={"payload": truncate_payload(request_data)})
+    
+    prompt, system_prompt = _extract_openai_prompts(request_data)
+    if not prompt:
+        return _missing_prompt_error()
+    
     response_text = agent.get_completion(
         prompt=prompt,
         system_prompt=system_prompt,
-        use_memory=True
+        use_memory=True,
+        **_llm_options(request_data)
     )
     
-    # Format response in OpenAI style
-    if request_data.get("stream", False):
-        # Implement streaming if needed
-        pass
-    
     # Return in chat completions format if it was a chat request
     if "messages" in request_data:
         return {
@@ -250,16 +519,232 @@ def handle_openai_completion(request_data: Dict[str, Any]) -> Dict[str, Any]:
         }
     }
 
+def handle_openai_completion_stream(request_data: Dict[str, Any]) -> Union[Dict[str, Any], Iterator[str]]:
+    """Handle OpenAI-style completion requests with ``stream: true``.
+    
+    Returns an error dictionary if the request is invalid, otherwise an
+    iterator of server-sent event strings.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received streaming completion request", extra={"payload": truncate_payload(request_data)})
+    
+    started = time.perf_counter()
+    prompt, system_prompt = _extract_openai_prompts(request_data)
+    if not prompt:
+        _record_request("openai", "error", started)
+        return _missing_prompt_error()
+    
+    try:
+        chunks = agent.get_completion(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            use_memory=True,
+            stream=True,
+            **_llm_options(request_data)
+        )
+    except BaseException as e:
+        _record_request("openai", "cancelled" if isinstance(e, RequestCancelled) else "exception", started)
+        raise
+    return stream_openai_chunks(observed_stream("openai", chunks, started), chat="messages" in request_data)
+
+def _sse_event(payload: Union[Dict[str, Any], str]) -> str:
+    """Format a payload as a single server-sent event."""
+    if not isinstance(payload, str):
+        payload = json.dumps(payload)
+    return f"data: {payload}\n\n"
+
+def stream_openai_chunks(chunks: Iterable[str], chat: bool = True) -> Iterator[str]:
+    """Wrap text chunks as OpenAI-style streaming events.
+    
+    Args:
+        chunks: Pieces of generated text, in order
+        chat: Emit ``chat.completion.chunk`` objects; otherwise ``text_completion``
+        
+    Yields:
+        Server-sent event strings, terminated by ``data: [DONE]``
+    """
+    completion_id = "weaviate-vscode-" + uuid4().hex[:10]
+    created = int(time.time())
+    
+    def make_chunk(text: Optional[str], finish_reason: Optional[str] = None, role: Optional[str] = None):
+        if chat:
+            delta = {}
+            if role:
+                delta["role"] = role
+            if text is not None:
+                delta["content"] = text
+            choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+        else:
+            choice = {"text": text or "", "index": 0, "logprobs": None, "finish_reason": finish_reason}
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk" if chat else "text_completion",
+            "created": created,
+            "model": "vscode-agent",
+            "choices": [choice]
+        }
+    
+    if chat:
+        yield _sse_event(make_chunk(None, role="assistant"))
+    
+    try:
+        for text in chunks:
+            yield _sse_event(make_chunk(text))
+    except RequestCancelled:
+        # The client is gone, there is nobody to finish the stream for
+        return
+    
+    yield _sse_event(make_chunk(None, finish_reason="stop"))
+    yield _sse_event("[DONE]")
+
+def sse_response(events: Iterable[str]) -> Response:
+    """Build a streaming Flask response from server-sent event strings."""
+    response = Response(stream_with_context(events), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop reverse proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+def openai_response(request_data: Dict[str, Any]) -> Response:
+    """Return a JSON or streamed response for a /v1 completion request."""
+    if request_data.get("stream", False):
+        result = handle_openai_completion_stream(request_data)
+        if isinstance(result, dict):
+            return jsonify(result)
+        return sse_response(result)
+    return jsonify(observed("openai", handle_openai_completion, request_data))
+
+# Addresses of clients on this machine; without an explicit ID they all look alike
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1", "localhost")
+
+def _client_id(request_data: Dict[str, Any]) -> Optional[str]:
+    """Identify the client for per-client limits.
+    
+    Uses the X-Client-Id header (the extension sends its VS Code session ID)
+    or a client_id field, falling back to the remote address. Returns None
+    for unidentified local or unknown clients, which are exempt from the
+    per-client cap since they cannot be told apart.
+    """
+    client_id = request.headers.get("X-Client-Id") or str(request_data.get("client_id") or "")
+    if client_id:
+        return client_id
+    if not request.remote_addr or request.remote_addr in LOOPBACK_ADDRESSES:
+        return None
+    return request.remote_addr
+
+def _cancellable(view) -> Response:
+    """Run a view, answering 499 (client closed request) if its client disconnected."""
+    try:
+        return view()
+    except RequestCancelled as e:
+        logger.info("Request cancelled: %s", e)
+        return Response(status=499)
+
+def admitted(request_type: str, request_data: Dict[str, Any], view, openai: bool = False) -> Response:
+    """Run an LLM-bound view under admission control.
+    
+    The admission slot is held until the response is closed, so streamed
+    responses keep it for the whole generation.
+    
+    Args:
+        request_type: Request type used for the priority
+        request_data: Parsed request body
+        view: Callable returning the Flask response
+        openai: Format a rejection as an OpenAI-style error
+    """
+    if admission is None:
+        return _cancellable(view)
+    
+    try:
+        ticket = admission.admit(request_type, _client_id(request_data))
+    except AdmissionRejected as e:
+        if openai:
+            error_type = "rate_limit_error" if e.status == 429 else "server_overloaded"
+            response = jsonify({"error": {"message": str(e), "type": error_type}})
+        else:
+            response = jsonify({"status": "error", "message": str(e)})
+        response.status_code = e.status
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    
+    try:
+        response = _cancellable(view)
+    except BaseException:
+        ticket.release()
+        raise
+    response.call_on_close(ticket.release)
+    return response
+
+def inline_response(request_data: Dict[str, Any]) -> Response:
+    """Debounce an inline completion request, then run it under admission control.
+    
+    Debouncing comes first so requests that a newer keystroke replaces
+    never take an admission slot.
+    """
+    key = str(request_data.get("session_id") or _client_id(request_data) or request.remote_addr or "unknown")
+    ticket = inline_debouncer.begin(key)
+    if not inline_debouncer.wait(key, ticket):
+        requests_counter.inc(type="inline_completion", status="superseded")
+        return jsonify({"status": "superseded", "completion": ""})
+    return admitted(
+        "inline_completion", request_data,
+        lambda: jsonify(observed(
+            "inline_completion", handle_inline_completion, request_data,
+            lambda: inline_debouncer.superseded(key, ticket)
+        ))
+    )
+
+def agent_response(request_data: Dict[str, Any], response_data: Dict[str, Any]) -> Response:
+    """Return a JSON or streamed response for an /api/agent request."""
+    if request_data.get("stream") and response_data.get("status") == "success":
+        for key in STREAMABLE_RESULT_KEYS:
+            if key in response_data and not isinstance(response_data[key], str):
+                return sse_response(stream_openai_chunks(response_data[key]))
+    return jsonify(response_data)
+
 def create_app():
     """Create the Flask app instance."""
     app = Flask(__name__)
 
+    # Tag everything logged while handling a request with its ID
+    @app.before_request
+    def set_request_id():
+        g.request_id_token = request_id_var.set(request.headers.get("X-Request-Id") or new_request_id())
+
+    @app.teardown_request
+    def reset_request_id(exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            try:
+                request_id_var.reset(token)
+            except ValueError:
+                # Torn down in another context (e.g. under an ASGI adapter)
+                request_id_var.set("-")
+
+    # Trace each request, continuing the extension's trace if it sent a traceparent
+    @app.before_request
+    def start_request_span():
+        route = request.url_rule.rule if request.url_rule else request.path
+        g.request_span = span(
+            f"{request.method} {route}", kind="server",
+            parent=parse_traceparent(request.headers.get(TRACEPARENT_HEADER)),
+            **{"http.request.method": request.method, "http.route": route, "request.id": request_id_var.get()}
+        ).__enter__()
+
+    @app.teardown_request
+    def end_request_span(exc):
+        request_span = g.pop("request_span", None)
+        if request_span is not None:
+            request_span.__exit__(type(exc) if exc else None, exc, None)
+
     # Configure CORS headers for all routes
     @app.after_request
     def after_request(response):
         response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Request-Id,X-Client-Id,traceparent')
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        response.headers["X-Request-Id"] = request_id_var.get()
+        current_span().set_attribute("http.response.status_code", response.status_code)
         return response
 
     # Handle preflight OPTIONS requests for CORS
@@ -273,8 +758,10 @@ def create_app():
         """Handle general API requests from VS Code extension."""
         try:
             request_data = parse_vscode_request(request.data.decode('utf-8'))
-            response_data = handle_vscode_request(request_data)
-            return jsonify(response_data)
+            return admitted(
+                request_data.get("type", ""), request_data,
+                lambda: agent_response(request_data, handle_vscode_request(request_data))
+            )
         except Exception as e:
             return jsonify({
                 "status": "error",
@@ -290,8 +777,36 @@ def create_app():
             # Ensure the type is set to general_query for backward compatibility
             if "type" not in request_data:
                 request_data["type"] = "general_query"
-            response_data = handle_vscode_request(request_data)
-            return jsonify(response_data)
+            return admitted(
+                request_data["type"], request_data,
+                lambda: agent_response(request_data, handle_vscode_request(request_data))
+            )
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"An error occurred: {str(e)}"
+            })
+
+    # As-you-type fill-in-the-middle completion endpoint
+    @app.route("/api/agent/infill", methods=["POST"])
+    def api_infill_request():
+        """Handle inline completion requests from VS Code extension."""
+        try:
+            request_data = parse_vscode_request(request.data.decode('utf-8'))
+            return inline_response(request_data)
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"An error occurred: {str(e)}"
+            })
+
+    # Bulk memory ingestion endpoint
+    @app.route("/api/memory/bulk", methods=["POST"])
+    def api_memory_bulk():
+        """Add many memories in one request."""
+        try:
+            request_data = parse_vscode_request(request.data.decode('utf-8'))
+            return jsonify(handle_memory_bulk(request_data))
         except Exception as e:
             return jsonify({
                 "status": "error",
@@ -323,8 +838,7 @@ def create_app():
         """Handle OpenAI-style completion requests."""
         try:
             request_data = request.json
-            response_data = handle_openai_completion(request_data)
-            return jsonify(response_data)
+            return admitted("openai", request_data, lambda: openai_response(request_data), openai=True)
         except Exception as e:
             return jsonify({
                 "error": {
@@ -339,8 +853,7 @@ def create_app():
         """Handle OpenAI-style chat completion requests."""
         try:
             request_data = request.json
-            response_data = handle_openai_completion(request_data)
-            return jsonify(response_data)
+            return admitted("openai", request_data, lambda: openai_response(request_data), openai=True)
         except Exception as e:
             return jsonify({
                 "error": {
@@ -384,6 +897,25 @@ def create_app():
             ]
         })
 
+    # Prometheus metrics
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Expose request, stage latency, token and cache metrics for Prometheus."""
+        return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    # Liveness: answers as soon as the port is bound
+    @app.route("/health", methods=["GET"])
+    def health():
+        """Report that the server is up, whether or not startup has finished."""
+        return jsonify({"status": "ok", "ready": readiness.ready})
+
+    # Readiness: 503 until the startup components have initialized
+    @app.route("/ready", methods=["GET"])
+    def ready():
+        """Report the state of each startup component."""
+        status = readiness.status()
+        return jsonify(status), 200 if status["ready"] else 503
+
     @app.route('/', methods=['GET'])
     def index():
         """Root endpoint."""
@@ -393,6 +925,9 @@ def create_app():
             "status": "running"
         })
 
+    # Runs the components inline in "eager" mode, so the port is bound only once they are done
+    readiness.start(startup_components())
+
     return app
 
 def main():
@@ -402,6 +937,10 @@ def main():
     parser.add_argument('--port', type=int, default=None, help='Port to bind to')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
     parser.add_argument('--production', action='store_true', help='Run in production mode')
+    parser.add_argument('--server', type=str, choices=SERVER_TYPES, default=None,
+                        help='Server to run under (defaults to backend.server.type in config.yml)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (uvicorn)')
+    parser.add_argument('--threads', type=int, default=None, help='Worker threads per process (waitress)')
     
     args = parser.parse_args()
     
@@ -412,10 +951,36 @@ def main():
     # Save the port information to central location and for VS Code extension
     save_port_info(backend_port=args.port)
     
-    print(f"Starting VS Code integration server on http://{args.host}:{args.port}")
+    logger.info("Starting VS Code integration server on http://%s:%s", args.host, args.port)
+    
+    # The development server is only used for debugging (reloader/debugger)
+    if args.debug and not args.production:
+        create_app().run(host=args.host, port=args.port, debug=True)
+        return
     
-    app = create_app()
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    server_config = get_server_config()
+    if args.workers is not None:
+        server_config['workers'] = args.workers
+    if args.threads is not None:
+        server_config['threads'] = args.threads
+    server_type = args.server or server_config.get('type', 'waitress')
+    
+    if server_type == "uvicorn":
+        # uvicorn builds the app itself (serving.create_asgi_app, once per
+        # worker process). With one worker that happens in this process, so
+        # let it import this module instead of a second copy with its own agent.
+        sys.modules.setdefault("vscode_integration", sys.modules[__name__])
+        app = None
+    else:
+        app = create_app()
+    
+    try:
+        serve(app, args.host, args.port, server_config, server_type=server_type)
+    finally:
+        # Flush queued memories before the shared Weaviate connection closes
+        if agent.memory_writer is not None:
+            agent.memory_writer.close()
+        close_weaviate_connections()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,239 @@
+import atexit
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from metrics import counter, gauge
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+reconnect_counter = counter("weaviate_reconnects_total", "Weaviate reconnect attempts by result", ("result",))
+connected_gauge = gauge("weaviate_connected", "Whether the shared Weaviate connection is healthy")
+
+
+class WeaviateConnection:
+    """Process-wide Weaviate client shared by every agent and script.
+
+    All users borrow the same ``weaviate.WeaviateClient`` (one HTTP pool and
+    one gRPC channel). The connection is health-checked at most every
+    ``health_check_interval`` seconds and after any failed operation; an
+    unhealthy connection is closed and reopened with exponential backoff, so
+    a Weaviate restart is picked up without restarting the backend. One
+    caller runs the reconnect, outside the lock; others get ConnectionError
+    right away instead of queueing behind its retries.
+
+    Use ``get_weaviate_connection`` rather than creating instances directly.
+    """
+
+    def __init__(self, host: str, port: int, grpc_port: int, health_check_interval: float = 30,
+                 reconnect_attempts: int = 5, backoff_initial: float = 0.5, backoff_max: float = 10):
+        """Create the connection manager. The client is opened on first use.
+
+        Args:
+            host: Weaviate host
+            port: Weaviate HTTP port
+            grpc_port: Weaviate gRPC port
+            health_check_interval: Seconds between readiness checks
+            reconnect_attempts: Attempts per reconnect before giving up
+            backoff_initial: First delay between reconnect attempts in seconds
+            backoff_max: Maximum delay between reconnect attempts in seconds
+        """
+        self.host = host
+        self.port = int(port)
+        self.grpc_port = int(grpc_port)
+        self.health_check_interval = float(health_check_interval)
+        self.reconnect_attempts = max(1, int(reconnect_attempts))
+        self.backoff_initial = float(backoff_initial)
+        self.backoff_max = float(backoff_max)
+
+        self._client = None
+        self._healthy = False
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._closed = False
+        self._reconnecting = False
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _connect(self):
+        import weaviate
+
+        logger.info("Connecting to Weaviate at %s:%s (gRPC: %s)", self.host, self.port, self.grpc_port)
+        client = weaviate.WeaviateClient(
+            connection_params=weaviate.connect.ConnectionParams.from_url(
+                url=self.url,
+                grpc_port=self.grpc_port
+            )
+        )
+        client.connect()
+        return client
+
+    def _discard_client(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+        self._client = None
+        self._healthy = False
+        connected_gauge.set(0)
+
+    def _check_open(self):
+        if self._closed:
+            raise ConnectionError("Weaviate connection has been closed")
+
+    def _reconnect(self, stale):
+        """Replace the ``stale`` client, retrying with backoff.
+
+        Only the lock's bookkeeping is done under it; connecting and the
+        backoff sleeps are not, so other callers are never held up.
+
+        Raises:
+            ConnectionError: If another caller is already reconnecting, or
+                every attempt failed
+        """
+        with self._lock:
+            self._check_open()
+            if self._client is not None and self._healthy and self._client is not stale:
+                # Another caller reconnected in the meantime
+                return self._client
+            if self._reconnecting:
+                raise ConnectionError(f"Weaviate at {self.url} is unavailable, reconnect in progress")
+            self._reconnecting = True
+            self._discard_client()
+
+        try:
+            delay = self.backoff_initial
+            last_error = None
+            for attempt in range(1, self.reconnect_attempts + 1):
+                try:
+                    client = self._connect()
+                except Exception as e:
+                    last_error = e
+                    reconnect_counter.inc(result="error")
+                    if attempt < self.reconnect_attempts:
+                        logger.warning("Weaviate connection attempt %d failed: %s; retrying in %.1fs", attempt, e, delay)
+                        time.sleep(delay * random.uniform(0.8, 1.2))
+                        delay = min(delay * 2, self.backoff_max)
+                    continue
+                with self._lock:
+                    if self._closed:
+                        client.close()
+                        self._check_open()
+                    self._client = client
+                    self._healthy = True
+                    self._last_check = time.monotonic()
+                connected_gauge.set(1)
+                reconnect_counter.inc(result="ok")
+                return client
+            raise ConnectionError(f"Could not connect to Weaviate at {self.url}: {last_error}")
+        finally:
+            with self._lock:
+                self._reconnecting = False
+
+    @staticmethod
+    def _is_ready(client) -> bool:
+        try:
+            return bool(client.is_ready())
+        except Exception:
+            return False
+
+    @property
+    def client(self):
+        """The shared client, connected and health-checked."""
+        with self._lock:
+            self._check_open()
+            client = self._client
+            usable = client is not None and self._healthy
+            check_due = usable and time.monotonic() - self._last_check >= self.health_check_interval
+            if check_due:
+                # This caller runs the check; others keep using the client meanwhile
+                self._last_check = time.monotonic()
+
+        if usable and not check_due:
+            return client
+        if usable:
+            if self._is_ready(client):
+                return client
+            logger.warning("Weaviate health check failed, reconnecting")
+        return self._reconnect(client)
+
+    def collection(self, name: str = "AgentMemory"):
+        """Get a collection handle on the shared client."""
+        return self.client.collections.get(name)
+
+    def mark_unhealthy(self):
+        """Force a health check before the connection is next used."""
+        with self._lock:
+            self._last_check = 0.0
+
+    def run(self, operation, collection_name: str = "AgentMemory"):
+        """Run ``operation(collection)``, reconnecting and retrying once if it fails.
+
+        The retry only happens when the connection is found to be unhealthy,
+        so errors Weaviate returns for the request itself are raised as-is.
+        """
+        try:
+            return operation(self.collection(collection_name))
+        except ConnectionError:
+            raise
+        except Exception:
+            client = self._client
+            if client is not None and self._is_ready(client):
+                raise
+            with self._lock:
+                if self._client is client:
+                    self._healthy = False
+            return operation(self.collection(collection_name))
+
+    def close(self):
+        """Close the client. Later use raises ConnectionError."""
+        with self._lock:
+            self._closed = True
+            self._discard_client()
+
+
+_connections: Dict[Tuple[str, int, int], WeaviateConnection] = {}
+_connections_lock = threading.Lock()
+
+
+def get_weaviate_connection(host: Optional[str] = None, port: Optional[int] = None,
+                            grpc_port: Optional[int] = None) -> WeaviateConnection:
+    """Get the process-wide connection for a Weaviate address.
+
+    Unset arguments come from get_weaviate_config(); reconnect settings come
+    from weaviate.connection in config.yml.
+    """
+    from port_utils import get_weaviate_config
+
+    config = get_weaviate_config()
+    key = (host or config["host"], int(port or config["port"]), int(grpc_port or config["grpc_port"]))
+    with _connections_lock:
+        connection = _connections.get(key)
+        if connection is None or connection._closed:
+            connection = WeaviateConnection(*key, **config.get("connection", {}))
+            _connections[key] = connection
+        return connection
+
+
+@contextmanager
+def weaviate_client(host: Optional[str] = None, port: Optional[int] = None, grpc_port: Optional[int] = None):
+    """Borrow the shared client for a block, for scripts and one-off tasks."""
+    yield get_weaviate_connection(host, port, grpc_port).client
+
+
+def close_weaviate_connections():
+    """Close every shared Weaviate connection. Registered with atexit."""
+    with _connections_lock:
+        connections = list(_connections.values())
+        _connections.clear()
+    for connection in connections:
+        connection.close()
+
+
+atexit.register(close_weaviate_connections)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmarks for embedding, memory retrieval and context formatting.
+
+Measures, each in isolation:
+- embedding: model encode throughput at batch sizes 1 to 256, and
+  Agent._generate_embedding on a cache miss and a cache hit
+- retrieval: Agent.search_memory latency against synthetic corpora (1K,
+  100K and 1M memories by default) in the local memory store, per search
+  mode and filter combination
+- context: VSCodeAgent._format_memories_as_context (the ContextAssembler)
+  cost versus the number and length of memories
+
+Corpora are generated from --seed and kept in --corpus-dir, so later runs
+reuse them instead of rebuilding. Results go to a JSON baseline with
+sorted keys, one file per commit, so two baselines can be diffed directly
+or checked with --compare.
+
+Usage:
+    python benchmarks/micro.py --sizes 1000,100000
+    python benchmarks/micro.py --only context,embedding --compare benchmarks/results/micro-baseline.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from report import ROOT_DIR, environment, latency_summary, write_report
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+REPORT_VERSION = 1
+
+VOCABULARY = (
+    "parser cache scheduler client database tokenizer config retry timeout socket buffer thread lock queue "
+    "index vector memory request response session stream batch worker handler router endpoint schema "
+    "migration deploy build test coverage profile latency throughput error exception logging metric trace"
+).split()
+
+FILTERS = {
+    "none": None,
+    "status": {"status": "active"},
+    "priority": {"priority": 3},
+    "status+priority": {"status": "active", "priority": 3},
+    "context_id": {"context_id": "ctx-7"},
+}
+
+STATUSES = ("active", "completed", "pending", "archived")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float = 0.0) -> List[float]:
+    """Time fn at least repeat times, and for at least min_time seconds."""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def bench_embedding(args, rng: random.Random) -> Dict[str, Any]:
+    from agent_roles import Agent
+    from embeddings import get_embedding_model
+
+    agent = Agent("micro-bench", "benchmark")
+    model = get_embedding_model(agent.model_name)
+    model.encode(["warm up"])
+
+    results: Dict[str, Any] = {"model": agent.model_name, "encode": {}, "generate_embedding": {}}
+    for batch_size in args.batch_sizes:
+        texts = [_sentence(rng, 24) for _ in range(batch_size)]
+        timings = measure(lambda: model.encode(texts), args.repeat, args.min_time)
+        results["encode"][f"batch_{batch_size}"] = dict(
+            latency_summary(timings),
+            batch_size=batch_size,
+            texts_per_second=round(batch_size * len(timings) / sum(timings), 1),
+        )
+        print(f"encode batch {batch_size:>4}: {results['encode'][f'batch_{batch_size}']['texts_per_second']:>9.1f} texts/s")
+
+    # Unique texts miss the embedding cache every time; a repeated text always hits
+    miss_texts = iter([f"{i} {_sentence(rng, 24)}" for i in range(args.repeat * 4 + 1000)])
+    results["generate_embedding"]["miss"] = latency_summary(
+        measure(lambda: agent._generate_embedding(next(miss_texts)), args.repeat)
+    )
+    hit_text = _sentence(rng, 24)
+    agent._generate_embedding(hit_text)
+    results["generate_embedding"]["hit"] = latency_summary(
+        measure(lambda: agent._generate_embedding(hit_text), args.repeat)
+    )
+    print(f"_generate_embedding: miss p50 {results['generate_embedding']['miss']['p50_ms']} ms, "
+          f"hit p50 {results['generate_embedding']['hit']['p50_ms']} ms")
+    return results
+
+
+def build_corpus(path: str, size: int, dim: int, seed: int):
+    """Fill a local memory store at path with size synthetic memories.
+
+    Vectors are random unit vectors rather than model embeddings, so a 1M
+    corpus builds in minutes. Texts, tags, priorities, statuses and context
+    IDs are varied so keyword search and every filter select a subset.
+    """
+    import numpy as np
+    from agent_roles import Agent
+
+    os.environ["VSCODE_AGENT_MEMORY_PATH"] = path
+    builder = Agent("micro-bench-corpus", "benchmark")
+    existing = len(builder.store)
+    if existing >= size:
+        return
+    if existing:
+        raise RuntimeError(f"Corpus at {path} has {existing} memories, expected {size}; delete it to rebuild")
+
+    rng = random.Random(seed)
+    vectors = np.random.default_rng(seed)
+    chunk = 10000
+    started = time.perf_counter()
+    for start in range(0, size, chunk):
+        count = min(chunk, size - start)
+        batch = vectors.standard_normal((count, dim), dtype=np.float32)
+        objects = []
+        for offset in range(count):
+            properties = builder._build_properties(
+                _sentence(rng, rng.randint(8, 40)),
+                tag=[rng.choice(VOCABULARY)],
+                priority=rng.randint(1, 5),
+                status=rng.choice(STATUSES),
+                context_id=f"ctx-{rng.randrange(100)}",
+            )
+            objects.append((None, properties, batch[offset]))
+        builder.store.insert_many(objects)
+        print(f"  built {start + count}/{size} memories ({time.perf_counter() - started:.0f} s)", end="\r")
+    print()
+
+
+def bench_search(args, rng: random.Random) -> Dict[str, Any]:
+    from agent_roles import Agent
+    from embeddings import encode_cached, DEFAULT_EMBEDDING_MODEL
+
+    dim = int(len(encode_cached("dimension probe", DEFAULT_EMBEDDING_MODEL)))
+    os.environ["VSCODE_AGENT_MEMORY_BACKEND"] = "local"
+    queries = [_sentence(rng, 6) for _ in range(20)]
+
+    results: Dict[str, Any] = {}
+    for size in args.sizes:
+        path = os.path.join(args.corpus_dir, f"corpus-{size}-d{dim}-s{args.seed}")
+        print(f"Corpus of {size} memories at {path}")
+        build_corpus(path, size, dim, args.seed)
+
+        os.environ["VSCODE_AGENT_MEMORY_PATH"] = path
+        agent = Agent("micro-bench", "benchmark")
+        for query in queries:
+            # Embeddings are cached after this, so timings below are the search itself
+            agent._generate_embedding(query)
+
+        results[str(size)] = {}
+        for mode in ("vector", "hybrid"):
+            for filter_name, filter_obj in FILTERS.items():
+                position = iter(range(10 ** 9))
+                timings = measure(
+                    lambda: agent.search_memory(queries[next(position) % len(queries)], limit=args.limit,
+                                                filter_obj=filter_obj, mode=mode, rerank=False),
+                    args.repeat
+                )
+                key = f"{mode}/{filter_name}"
+                results[str(size)][key] = latency_summary(timings)
+                print(f"  search {key:<24} p50 {results[str(size)][key]['p50_ms']:>9.3f} ms  "
+                      f"p95 {results[str(size)][key]['p95_ms']:>9.3f} ms")
+    return results
+
+
+def bench_context(args, rng: random.Random) -> Dict[str, Any]:
+    from context_assembler import ContextAssembler, TokenCounter
+    from port_utils import get_memory_config
+
+    # Built like VSCodeAgent's, whose _format_memories_as_context delegates to it
+    context_config = get_memory_config()["context"]
+    assembler = ContextAssembler(
+        TokenCounter(chars_per_token=context_config["chars_per_token"]),
+        budget_tokens=context_config["budget_tokens"],
+        max_memory_tokens=context_config["max_memory_tokens"],
+        min_memory_tokens=context_config["min_memory_tokens"],
+        dedupe_threshold=context_config["dedupe_threshold"]
+    )
+
+    results: Dict[str, Any] = {}
+    for count in args.memory_counts:
+        for length in args.memory_lengths:
+            memories = [
+                {
+                    "text": f"User: {_sentence(rng, max(1, length // 14))}\nAgent: {_sentence(rng, max(1, length // 7))}",
+                    "timestamp": "2025-01-01T12:00:00Z",
+                    "priority": rng.randint(1, 5),
+                    "tag": [rng.choice(VOCABULARY)],
+                    "score": 1.0 - i / count,
+                }
+                for i in range(count)
+            ]
+            output = assembler.assemble(memories)
+            key = f"count_{count}/chars_{length}"
+            results[key] = dict(latency_summary(measure(lambda: assembler.assemble(memories), args.repeat)),
+                                output_chars=len(output))
+            print(f"context {key:<22} p50 {results[key]['p50_ms']:>8.3f} ms  ({len(output)} chars)")
+    return results
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Measurements whose p50 grew by more than threshold against baseline."""
+    regressions = []
+
+    def walk(current: Any, previous: Any, path: str):
+        if not isinstance(current, dict) or not isinstance(previous, dict):
+            return
+        if "p50_ms" in current and previous.get("p50_ms"):
+            if current["p50_ms"] is not None and current["p50_ms"] > previous["p50_ms"] * (1 + threshold):
+                regressions.append(f"{path}: p50 {previous['p50_ms']:.3f} ms -> {current['p50_ms']:.3f} ms")
+            return
+        for key, value in current.items():
+            walk(value, previous.get(key), f"{path}/{key}" if path else key)
+
+    walk(report.get("results"), baseline.get("results"), "")
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for embedding, retrieval and context formatting")
+    parser.add_argument("--only", default="embedding,search,context", help="Comma-separated benchmark groups")
+    parser.add_argument("--sizes", type=_int_list, default=[1000, 100000, 1000000], help="Corpus sizes")
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 2, 4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument("--memory-counts", type=_int_list, default=[1, 5, 20, 50, 100])
+    parser.add_argument("--memory-lengths", type=_int_list, default=[100, 1000, 5000], help="Characters per memory")
+    parser.add_argument("--limit", type=int, default=5, help="Results per search")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per measurement")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Minimum seconds per encode measurement")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "ai-dev-team", "bench-corpora"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Baseline path (default benchmarks/results/micro-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier baseline to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative p50 regression")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    benchmarks = {"embedding": bench_embedding, "search": bench_search, "context": bench_context}
+    unknown = [group for group in groups if group not in benchmarks]
+    if unknown:
+        print(f"Unknown benchmark groups: {', '.join(unknown)} (available: {', '.join(benchmarks)})")
+        return 2
+
+    # Keep benchmark memories out of the developer's store
+    os.environ["VSCODE_AGENT_MEMORY_BACKEND"] = "local"
+    os.environ["VSCODE_AGENT_MEMORY_PATH"] = tempfile.mkdtemp(prefix="micro-bench-")
+    os.environ.setdefault("VSCODE_AGENT_LOG_LEVEL", "WARNING")
+
+    report = {
+        "benchmark": "micro",
+        "version": REPORT_VERSION,
+        "environment": environment(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "corpus_dir")},
+        "results": {},
+    }
+    for group in groups:
+        # Each group gets its own RNG so running a subset produces the same inputs
+        report["results"][group] = benchmarks[group](args, random.Random(f"{args.seed}:{group}"))
+
+    output = write_report(report, args.output, "micro")
+    print(f"Baseline written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
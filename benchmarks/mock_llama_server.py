@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+"""
+Mock llama.cpp server for benchmarks.
+
+Speaks the parts of llama-server's API the backend uses (OpenAI-compatible
+/v1/chat/completions and /v1/models, native /completion, /infill and
+/tokenize, /health) and generates tokens at a fixed rate after a fixed time
+to first token, so benchmark results depend on the backend and not on a
+model.
+
+Usage:
+    python benchmarks/mock_llama_server.py --port 8099 --ttft-ms 50 --tokens-per-second 200
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+# Words the mock "generates"; code-like so responses look like completions
+WORDS = ("def", "value", "=", "return", "self", "result", "if", "None", ":", "for", "item", "in", "data", "\n")
+
+
+class MockLlamaServer:
+    """A llama.cpp stand-in with a configurable token rate and time to first token."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ttft_ms: float = 50,
+                 tokens_per_second: float = 200, completion_tokens: int = 64,
+                 jitter: float = 0.0, seed: int = 0):
+        """Create a server (call start() to serve).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            ttft_ms: Milliseconds before the first token
+            tokens_per_second: Generation rate after the first token
+            completion_tokens: Tokens generated when the request sets no max_tokens/n_predict
+            jitter: Relative random variation of ttft and the token interval (0.1 = +-10%)
+            seed: Seed for the jitter, so runs are repeatable
+        """
+        self.ttft = max(0.0, float(ttft_ms)) / 1000
+        self.token_interval = 1.0 / float(tokens_per_second) if tokens_per_second > 0 else 0.0
+        self.completion_tokens = int(completion_tokens)
+        self.jitter = max(0.0, float(jitter))
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        mock = self
+
+        class Handler(_MockHandler):
+            server_mock = mock
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """OpenAI-compatible API base URL (what VSCODE_AGENT_LLM_URL expects)."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLlamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _vary(self, seconds: float) -> float:
+        if not self.jitter or not seconds:
+            return seconds
+        with self._random_lock:
+            return max(0.0, seconds * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def generate(self, n_tokens: int) -> Iterator[str]:
+        """Yield n_tokens pieces of text, paced like a real server."""
+        time.sleep(self._vary(self.ttft))
+        for i in range(n_tokens):
+            if i:
+                time.sleep(self._vary(self.token_interval))
+            yield WORDS[i % len(WORDS)] + ("" if WORDS[i % len(WORDS)] == "\n" else " ")
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _chat_prompt_tokens(body: Dict[str, Any]) -> int:
+    return _estimate_tokens("".join(str(m.get("content") or "") for m in body.get("messages") or []))
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_mock: MockLlamaServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_events(self):
+        # No Content-Length: the stream ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, payload: Any):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path in ("/health", "/v1/health"):
+            self._send_json({"status": "ok"})
+        elif self.path == "/v1/models":
+            self._send_json({"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json({"error": {"message": "Not found", "code": 404}}, 404)
+
+    def do_POST(self):
+        try:
+            body = self._read_body()
+        except json.JSONDecodeError:
+            self._send_json({"error": {"message": "Invalid JSON", "code": 400}}, 400)
+            return
+
+        try:
+            if self.path == "/v1/chat/completions":
+                self._chat(body)
+            elif self.path in ("/completion", "/infill"):
+                self._native(body)
+            elif self.path == "/tokenize":
+                self._send_json({"tokens": list(range(_estimate_tokens(str(body.get("content", "")))))})
+            else:
+                self._send_json({"error": {"message": "Not found", "code": 404}}, 404)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled; llama.cpp would stop generating here too
+            self.close_connection = True
+
+    def _chat(self, body: Dict[str, Any]):
+        n_tokens = int(body.get("max_tokens") or self.server_mock.completion_tokens)
+        usage = {"prompt_tokens": _chat_prompt_tokens(body), "completion_tokens": n_tokens}
+        usage["total_tokens"] = usage["prompt_tokens"] + n_tokens
+        created = int(time.time())
+
+        if not body.get("stream"):
+            content = "".join(self.server_mock.generate(n_tokens))
+            self._send_json({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": created,
+                "model": "mock",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "length"}],
+                "usage": usage
+            })
+            return
+
+        self._start_events()
+        for piece in self.server_mock.generate(n_tokens):
+            self._send_event({
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": "mock",
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+            })
+        self._send_event({
+            "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": "mock",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "length"}]
+        })
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": "mock",
+                "choices": [], "usage": usage
+            })
+        self._send_event("[DONE]")
+
+    def _native(self, body: Dict[str, Any]):
+        n_tokens = int(body.get("n_predict") or self.server_mock.completion_tokens)
+        prompt = str(body.get("prompt") or "") + str(body.get("input_prefix") or "") + str(body.get("input_suffix") or "")
+        counts = {"tokens_evaluated": _estimate_tokens(prompt), "tokens_predicted": n_tokens}
+
+        if not body.get("stream"):
+            self._send_json(dict(counts, content="".join(self.server_mock.generate(n_tokens)), stop=True))
+            return
+
+        self._start_events()
+        for piece in self.server_mock.generate(n_tokens):
+            self._send_event({"content": piece, "stop": False})
+        self._send_event(dict(counts, content="", stop=True))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mock llama.cpp server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--ttft-ms", type=float, default=50, help="Time to first token in milliseconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Generation rate")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Tokens generated without max_tokens")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative random variation of the timings")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = MockLlamaServer(args.host, args.port, args.ttft_ms, args.tokens_per_second,
+                             args.completion_tokens, args.jitter, args.seed)
+    print(f"Mock llama.cpp server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+
+"""
+End-to-end benchmark of the backend request pipeline.
+
+Drives the Flask app from create_app() in-process, against a mock llama.cpp
+server (fixed token rate and time to first token) and a local memory store
+in a temporary directory, seeded with synthetic memories in place of
+Weaviate. Each scenario (every request type handled by
+handle_vscode_request, streamed and not, and the /v1 routes) runs under
+closed-loop load (a fixed number of clients sending back-to-back) and
+open-loop load (Poisson arrivals at a fixed rate). The report gives
+throughput, latency percentiles and a per-stage breakdown taken from the
+backend's histograms, as JSON.
+
+Prompts, arrivals and memories are generated from --seed, so runs on
+different commits with the same settings are comparable. Pass --compare
+with an earlier report to fail on regressions.
+
+Usage:
+    python benchmarks/pipeline.py --duration 10 --concurrency 4 --rate 2
+    python benchmarks/pipeline.py --compare benchmarks/results/baseline.json --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from report import ROOT_DIR, environment, latency_summary, ms, write_report
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+from mock_llama_server import MockLlamaServer
+
+REPORT_VERSION = 1
+
+FILE_TYPES = ("python", "typescript", "go", "rust", "java")
+TOPICS = ("parser", "cache", "scheduler", "http client", "database layer", "tokenizer", "config loader", "retry policy")
+ACTIONS = ("add error handling", "make it thread-safe", "add type hints", "reduce allocations", "add logging")
+
+
+def _code(rng: random.Random, i: int) -> str:
+    """A small synthetic source file; i makes it unique."""
+    name = f"{rng.choice(TOPICS).replace(' ', '_')}_{i}"
+    lines = [f"def {name}(items, limit={rng.randint(1, 100)}):", "    result = []"]
+    for j in range(rng.randint(4, 24)):
+        lines.append(f"    value_{j} = items[{j}] * {rng.randint(2, 9)} if len(items) > {j} else None")
+        lines.append(f"    result.append(value_{j})")
+    lines.append("    return result[:limit]")
+    return "\n".join(lines)
+
+
+# Scenario name -> (path, streamed, payload factory)
+def _scenarios(max_tokens: int) -> Dict[str, Any]:
+    def agent(request_type: str, stream: bool = False) -> Callable[[random.Random, int], Dict[str, Any]]:
+        def payload(rng: random.Random, i: int) -> Dict[str, Any]:
+            data = {"type": request_type, "max_tokens": max_tokens, "session_id": f"bench-{i % 8}"}
+            if request_type == "code_completion":
+                data.update(code_context=_code(rng, i), file_type=rng.choice(FILE_TYPES),
+                            request=f"Complete the function and {rng.choice(ACTIONS)}")
+            elif request_type in ("code_explanation", "code_improvement"):
+                data.update(code=_code(rng, i), file_type=rng.choice(FILE_TYPES))
+            else:
+                data.update(query=f"How should request {i} configure the {rng.choice(TOPICS)}?")
+            if stream:
+                data["stream"] = True
+            return data
+        return payload
+
+    def chat(stream: bool) -> Callable[[random.Random, int], Dict[str, Any]]:
+        def payload(rng: random.Random, i: int) -> Dict[str, Any]:
+            return {
+                "model": "default",
+                "messages": [
+                    {"role": "system", "content": "You are a helpful coding assistant."},
+                    {"role": "user", "content": f"Review this code ({i}):\n{_code(rng, i)}"}
+                ],
+                "max_tokens": max_tokens,
+                "stream": stream
+            }
+        return payload
+
+    def completion(rng: random.Random, i: int) -> Dict[str, Any]:
+        return {"model": "default", "prompt": f"# Request {i}\n{_code(rng, i)}\n", "max_tokens": max_tokens}
+
+    return {
+        "code_completion": ("/api/agent", False, agent("code_completion")),
+        "code_explanation": ("/api/agent", False, agent("code_explanation")),
+        "code_improvement": ("/api/agent", False, agent("code_improvement")),
+        "general_query": ("/api/agent", False, agent("general_query")),
+        "general_query_stream": ("/api/agent", True, agent("general_query", stream=True)),
+        "v1_chat_completions": ("/v1/chat/completions", False, chat(False)),
+        "v1_chat_completions_stream": ("/v1/chat/completions", True, chat(True)),
+        "v1_completions": ("/v1/completions", False, completion),
+    }
+
+
+class Runner:
+    """Sends scenario requests to the app and records one result per request."""
+
+    def __init__(self, app, path: str, streamed: bool, payload: Callable[[random.Random, int], Dict[str, Any]],
+                 seed: int):
+        self.app = app
+        self.path = path
+        self.streamed = streamed
+        self.payload = payload
+        self.seed = seed
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _next_payload(self) -> Dict[str, Any]:
+        with self._lock:
+            i = self._counter
+            self._counter += 1
+        # One RNG per request keeps payloads independent of thread scheduling
+        return self.payload(random.Random(self.seed * 1_000_003 + i), i)
+
+    def send(self, client, client_id: str, started: Optional[float] = None) -> Dict[str, Any]:
+        """Send one request. Latency counts from started (the scheduled time in open loop)."""
+        data = self._next_payload()
+        started = time.perf_counter() if started is None else started
+        first_byte = None
+        response = client.post(self.path, json=data, headers={"X-Client-Id": client_id}, buffered=not self.streamed)
+        try:
+            body = b""
+            for chunk in response.iter_encoded():
+                if first_byte is None and chunk:
+                    first_byte = time.perf_counter()
+                body += chunk
+        finally:
+            response.close()
+        finished = time.perf_counter()
+        return {
+            "latency": finished - started,
+            "ttfb": (first_byte or finished) - started,
+            "status": response.status_code,
+            "ok": response.status_code == 200 and not _is_error(body, self.streamed),
+        }
+
+
+def _is_error(body: bytes, streamed: bool) -> bool:
+    if streamed:
+        return b'"error"' in body[:512]
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        return True
+    return bool(data.get("error")) or data.get("status") == "error"
+
+
+def run_closed_loop(runner: Runner, concurrency: int, duration: float) -> List[Dict[str, Any]]:
+    """concurrency clients, each sending its next request as soon as the last returns."""
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client_loop(n: int):
+        client = runner.app.test_client()
+        while time.perf_counter() < deadline:
+            result = runner.send(client, f"bench-client-{n}")
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_open_loop(runner: Runner, rate: float, duration: float, max_in_flight: int, seed: int) -> List[Dict[str, Any]]:
+    """Poisson arrivals at rate per second, independent of how fast responses come back.
+
+    Latency counts from each request's scheduled arrival, so time spent
+    waiting for a free sender is included instead of hidden.
+    """
+    rng = random.Random(seed)
+    arrivals = []
+    at = 0.0
+    while True:
+        at += rng.expovariate(rate)
+        if at >= duration:
+            break
+        arrivals.append(at)
+
+    local = threading.local()
+
+    def send(n: int, scheduled: float) -> Dict[str, Any]:
+        if not hasattr(local, "client"):
+            local.client = runner.app.test_client()
+        return runner.send(local.client, f"bench-client-{n % max_in_flight}", scheduled)
+
+    futures = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="bench-open-loop") as executor:
+        for n, offset in enumerate(arrivals):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(send, n, start + offset))
+    return [future.result() for future in futures]
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float, stages_before: Dict[str, Any],
+              stages_after: Dict[str, Any], streamed: bool) -> Dict[str, Any]:
+    ok = [r for r in results if r["ok"]]
+    summary = {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "status_codes": {},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "latency": latency_summary([r["latency"] for r in ok]),
+        "stages": {},
+    }
+    for result in results:
+        code = str(result["status"])
+        summary["status_codes"][code] = summary["status_codes"].get(code, 0) + 1
+    if streamed:
+        summary["time_to_first_byte"] = latency_summary([r["ttfb"] for r in ok])
+
+    # Per-stage time from the backend's own histograms, diffed across the run
+    for name, (count, total) in sorted(stages_after.items()):
+        before_count, before_total = stages_before.get(name, (0, 0.0))
+        calls = count - before_count
+        if calls <= 0:
+            continue
+        mean = (total - before_total) / calls
+        summary["stages"][name] = {
+            "calls": calls,
+            "calls_per_request": round(calls / len(results), 3) if results else None,
+            # Most histograms time a stage; the rest (batch sizes, token counts) get a plain mean
+            **({"mean_ms": ms(mean)} if name.endswith("_seconds") else {"mean": round(mean, 3)}),
+        }
+    return summary
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of report against baseline: p95 latency up, or throughput down, by more than threshold."""
+    regressions = []
+    for scenario, modes in report["scenarios"].items():
+        for mode, current in modes.items():
+            previous = baseline.get("scenarios", {}).get(scenario, {}).get(mode)
+            if not previous:
+                continue
+            p95, old_p95 = current["latency"]["p95_ms"], previous["latency"]["p95_ms"]
+            if p95 is not None and old_p95 and p95 > old_p95 * (1 + threshold):
+                regressions.append(f"{scenario}/{mode}: p95 {old_p95:.1f} ms -> {p95:.1f} ms")
+            rps, old_rps = current["throughput_rps"], previous["throughput_rps"]
+            if old_rps and rps < old_rps * (1 - threshold):
+                regressions.append(f"{scenario}/{mode}: throughput {old_rps:.2f} -> {rps:.2f} req/s")
+    return regressions
+
+
+def seed_memories(agent, count: int, seed: int):
+    """Fill the memory store with synthetic memories so retrieval has work to do."""
+    rng = random.Random(seed)
+    memories = [
+        {
+            "text": f"Note {i}: the {rng.choice(TOPICS)} should {rng.choice(ACTIONS)} "
+                    f"when handling {rng.choice(FILE_TYPES)} code with more than {rng.randint(2, 500)} items.",
+            "tag": [rng.choice(TOPICS)],
+        }
+        for i in range(count)
+    ]
+    for start in range(0, len(memories), 500):
+        agent.agent.add_memories_bulk(memories[start:start + 500])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the backend request pipeline")
+    parser.add_argument("--scenarios", default="all", help="Comma-separated scenario names, or 'all'")
+    parser.add_argument("--modes", default="closed,open", help="closed, open or both (comma-separated)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario and mode")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Clients in closed-loop runs")
+    parser.add_argument("--rate", type=float, default=2.0, help="Arrivals per second in open-loop runs")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Senders available in open-loop runs")
+    parser.add_argument("--memories", type=int, default=1000, help="Synthetic memories in the store")
+    parser.add_argument("--ttft-ms", type=float, default=50, help="Mock server time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Mock server generation rate")
+    parser.add_argument("--completion-tokens", type=int, default=32, help="Tokens generated per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Report path (default benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    mock = MockLlamaServer(ttft_ms=args.ttft_ms, tokens_per_second=args.tokens_per_second,
+                           completion_tokens=args.completion_tokens, seed=args.seed).start()
+    memory_dir = tempfile.mkdtemp(prefix="pipeline-bench-")
+
+    # Point the backend at the stand-ins before it is imported (it connects at import)
+    os.environ["VSCODE_AGENT_LLM_URL"] = mock.url
+    os.environ["VSCODE_AGENT_MEMORY_BACKEND"] = "local"
+    os.environ["VSCODE_AGENT_MEMORY_PATH"] = memory_dir
+    os.environ.setdefault("VSCODE_AGENT_LOG_LEVEL", "WARNING")
+
+    import vscode_integration
+    from metrics import histogram_totals
+
+    app = vscode_integration.create_app()
+    if args.memories:
+        print(f"Seeding {args.memories} memories...")
+        seed_memories(vscode_integration.agent, args.memories, args.seed)
+
+    scenarios = _scenarios(args.completion_tokens)
+    names = list(scenarios) if args.scenarios == "all" else [n.strip() for n in args.scenarios.split(",")]
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(scenarios)})")
+        return 2
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    report = {
+        "benchmark": "pipeline",
+        "version": REPORT_VERSION,
+        "environment": environment(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": {},
+    }
+
+    try:
+        for name in names:
+            path, streamed, payload = scenarios[name]
+            runner = Runner(app, path, streamed, payload, args.seed)
+            warmup_client = app.test_client()
+            for _ in range(args.warmup):
+                runner.send(warmup_client, "bench-warmup")
+
+            report["scenarios"][name] = {}
+            for mode in modes:
+                before = histogram_totals()
+                started = time.perf_counter()
+                if mode == "closed":
+                    results = run_closed_loop(runner, args.concurrency, args.duration)
+                elif mode == "open":
+                    results = run_open_loop(runner, args.rate, args.duration, args.max_in_flight, args.seed)
+                else:
+                    print(f"Unknown mode: {mode}")
+                    return 2
+                summary = summarize(results, time.perf_counter() - started, before, histogram_totals(), streamed)
+                report["scenarios"][name][mode] = summary
+                latency = summary["latency"]
+                print(f"{name:<28} {mode:<6} {summary['requests']:>5} req  {summary['errors']:>3} err  "
+                      f"{summary['throughput_rps']:>7.2f} req/s  p50 {latency['p50_ms'] or 0:>8.1f} ms  "
+                      f"p95 {latency['p95_ms'] or 0:>8.1f} ms  p99 {latency['p99_ms'] or 0:>8.1f} ms")
+    finally:
+        mock.stop()
+
+    output = write_report(report, args.output, "pipeline")
+    print(f"Report written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
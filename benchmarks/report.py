@@ -0,0 +1,74 @@
+"""
+Helpers shared by the benchmark scripts: percentiles and JSON reports that
+record where they were produced, so reports from different commits can be
+compared.
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def ms(seconds: Optional[float]) -> Optional[float]:
+    """Seconds as milliseconds, rounded so reports diff cleanly."""
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Optional[float]]:
+    """Mean, p50, p95, p99 and max of a list of durations, in milliseconds."""
+    values = sorted(seconds)
+    return {
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else None,
+    }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.check_output(("git",) + args, cwd=ROOT_DIR, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Where a report was produced, to tell whether two reports are comparable."""
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def write_report(report: Dict[str, Any], output: Optional[str], name: str) -> str:
+    """Write a report as indented JSON with sorted keys.
+
+    Defaults to benchmarks/results/<name>-<commit>.json. Returns the path.
+    """
+    commit = (report.get("environment", {}).get("commit") or "unknown")[:12]
+    output = output or os.path.join(BENCHMARKS_DIR, "results", f"{name}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return output
@@ -12,6 +12,7 @@ import {
 } from './agent-services';
 import * as fs from 'fs';
 import * as os from 'os';
+import * as crypto from 'crypto';
 
 // Configuration constants
 // Use configuration rather than hardcoded ports
@@ -40,6 +41,15 @@ const DEFAULT_HEADERS = {
   'Content-Type': 'application/json'
 };
 
+/**
+ * Start a W3C trace context for one request, so the backend's spans for it
+ * (agent, memory search, llama.cpp) join a trace that starts here
+ * @returns Value for the traceparent header
+ */
+function newTraceparent(): string {
+  return `00-${crypto.randomBytes(16).toString('hex')}-${crypto.randomBytes(8).toString('hex')}-01`;
+}
+
 // Track if services are running
 let servicesRunning = false;
 
@@ -80,6 +90,11 @@ export function activate(context: vscode.ExtensionContext) {
     }
   });
 
+  // As-you-type completions from the backend's fill-in-the-middle endpoint
+  context.subscriptions.push(
+    vscode.languages.registerInlineCompletionItemProvider({ pattern: '**' }, new AgentInlineCompletionProvider())
+  );
+
   // Register AI Chat panel view
   const aiChatProvider = new AIChatViewProvider(context.extensionUri);
   context.subscriptions.push(
@@ -159,8 +174,9 @@ export function activate(context: vscode.ExtensionContext) {
         location: vscode.ProgressLocation.Notification,
         title: "Generating code...",
         cancellable: true
-      }, async (progress) => {
-        const completion = await sendCodeCompletion(codeContext, fileType, request);
+      }, async (progress, token) => {
+        const completion = await sendCodeCompletion(codeContext, fileType, request, token);
+        if (!completion) return;
         
         // Insert the completion at cursor position
         editor.edit(editBuilder => {
@@ -245,6 +261,52 @@ export function deactivate() {
 }
 
 // AI Chat WebView Provider
+// Lines of context sent around the cursor for inline completions
+const INLINE_PREFIX_LINES = 100;
+const INLINE_SUFFIX_LINES = 30;
+
+export class AgentInlineCompletionProvider implements vscode.InlineCompletionItemProvider {
+  async provideInlineCompletionItems(
+    document: vscode.TextDocument,
+    position: vscode.Position,
+    _context: vscode.InlineCompletionContext,
+    token: vscode.CancellationToken
+  ): Promise<vscode.InlineCompletionItem[]> {
+    const config = vscode.workspace.getConfiguration('aidevteam');
+    if (!config.get<boolean>('inlineCompletions', false)) {
+      return [];
+    }
+
+    const prefix = document.getText(new vscode.Range(
+      new vscode.Position(Math.max(0, position.line - INLINE_PREFIX_LINES), 0),
+      position
+    ));
+    const lastLine = Math.min(document.lineCount - 1, position.line + INLINE_SUFFIX_LINES);
+    const suffix = document.getText(new vscode.Range(position, document.lineAt(lastLine).range.end));
+
+    try {
+      // Each keystroke supersedes the previous request for the document; the
+      // backend also debounces, so only the last one of a burst is generated
+      const response = await makeApiCallWithPortDiscovery('/infill', {
+        prefix,
+        suffix,
+        file_type: document.languageId,
+        session_id: `${vscode.env.sessionId}:${document.uri.toString()}`
+      }, { token, supersede: true });
+
+      if (response.status !== "success" || !response.completion || token.isCancellationRequested) {
+        return [];
+      }
+      return [new vscode.InlineCompletionItem(response.completion, new vscode.Range(position, position))];
+    } catch (error: any) {
+      if (!axios.isCancel(error)) {
+        console.error('Error requesting inline completion:', error.message);
+      }
+      return [];
+    }
+  }
+}
+
 class AIChatViewProvider implements vscode.WebviewViewProvider {
   private view: vscode.WebviewView | undefined;
   private messages: Array<{role: string, content: string}> = [];
@@ -456,32 +518,78 @@ class AIChatViewProvider implements vscode.WebviewViewProvider {
   }
 }
 
+// In-flight requests that a newer request of the same type for the same
+// document supersedes, keyed by request type and session ID
+const supersedableRequests = new Map<string, AbortController>();
+
+interface ApiCallOptions {
+  // Abort the request when this token is cancelled (e.g. a cancellable progress notification)
+  token?: vscode.CancellationToken;
+  // Abort any earlier request of the same type for the same document
+  supersede?: boolean;
+}
+
 /**
  * Helper function to make API calls with automatic port discovery
  * @param endpoint API endpoint path (e.g., "/query", "/code_explanation")
  * @param data Request data to send
+ * @param options Cancellation options; an aborted request rejects with an axios Cancel
  * @returns Response data or error message
  */
-async function makeApiCallWithPortDiscovery(endpoint: string, data: any): Promise<any> {
+export async function makeApiCallWithPortDiscovery(endpoint: string, data: any, options: ApiCallOptions = {}): Promise<any> {
   // Ensure the data object exists
   if (!data) {
     data = {};
   }
 
+  // Requests from the same editor document share a llama.cpp slot on the backend,
+  // so repeated queries on a file reuse its cached prompt prefix
+  if (!data.session_id) {
+    const documentUri = vscode.window.activeTextEditor?.document.uri.toString() ?? 'chat';
+    data.session_id = `${vscode.env.sessionId}:${documentUri}`;
+  }
+
+  // Aborting closes the connection; the backend notices and stops generating
+  const controller = new AbortController();
+  const requestKey = `${data.type ?? endpoint}:${data.session_id}`;
+  if (options.supersede) {
+    supersedableRequests.get(requestKey)?.abort();
+    supersedableRequests.set(requestKey, controller);
+  }
+  const cancellation = options.token?.onCancellationRequested(() => controller.abort());
+
+  try {
+    return await postWithPortDiscovery(endpoint, data, controller.signal);
+  } finally {
+    cancellation?.dispose();
+    if (supersedableRequests.get(requestKey) === controller) {
+      supersedableRequests.delete(requestKey);
+    }
+  }
+}
+
+async function postWithPortDiscovery(endpoint: string, data: any, signal: AbortSignal): Promise<any> {
   // Get primary URL from settings
   const primaryUrl = getAgentApiUrl();
   const fullUrl = `${primaryUrl}${endpoint}`;
-  console.log(`Connecting to API endpoint: ${fullUrl}`);
+  // Retries on other ports stay in the same trace
+  // The session ID identifies this window for the backend's per-client request limit
+  const headers = { ...DEFAULT_HEADERS, 'X-Client-Id': vscode.env.sessionId, traceparent: newTraceparent() };
+  console.log(`Connecting to API endpoint: ${fullUrl} (traceparent ${headers.traceparent})`);
   
   // Try with primary URL first
   try {
     const response = await axios.post(fullUrl, data, {
-      headers: DEFAULT_HEADERS,
-      timeout: 15000 // Increase timeout for model processing
+      headers,
+      timeout: 15000, // Increase timeout for model processing
+      signal
     });
     
     return response.data;
   } catch (error: any) {
+    if (axios.isCancel(error)) {
+      throw error;
+    }
     console.log(`Primary URL ${primaryUrl} failed:`, error.message);
     
     // If primary URL fails with connection error, try alternative ports
@@ -500,8 +608,9 @@ async function makeApiCallWithPortDiscovery(endpoint: string, data: any): Promis
         
         try {
           const response = await axios.post(alternativeFullUrl, data, {
-            headers: DEFAULT_HEADERS,
-            timeout: 5000 // Shorter timeout for alternative ports
+            headers,
+            timeout: 5000, // Shorter timeout for alternative ports
+            signal
           });
           
           // If successful, update config for future requests
@@ -511,6 +620,9 @@ async function makeApiCallWithPortDiscovery(endpoint: string, data: any): Promis
           
           return response.data;
         } catch (portError: any) {
+          if (axios.isCancel(portError)) {
+            throw portError;
+          }
           console.log(`Alternative URL ${alternativeFullUrl} failed:`, portError.message);
           // Continue to next port
         }
@@ -566,14 +678,20 @@ async function sendCodeExplanation(code: string, fileType: string): Promise<stri
 }
 
 // Update sendCodeCompletion to use the helper function
-async function sendCodeCompletion(codeContext: string, fileType: string, request: string): Promise<string> {
+async function sendCodeCompletion(
+  codeContext: string,
+  fileType: string,
+  request: string,
+  token?: vscode.CancellationToken
+): Promise<string> {
   try {
+    // A newer completion for the same document replaces this one
     const response = await makeApiCallWithPortDiscovery('', {
       type: "code_completion",  // Add this required field
       code_context: codeContext,
       file_type: fileType,
       request
-    });
+    }, { token, supersede: true });
     
     if (response.status === "success") {
       return response.completion || "";
@@ -582,6 +700,9 @@ async function sendCodeCompletion(codeContext: string, fileType: string, request
       return `// Error: ${response.message || "Unknown error"}`;
     }
   } catch (error: any) {
+    if (axios.isCancel(error)) {
+      return "";
+    }
     console.error('Error sending code completion request:', error);
     return `// Error connecting to AI services: ${error.message}`;
   }
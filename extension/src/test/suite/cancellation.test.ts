@@ -0,0 +1,102 @@
+import * as assert from 'assert';
+import * as vscode from 'vscode';
+import axios from 'axios';
+import { AgentInlineCompletionProvider, makeApiCallWithPortDiscovery } from '../../extension';
+
+suite('Request Cancellation Test Suite', () => {
+	// A request seen by the stubbed axios.post, settled by the test or by its abort signal
+	interface PendingRequest {
+		data: any;
+		aborted: boolean;
+		respond: (body: any) => void;
+	}
+
+	let pending: PendingRequest[] = [];
+	const originalPost = axios.post;
+
+	setup(() => {
+		pending = [];
+		// Behaves like axios 0.24: an aborted signal rejects with a Cancel
+		(axios as any).post = (_url: string, data: any, config: { signal: any }) =>
+			new Promise((resolve, reject) => {
+				const request: PendingRequest = {
+					data,
+					aborted: false,
+					respond: (body: any) => resolve({ data: body })
+				};
+				config.signal.addEventListener('abort', () => {
+					request.aborted = true;
+					reject(new axios.Cancel('canceled'));
+				});
+				pending.push(request);
+			});
+	});
+
+	teardown(() => {
+		(axios as any).post = originalPost;
+	});
+
+	test('A superseded request is aborted', async () => {
+		const data = { type: 'code_completion', session_id: 'test-session:file.ts' };
+		const first = makeApiCallWithPortDiscovery('', { ...data }, { supersede: true });
+		const second = makeApiCallWithPortDiscovery('', { ...data }, { supersede: true });
+
+		await assert.rejects(first, (error: any) => axios.isCancel(error));
+		assert.strictEqual(pending.length, 2);
+		assert.strictEqual(pending[0].aborted, true);
+		assert.strictEqual(pending[1].aborted, false);
+
+		pending[1].respond({ status: 'success', completion: 'done' });
+		assert.deepStrictEqual(await second, { status: 'success', completion: 'done' });
+	});
+
+	test('Requests for other documents are not superseded', async () => {
+		const first = makeApiCallWithPortDiscovery('', { type: 'code_completion', session_id: 'test-session:a.ts' }, { supersede: true });
+		const second = makeApiCallWithPortDiscovery('', { type: 'code_completion', session_id: 'test-session:b.ts' }, { supersede: true });
+
+		assert.strictEqual(pending[0].aborted, false);
+		pending[0].respond({ status: 'success' });
+		pending[1].respond({ status: 'success' });
+		await Promise.all([first, second]);
+	});
+
+	test('Cancelling the token aborts the request', async () => {
+		const source = new vscode.CancellationTokenSource();
+		const request = makeApiCallWithPortDiscovery('', { type: 'code_explanation', session_id: 'test-session:file.ts' }, { token: source.token });
+
+		assert.strictEqual(pending[0].aborted, false);
+		source.cancel();
+
+		await assert.rejects(request, (error: any) => axios.isCancel(error));
+		assert.strictEqual(pending[0].aborted, true);
+		source.dispose();
+	});
+
+	test('A newer inline completion supersedes the previous one', async () => {
+		const config = vscode.workspace.getConfiguration('aidevteam');
+		const previous = config.inspect<boolean>('inlineCompletions')?.globalValue;
+		await config.update('inlineCompletions', true, vscode.ConfigurationTarget.Global);
+
+		try {
+			const document = await vscode.workspace.openTextDocument({ content: 'const total = ', language: 'typescript' });
+			const position = new vscode.Position(0, document.lineAt(0).text.length);
+			const context = { triggerKind: vscode.InlineCompletionTriggerKind.Automatic, selectedCompletionInfo: undefined };
+			const provider = new AgentInlineCompletionProvider();
+
+			const firstToken = new vscode.CancellationTokenSource();
+			const secondToken = new vscode.CancellationTokenSource();
+			const first = provider.provideInlineCompletionItems(document, position, context, firstToken.token);
+			const second = provider.provideInlineCompletionItems(document, position, context, secondToken.token);
+
+			assert.deepStrictEqual(await first, []);
+			assert.strictEqual(pending[0].aborted, true);
+
+			pending[1].respond({ status: 'success', completion: 'a + b;' });
+			const items = await second;
+			assert.strictEqual(items.length, 1);
+			assert.strictEqual(items[0].insertText, 'a + b;');
+		} finally {
+			await config.update('inlineCompletions', previous, vscode.ConfigurationTarget.Global);
+		}
+	});
+});
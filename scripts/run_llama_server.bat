@@ -39,6 +39,8 @@ if defined LLM_MODEL set "MODEL_PATH=%LLM_MODEL%"
 if not defined LLM_HOST set "HOST=127.0.0.1"
 if not defined LLM_PORT set "PORT=8081"
 if not defined LLM_THREADS set "THREADS=4"
+if not defined LLM_SLOTS set "SLOTS=1"
+if defined LLM_SLOTS set "SLOTS=%LLM_SLOTS%"
 if not defined LLM_GPU_LAYERS set "DEFAULT_GPU_LAYERS=35"
 if not defined LLM_CONTEXT_SIZE set "CONTEXT_SIZE=2048"
 
@@ -180,6 +182,7 @@ REM )
 echo Using model: %MODEL_PATH%
 echo Using llama-server at: %LLAMA_SERVER_PATH%
 echo Starting server on http://%HOST%:%PORT%
+echo Server slots (--parallel): %SLOTS%
 if %GPU_LAYERS% GTR 0 (
     echo GPU enabled with %GPU_LAYERS% layers offloaded to GPU
 ) else (
@@ -196,6 +199,7 @@ REM Start the server
     --host %HOST% ^
     --port %PORT% ^
     -t %THREADS% ^
+    --parallel %SLOTS% ^
     --log-disable ^
     -ngl %GPU_LAYERS%
 
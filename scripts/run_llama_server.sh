@@ -27,6 +27,7 @@ MODEL_PATH="$1"  # First argument is model path
 HOST="${LLM_HOST:-127.0.0.1}"
 PORT="${LLM_PORT:-8081}"
 THREADS="${LLM_THREADS:-4}"
+SLOTS="${LLM_SLOTS:-1}"
 DEFAULT_GPU_LAYERS="${LLM_GPU_LAYERS:-35}"
 
 # Determine appropriate GPU layers based on model size
@@ -172,5 +173,6 @@ echo "======================================================"
     --host "$HOST" \
     --port "$PORT" \
     -t "$THREADS" \
+    --parallel "$SLOTS" \
     --log-disable \
     -ngl "$GPU_LAYERS" 
\ No newline at end of file
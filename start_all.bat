@@ -113,6 +113,7 @@ REM We'll set some defaults and then override with values from config if found
 set LLM_MODEL=models\mistral-7b-instruct-v0.2.Q4_K_M.gguf
 set LLM_PORT=8081
 set LLM_HOST=127.0.0.1
+set LLM_SLOTS=1
 set BACKEND_PORT=5000
 set BACKEND_HOST=127.0.0.1
 set USE_MEMORY=true
@@ -130,6 +131,8 @@ for /f "tokens=1,2 delims=:" %%a in ('findstr /c:"host:" config.yml') do (
     echo %%a | findstr "backend" >nul && set BACKEND_HOST=%%b
 )
 for /f "tokens=1,2 delims=:" %%a in ('findstr /c:"use_memory:" config.yml') do set USE_MEMORY=%%b
+REM llm.slots: server slots (llama-server --parallel) that editor sessions are pinned to
+for /f "tokens=1,2 delims=:" %%a in ('findstr /c:"slots:" config.yml') do set LLM_SLOTS=%%b
 
 REM Remove quotes and spaces from values
 set LLM_MODEL=%LLM_MODEL:"=%
@@ -138,6 +141,8 @@ set LLM_PORT=%LLM_PORT:"=%
 set LLM_PORT=%LLM_PORT: =%
 set LLM_HOST=%LLM_HOST:"=%
 set LLM_HOST=%LLM_HOST: =%
+set LLM_SLOTS=%LLM_SLOTS:"=%
+set LLM_SLOTS=%LLM_SLOTS: =%
 set BACKEND_PORT=%BACKEND_PORT:"=%
 set BACKEND_PORT=%BACKEND_PORT: =%
 set BACKEND_HOST=%BACKEND_HOST:"=%
@@ -150,6 +155,7 @@ set WEAVIATE_PORT=%WEAVIATE_PORT: =%
 echo Configuration loaded:
 echo   LLM Model: %LLM_MODEL%
 echo   LLM Port: %LLM_PORT%
+echo   LLM Slots: %LLM_SLOTS%
 echo   Backend Port: %BACKEND_PORT%
 echo   Use Memory: %USE_MEMORY%
 
@@ -271,6 +277,7 @@ if %LLM_RUNNING% EQU 1 (
     set "LLM_HOST=%LLM_HOST%"
     set "LLM_THREADS=%THREADS%"
     set "LLM_CONTEXT_SIZE=%CONTEXT_SIZE%"
+    set "LLM_SLOTS=%LLM_SLOTS%"
 
     REM Set appropriate GPU layers based on model size
     echo %LLM_MODEL% | findstr "Llama-4.*17B" >nul
@@ -336,7 +343,7 @@ if %AGENT_RUNNING% EQU 1 (
     echo   VSCODE_AGENT_LLM_URL: %VSCODE_AGENT_LLM_URL%
     
     REM Start VS Code agent in a new window
-    start "VS Code Agent" cmd /c "python -m flask run --host=%FLASK_HOST% --port=%FLASK_PORT%"
+    start "VS Code Agent" cmd /c "python backend\vscode_integration.py --host %FLASK_HOST% --port %FLASK_PORT%"
     
     echo Waiting for VS Code agent to start (10 seconds)...
     timeout /t 10 /nobreak >nul
@@ -363,6 +363,7 @@ else
     export LLM_HOST="${config_llm_host}"
     export LLM_THREADS="${config_llm_threads}"
     export LLM_CONTEXT_SIZE="${config_llm_context_size}"
+    export LLM_SLOTS="${config_llm_slots:-1}"
 
     # Set appropriate GPU layers based on model size
     if [[ "${config_llm_default_model}" == *"Llama-4"* ]] && [[ "${config_llm_default_model}" == *"17B"* ]]; then